@@ -21,9 +21,21 @@ import sqlite3
 import datetime
 from typing import Dict, List, Tuple, Optional
 
+from 作品_JOB_SEEKER.salary_parser import SALARY_COLUMNS, parse_salaries
+
 
 DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "db", "jobs.db")
 
+# salary_text 解析出來的數字欄（月薪換算欄有索引，給薪資區間篩選 / 排序）
+_SALARY_DDL = (
+    ("salary_period", "TEXT"),
+    ("salary_min", "INTEGER"),
+    ("salary_max", "INTEGER"),
+    ("salary_negotiable", "INTEGER"),
+    ("salary_month_min", "INTEGER"),
+    ("salary_month_max", "INTEGER"),
+)
+
 
 def _ensure_dir(db_path: str) -> None:
     d = os.path.dirname(db_path)
@@ -49,12 +61,24 @@ def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
                 salary_text TEXT,
                 post_date TEXT,
                 url TEXT,
+                salary_period TEXT,
+                salary_min INTEGER,
+                salary_max INTEGER,
+                salary_negotiable INTEGER,
+                salary_month_min INTEGER,
+                salary_month_max INTEGER,
                 UNIQUE(snapshot_date, keyword, areas, job_id)
             );
         """)
+        # 舊資料庫補欄位
+        have = {row[1] for row in conn.execute("PRAGMA table_info(job_snapshot);")}
+        for col, typ in _SALARY_DDL:
+            if col not in have:
+                conn.execute(f"ALTER TABLE job_snapshot ADD COLUMN {col} {typ};")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshot_date ON job_snapshot(snapshot_date);")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_job_id ON job_snapshot(job_id);")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_kw_area ON job_snapshot(keyword, areas);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_salary ON job_snapshot(salary_month_min, salary_month_max);")
         conn.commit()
     finally:
         conn.close()
@@ -102,14 +126,20 @@ def insert_snapshot_rows(
     if not payload:
         return 0
 
+    # 薪資整批解析（同一份快照薪資寫法重複很多，只解析不重複的）
+    for p, info in zip(payload, parse_salaries(p["salary_text"] for p in payload)):
+        p.update(zip(SALARY_COLUMNS, info.columns()))
+
     conn = sqlite3.connect(db_path)
     try:
         cur = conn.cursor()
         cur.executemany("""
             INSERT OR IGNORE INTO job_snapshot
-            (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url)
+            (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url,
+             salary_period, salary_min, salary_max, salary_negotiable, salary_month_min, salary_month_max)
             VALUES
-            (:snapshot_date, :snapshot_time, :keyword, :areas, :job_id, :title, :company, :location, :salary_text, :post_date, :url);
+            (:snapshot_date, :snapshot_time, :keyword, :areas, :job_id, :title, :company, :location, :salary_text, :post_date, :url,
+             :salary_period, :salary_min, :salary_max, :salary_negotiable, :salary_month_min, :salary_month_max);
         """, payload)
         conn.commit()
         # 注意：sqlite 的 rowcount 對 executemany 可能不完全可靠，但通常足夠當「新增筆數」參考
@@ -200,3 +230,73 @@ def fetch_jobs_by_ids(job_ids: List[str], db_path: str = DEFAULT_DB_PATH) -> Lis
         conn.close()
 
 
+
+
+def find_jobs_by_salary(
+    month_min: Optional[int] = None,
+    month_max: Optional[int] = None,
+    snapshot_date: Optional[str] = None,
+    keyword: Optional[str] = None,
+    areas: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 200,
+    db_path: str = DEFAULT_DB_PATH
+) -> List[Dict[str, str]]:
+    """
+    月薪區間篩選（跟職缺薪資區間有交集就算，條件同 salary_parser.in_range），依月薪數字排序
+    走 idx_salary，不必把 salary_text 撈出來逐筆解析
+    """
+    init_db(db_path)
+    where, params = ["1 = 1"], []
+    if month_min is not None:
+        where.append("salary_month_min IS NOT NULL AND (salary_month_max IS NULL OR salary_month_max >= ?)")
+        params.append(month_min)
+    if month_max is not None:
+        where.append("salary_month_min <= ?")
+        params.append(month_max)
+    if snapshot_date:
+        where.append("snapshot_date = ?")
+        params.append(snapshot_date)
+    if keyword:
+        where.append("keyword = ?")
+        params.append(keyword)
+    if areas:
+        where.append("areas = ?")
+        params.append(areas)
+    order = "DESC" if descending else "ASC"
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute(f"""
+            SELECT job_id, title, company, location, salary_text, post_date, url, snapshot_time,
+                   salary_month_min, salary_month_max
+            FROM job_snapshot
+            WHERE {" AND ".join(where)}
+            ORDER BY salary_month_min IS NULL, salary_month_min {order}, salary_month_max {order}
+            LIMIT ?;
+        """, params + [limit])
+        return [dict(r) for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def backfill_salary_columns(db_path: str = DEFAULT_DB_PATH) -> int:
+    """既有資料補算薪資數字欄；以不重複的 salary_text 為單位解析、更新。回傳處理的文字數"""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        texts = [r[0] for r in conn.execute(
+            "SELECT DISTINCT IFNULL(salary_text, '') FROM job_snapshot WHERE salary_period IS NULL;"
+        )]
+        payload = [info.columns() + (t,) for t, info in zip(texts, parse_salaries(texts))]
+        conn.executemany("""
+            UPDATE job_snapshot
+            SET salary_period = ?, salary_min = ?, salary_max = ?, salary_negotiable = ?,
+                salary_month_min = ?, salary_month_max = ?
+            WHERE salary_period IS NULL AND IFNULL(salary_text, '') = ?;
+        """, payload)
+        conn.commit()
+        return len(texts)
+    finally:
+        conn.close()
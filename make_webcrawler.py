@@ -8,6 +8,9 @@ import requests
 from bs4 import BeautifulSoup
 from pre_webcrawler import PageProbe
 
+# 共用 HTTP 快取放在 作品_JOB_SEEKER/http_cache.py（當套件 import，跟 job_db.py 一樣）
+from 作品_JOB_SEEKER.http_cache import cached_get
+
 probe = PageProbe()
 
 url = "https://epic7.onstove.com/zh-TW/gg/herorecord"
@@ -75,13 +78,13 @@ def parse_hero_codes(hero_json: object) -> List[str]:
 
 
 def fetch_json(session: requests.Session, url: str) -> object:
-    r = session.get(url, timeout=TIMEOUT)
+    r = cached_get(session, "epic7", url, timeout=TIMEOUT)
     r.raise_for_status()
     return r.json()
 
 
 def fetch_html(session: requests.Session, url: str) -> str:
-    r = session.get(url, timeout=TIMEOUT)
+    r = cached_get(session, "epic7", url, timeout=TIMEOUT)
     r.raise_for_status()
     return r.text
 
@@ -6,13 +6,16 @@ from pathlib import Path
 from Sort_Dir import sort_existing_files
 from Sort_Dir import HTML_DIR
 from save_sqlite_tb import save_cash_and_spot_buy_to_sqlite
+
+# 共用 HTTP 快取放在 作品_JOB_SEEKER/http_cache.py（當套件 import，跟 job_db.py 一樣）
+from 作品_JOB_SEEKER.http_cache import cached_get
 # ✅ 新增：專門讀取本機 HTML 檔案 --------------------------------------
 
 TB_URL = "https://rate.bot.com.tw/xrt?Lang=zh-TW"
 
 def fetch_tb_html(timeout: int = 20) -> str:
     """下載台銀匯率網最新 HTML，回傳 HTML 字串"""
-    r = requests.get(TB_URL, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+    r = cached_get(requests, "tb_rate", TB_URL, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
     r.raise_for_status()
     r.encoding = r.apparent_encoding or "utf-8"
     return r.text
@@ -0,0 +1,30 @@
+# 張詠鈞的python工作區
+# File: __main__
+# Created: 2026/3/8 上午 09:40
+
+# 作品_JOB_SEEKER/__main__.py
+# 入口：python -m 作品_JOB_SEEKER
+# - 有帶參數 -> 非互動命令列（cli.py），結束碼給排程器用
+# - 沒帶參數 -> 啟動桌面 UI（跟 main.py 一樣）
+
+import os
+import sys
+
+# 這個資料夾裡的模組彼此是平面 import（import job_seeker …），用 -m 執行時要把自己加進 sys.path
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+
+def main() -> int:
+    if len(sys.argv) > 1:
+        import cli
+        return cli.main(sys.argv[1:])
+
+    from job_seeker_UI import main as ui_main
+    ui_main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
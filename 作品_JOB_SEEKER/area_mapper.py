@@ -12,16 +12,27 @@
 # 中文縣市 -> 104 area 代碼
 # - 優先：線上抓取 104「地區找工作」頁面的縣市連結（帶 area 的頁面較穩）
 # - 備援：內建台灣縣市代碼（線上抓不到也能正常轉換）
+# - process 內記住合併後的 mapping：cache 檔 mtime 變了 / 過期才重讀，不用每次 resolve 都 parse json
+#   refresh_area_mapping() 立刻重抓線上；invalidate_area_mapping() 只丟掉記憶，下次重讀
+# - stale-while-revalidate：cache 過期 / 沒有 cache 時，解析照樣用手上的資料（舊 cache 或內建）立刻回傳，
+#   另開背景 thread 下載 Area.json，成功就原子替換 cache 檔並換掉記憶；結果記在 last_refresh
+#   -> 解析地區永遠不會卡在網路請求上（只有明確呼叫 refresh_area_mapping() 才會同步等）
+# - AreaIndex：mapping 建一次索引（完全命中 / 別名 / 省略市縣 / 包含字串），同一個輸入只解析一次
+#   resolve_many("台北,新北市，桃園") 一次解析整串
+# - AreaTree：扁平 mapping 還原成 縣市 -> 區 的樹（區的上層 = 代碼前 7 碼 + "000"）
+#   代碼 <-> 名稱 O(1) 互查、縣市展開成所有區代碼（get_area_tree() / area_name() / expand_area_codes()）
+# - 編譯好的二進位索引（area_cache_104.idx，marshal）：合併後 mapping + AreaIndex + AreaTree 一次載入，
+#   cache json 的 mtime / 大小對不上才重編；程式啟動不用 parse 縮排 json、也不用重建索引
+# - 網路相關（requests / http_transport / http_cache）只在真的要下載 Area.json 時才 import
 
 import json
+import marshal
 import os
 import re
+import threading
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
-
-import requests
-from bs4 import BeautifulSoup
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 
 # ✅ 用「帶 area 的地區頁」當 seed，比沒有帶 area 的 /jobs/main/category/ 穩
@@ -29,7 +40,26 @@ AREA_SEED_URL = "https://www.104.com.tw/jobs/main/category/?area=6001001000&jobs
 AREA_JSON_URL = "https://static.104.com.tw/category-tool/json/Area.json"
 
 CACHE_FILE = os.path.join(os.path.dirname(__file__), "area_cache_104.json")
+USE_COMPILED_INDEX = True               # False：一律讀 json（除錯 / benchmark 對照用）
+INDEX_SUFFIX = ".idx"                   # 編譯索引放在 cache json 旁邊，同檔名換副檔名
+_INDEX_MAGIC = b"104AREA\x00"
+_INDEX_FORMAT = 1                       # AreaIndex / AreaTree 內部結構改了就 +1，舊檔自動重編
 CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600  # 30 天更新一次即可（縣市代碼非常穩）
+FALLBACK_RETRY_SECONDS = 10 * 60        # 線上抓不到、只能用內建時，隔多久再試一次線上
+
+SOURCE_CACHE = "cache"
+SOURCE_STALE = "stale"          # 過期的 cache：先用著，背景更新中
+SOURCE_ONLINE = "online"
+SOURCE_BUILTIN = "builtin"
+
+# 常見別名
+AREA_ALIASES: Dict[str, str] = {
+    "新竹": "新竹縣市",
+    "嘉義": "嘉義縣市",
+}
+# 省略市/縣：台北 -> 台北市（多個候選時照這個順序列）
+_SUFFIXES = ("市", "縣", "縣市")
+_SPLIT_RE = re.compile(r"[,，、]")
 
 
 # ✅ 內建台灣縣市（備援 + 也可直接用，不靠線上抓）
@@ -72,7 +102,8 @@ def _normalize_text(s: str) -> str:
     return s
 
 
-def _load_cache() -> Optional[Dict[str, str]]:
+def _load_cache(allow_stale: bool = False) -> Optional[Tuple[Dict[str, str], float]]:
+    """回傳 (mapping, 抓取時間)；沒有檔 / 壞掉回 None；過期的只有 allow_stale 才回傳"""
     if not os.path.exists(CACHE_FILE):
         return None
     try:
@@ -81,11 +112,11 @@ def _load_cache() -> Optional[Dict[str, str]]:
         ts = obj.get("_fetched_at", 0)
         if not isinstance(ts, (int, float)):
             return None
-        if time.time() - ts > CACHE_MAX_AGE_SECONDS:
+        if not allow_stale and time.time() - ts > CACHE_MAX_AGE_SECONDS:
             return None
         mapping = obj.get("mapping", {})
         if isinstance(mapping, dict) and mapping:
-            return mapping
+            return mapping, float(ts)
         return None
     except Exception:
         return None
@@ -96,22 +127,93 @@ def _save_cache(mapping: Dict[str, str]) -> None:
         "_fetched_at": int(time.time()),
         "mapping": mapping,
     }
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
+    # 先寫暫存檔再 replace：背景更新寫到一半時，別的 process / thread 讀到的還是完整的舊檔
+    tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, CACHE_FILE)
+
+
+# -------------------------
+# 編譯索引（二進位）
+# -------------------------
+def _index_file() -> str:
+    return os.path.splitext(CACHE_FILE)[0] + INDEX_SUFFIX
+
+
+def _cache_stat() -> Optional[os.stat_result]:
+    try:
+        return os.stat(CACHE_FILE)
+    except OSError:
+        return None
+
+
+def _load_compiled(st: os.stat_result) -> Optional[Tuple[Dict[str, str], float, "AreaIndex", "AreaTree"]]:
+    """回傳 (合併後 mapping, 抓取時間, 索引, 樹)；沒有檔 / 對不上目前的 cache json / 格式舊了回 None"""
+    try:
+        with open(_index_file(), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(_INDEX_MAGIC):
+        return None
+    try:
+        fmt, mtime_ns, size, defaults, fetched_at, merged, index_state, tree_state = \
+            marshal.loads(memoryview(data)[len(_INDEX_MAGIC):])
+    except Exception:
+        return None
+    if fmt != _INDEX_FORMAT or mtime_ns != st.st_mtime_ns or size != st.st_size:
+        return None
+    if defaults != DEFAULT_TW_AREA_MAP:
+        # 內建對照表改過：合併結果不一樣了
+        return None
+    return merged, fetched_at, AreaIndex.from_state(merged, index_state), AreaTree.from_state(merged, tree_state)
 
 
-def fetch_area_mapping(timeout: int = 20) -> Dict[str, str]:
+def _write_compiled(st: os.stat_result, fetched_at: float, merged: Dict[str, str],
+                    index: "AreaIndex", tree: "AreaTree") -> None:
+    payload = (_INDEX_FORMAT, st.st_mtime_ns, st.st_size, DEFAULT_TW_AREA_MAP, fetched_at,
+               merged, index.to_state(), tree.to_state())
+    path = _index_file()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_INDEX_MAGIC + marshal.dumps(payload))
+        os.replace(tmp, path)
+    except OSError:
+        # 寫不了就算了，下次啟動再讀 json
+        pass
+
+
+def _compile(st: Optional[os.stat_result], mapping: Dict[str, str],
+             fetched_at: float) -> Tuple[Dict[str, str], "AreaIndex", "AreaTree"]:
+    """cache json 的 mapping -> 合併 + 建索引 + 建樹，順便寫編譯索引給下次啟動用"""
+    merged = _merge(mapping)
+    index, tree = AreaIndex(merged), AreaTree(merged)
+    if USE_COMPILED_INDEX and st is not None:
+        _write_compiled(st, fetched_at, merged, index, tree)
+    return merged, index, tree
+
+
+def fetch_area_mapping(timeout: int = 20, url: str = AREA_JSON_URL, refresh: bool = False) -> Dict[str, str]:
     """
     從 104 的 Area.json 抓「縣市 + 區/鄉鎮」對照表
     回傳 mapping：
       - "桃園市" -> "6001005000"
       - "桃園市龜山區" -> "6001005013"（示例，實際依 Area.json）
+    url 可改成本機替身伺服器（stand_in_server.py）的 Area.json
+    refresh=True：略過 HTTP 回應快取（104_area 存 7 天），一定重新下載
     """
+    # 只有真的要下載才載入網路相關模組（requests / urllib3 很重，解析地區用不到）
+    from http_cache import cached_get
+    from http_transport import shared_session
+
     headers = {
         "User-Agent": "Mozilla/5.0",
         "Accept": "application/json, text/plain, */*",
     }
-    r = requests.get(AREA_JSON_URL, headers=headers, timeout=timeout)
+    # 走共用連線池（keep-alive + gzip），不用 module 層級的 requests.get 每次重新握手
+    r = cached_get(shared_session(), "104_area", url, headers=headers, timeout=timeout, refresh=refresh)
     r.raise_for_status()
     data = r.json()
 
@@ -160,82 +262,514 @@ def fetch_area_mapping(timeout: int = 20) -> Dict[str, str]:
     return mapping
 
 
-def get_area_mapping(force_refresh: bool = False) -> Dict[str, str]:
-    """回傳最終 mapping：
-    - 先嘗試 cache
-    - 再嘗試線上抓取
-    - 最後 fallback 內建 DEFAULT_TW_AREA_MAP"""
-    if not force_refresh:
-        cached = _load_cache()
-        if cached:
-            # 合併內建（以 cached 為優先）
-            merged = dict(DEFAULT_TW_AREA_MAP)
-            merged.update(cached)
-            return merged
+# -------------------------
+# process 內快取
+# -------------------------
+@dataclass
+class _AreaMemo:
+    mapping: Dict[str, str]
+    source: str                     # cache / stale / online / builtin
+    file_mtime: Optional[float]     # 建立當下 cache 檔的 mtime（None = 沒有檔）
+    expires_at: float               # time.time() 超過就重建
+    index: Optional["AreaIndex"] = None   # 第一次解析時才建
+    tree: Optional["AreaTree"] = None     # 第一次用到時才建
+
+
+@dataclass
+class AreaMapStats:
+    hits: int = 0           # 直接用記憶的 mapping
+    loads: int = 0          # 讀 + parse cache json（順便重編索引）
+    compiled_loads: int = 0  # 直接讀編譯好的二進位索引
+    fetches: int = 0        # 線上抓 Area.json
+    stale_served: int = 0   # 用過期 cache / 內建先頂著的次數（背景更新中）
+    background_refreshes: int = 0
+    sources: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        text = f"命中 {self.hits}、讀索引 {self.compiled_loads}、讀 json {self.loads}、線上 {self.fetches}"
+        if self.stale_served or self.background_refreshes:
+            text += f"、先用舊資料 {self.stale_served}、背景更新 {self.background_refreshes}"
+        return text
+
+
+@dataclass
+class RefreshOutcome:
+    started_at: float
+    finished_at: float = 0.0
+    ok: bool = False
+    entries: int = 0
+    error: str = ""
+    background: bool = False
+
+    @property
+    def elapsed(self) -> float:
+        return max(0.0, self.finished_at - self.started_at)
+
+
+stats = AreaMapStats()
+last_refresh: Optional[RefreshOutcome] = None   # 最近一次下載 Area.json 的結果（同步 / 背景都算）
+_memo: Optional[_AreaMemo] = None
+_memo_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_refresh_thread: Optional[threading.Thread] = None
+
 
+def _cache_mtime() -> Optional[float]:
     try:
-        online = fetch_area_mapping()
-        if online:
+        return os.stat(CACHE_FILE).st_mtime
+    except OSError:
+        return None
+
+
+def _merge(mapping: Dict[str, str]) -> Dict[str, str]:
+    # 合併內建（以線上 / cache 為優先）
+    merged = dict(DEFAULT_TW_AREA_MAP)
+    merged.update(mapping)
+    return merged
+
+
+def _memo_valid(memo: _AreaMemo) -> bool:
+    return time.time() < memo.expires_at and _cache_mtime() == memo.file_mtime
+
+
+def _download(background: bool = False) -> Tuple[Optional[_AreaMemo], RefreshOutcome]:
+    """
+    下載 Area.json 並寫回 cache 檔；成功回傳新的記憶（不持有 _memo_lock，可以在背景跑）
+    背景更新可以用 HTTP 回應快取；明確要求重抓（background=False）一定上網，
+    不然 7 天內的舊 body 會被當成剛抓的、再用 30 天
+    """
+    global last_refresh
+    outcome = RefreshOutcome(started_at=time.time(), background=background)
+    stats.fetches += 1
+    memo = None
+    try:
+        online = fetch_area_mapping(refresh=not background)
+        if not online:
+            outcome.error = "Area.json 內容不完整"
+    except Exception as e:
+        online = {}
+        outcome.error = f"{type(e).__name__}: {e}"
+    if online:
+        outcome.ok, outcome.entries = True, len(online)
+        try:
             _save_cache(online)
-            merged = dict(DEFAULT_TW_AREA_MAP)
-            merged.update(online)
-            return merged
-    except Exception:
-        pass
-    # fallback
-    return dict(DEFAULT_TW_AREA_MAP)
+            st = _cache_stat()
+        except OSError as e:
+            outcome.error = f"cache 檔寫入失敗：{e}"
+            st = None
+        # 背景 thread 裡順便把索引建好並編譯，換上去之後第一次解析不用再建
+        merged, index, tree = _compile(st, online, time.time())
+        memo = _AreaMemo(merged, SOURCE_ONLINE, st.st_mtime if st else _cache_mtime(),
+                         time.time() + CACHE_MAX_AGE_SECONDS, index, tree)
+    outcome.finished_at = time.time()
+    last_refresh = outcome
+    return memo, outcome
+
+
+def _refresh_worker() -> None:
+    global _refresh_thread
+    try:
+        memo, _ = _download(background=True)
+        if memo is not None:
+            with _memo_lock:
+                _set_memo(memo)
+    finally:
+        _refresh_thread = None
+
+
+def refresh_in_background() -> bool:
+    """背景下載 Area.json（已經在跑就不重複開）；回傳這次有沒有真的開新的"""
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None:
+            return False
+        stats.background_refreshes += 1
+        _refresh_thread = threading.Thread(target=_refresh_worker, name="area-refresh", daemon=True)
+        _refresh_thread.start()
+        return True
+
+
+def wait_for_refresh(timeout: Optional[float] = None) -> Optional[RefreshOutcome]:
+    """等背景更新跑完（測試 / 批次結束前用），回傳 last_refresh"""
+    t = _refresh_thread
+    if t is not None:
+        t.join(timeout)
+    return last_refresh
+
+
+def _load_local(st: Optional[os.stat_result]) -> Optional[Tuple[Dict[str, str], float, "AreaIndex", "AreaTree"]]:
+    """本機資料：先讀編譯索引，對不上才讀 cache json（並重編）"""
+    if st is None:
+        return None
+    if USE_COMPILED_INDEX:
+        compiled = _load_compiled(st)
+        if compiled is not None:
+            stats.compiled_loads += 1
+            return compiled
+    loaded = _load_cache(allow_stale=True)
+    if not loaded:
+        return None
+    stats.loads += 1
+    mapping, fetched_at = loaded
+    merged, index, tree = _compile(st, mapping, fetched_at)
+    return merged, fetched_at, index, tree
+
+
+def _build_memo() -> _AreaMemo:
+    """只讀本機（編譯索引 / cache 檔 / 內建），不碰網路；資料過期或沒有 cache 就排背景更新"""
+    st = _cache_stat()
+    mtime = st.st_mtime if st is not None else None
+    local = _load_local(st)
+    if local is not None:
+        merged, fetched_at, index, tree = local
+        expires_at = fetched_at + CACHE_MAX_AGE_SECONDS
+        if time.time() < expires_at:
+            return _AreaMemo(merged, SOURCE_CACHE, mtime, expires_at, index, tree)
+        memo = _AreaMemo(merged, SOURCE_STALE, mtime, time.time() + FALLBACK_RETRY_SECONDS, index, tree)
+    else:
+        memo = _AreaMemo(dict(DEFAULT_TW_AREA_MAP), SOURCE_BUILTIN, mtime, time.time() + FALLBACK_RETRY_SECONDS)
+    # 過期 / 沒 cache：先用手上的，背景更新；失敗的話 FALLBACK_RETRY_SECONDS 後記憶過期會再排一次
+    stats.stale_served += 1
+    refresh_in_background()
+    return memo
+
+
+def _set_memo(memo: _AreaMemo) -> _AreaMemo:
+    global _memo
+    _memo = memo
+    stats.sources[memo.source] = stats.sources.get(memo.source, 0) + 1
+    return memo
+
+
+def _current_mapping() -> Dict[str, str]:
+    """記憶中的 mapping（唯讀，不要改它）；cache 檔被改過 / 過期才重建"""
+    with _memo_lock:
+        memo = _memo
+        if memo is not None and _memo_valid(memo):
+            stats.hits += 1
+            return memo.mapping
+        return _set_memo(_build_memo()).mapping
+
+
+def _derived(attr: str, build: Callable[[Dict[str, str]], Any]) -> Any:
+    """跟著記憶一起走的衍生結構（索引 / 樹）：mapping 換掉時一起作廢"""
+    mapping = _current_mapping()
+    with _memo_lock:
+        memo = _memo
+        if memo is None or memo.mapping is not mapping:
+            # 剛好被別的 thread 換掉：用手上這份 mapping 臨時建一個
+            return build(mapping)
+        obj = getattr(memo, attr)
+        if obj is None:
+            obj = build(mapping)
+            setattr(memo, attr, obj)
+        return obj
+
+
+def _current_index() -> "AreaIndex":
+    return _derived("index", AreaIndex)
+
+
+def get_area_tree() -> "AreaTree":
+    return _derived("tree", AreaTree)
+
+
+def refresh_area_mapping() -> Dict[str, str]:
+    """立刻重抓線上 Area.json 並更新 cache 檔（同步，會等網路）；抓不到就沿用目前的 mapping"""
+    memo, _ = _download()
+    if memo is None:
+        return get_area_mapping()
+    with _memo_lock:
+        return dict(_set_memo(memo).mapping)
+
+
+def invalidate_area_mapping() -> None:
+    """丟掉記憶的 mapping，下次用到時重讀 cache 檔"""
+    global _memo
+    with _memo_lock:
+        _memo = None
+
+
+def area_mapping_source() -> str:
+    """目前 mapping 的來源（cache / online / builtin）"""
+    _current_mapping()
+    memo = _memo
+    return memo.source if memo is not None else ""
+
+
+def get_area_mapping(force_refresh: bool = False) -> Dict[str, str]:
+    """回傳最終 mapping（複本，可以改）：
+    - 先用 process 內記憶的（cache 檔沒變、沒過期）
+    - 再嘗試 cache 檔（過期的也先用，背景更新）
+    - 都沒有就用內建 DEFAULT_TW_AREA_MAP（背景更新）
+    - force_refresh：同步重抓線上"""
+    if force_refresh:
+        return refresh_area_mapping()
+    return dict(_current_mapping())
 
 
 def list_supported_areas() -> List[str]:
-    mapping = get_area_mapping()
-    return sorted(mapping.keys())
+    return sorted(_current_mapping().keys())
+
+
+# -------------------------
+# 解析
+# -------------------------
+class AreaIndex:
+    """
+    mapping 建一次的查詢索引
+    - exact：原名稱直接查 mapping；正規化後（臺/台、空白）才一樣的另外記一份
+    - stems：去掉市/縣/縣市後的名稱 -> 候選（台北 -> [台北市]）
+    - chars：字 -> 含這個字的名稱序號；包含字串查詢只驗證最短那條清單，不用掃全部
+      （只有模糊查詢用得到，第一次用到才建，也不存進編譯索引）
+    同一個正規化輸入的結果（含錯誤）會記住
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self.names = list(mapping)          # 保留原順序：模糊建議照這個順序列
+        self._exact: Dict[str, str] = {}
+        for k in self.names:
+            n = _normalize_text(k)
+            if n != k and n not in mapping:
+                self._exact.setdefault(n, k)
+        self._stems: Dict[str, List[str]] = {}
+        for suffix in _SUFFIXES:
+            for name in self.names:
+                if name.endswith(suffix) and len(name) > len(suffix):
+                    self._stems.setdefault(name[:-len(suffix)], []).append(name)
+        self._chars: Optional[Dict[str, List[int]]] = None
+        self._results: Dict[str, Tuple[str, str, str]] = {}
+
+    def to_state(self) -> Tuple[Any, ...]:
+        """給編譯索引存檔用（只有 dict / list / str，marshal 存得了）"""
+        return (self._exact, self._stems)
+
+    @classmethod
+    def from_state(cls, mapping: Dict[str, str], state: Tuple[Any, ...]) -> "AreaIndex":
+        obj = cls.__new__(cls)
+        obj.mapping = mapping
+        obj.names = list(mapping)
+        obj._exact, obj._stems = state
+        obj._chars = None
+        obj._results = {}
+        return obj
+
+    def _char_postings(self) -> Dict[str, List[int]]:
+        if self._chars is None:
+            chars: Dict[str, List[int]] = {}
+            for i, name in enumerate(self.names):
+                for ch in set(name):
+                    chars.setdefault(ch, []).append(i)
+            self._chars = chars
+        return self._chars
+
+    def contains(self, s: str) -> List[str]:
+        """名稱裡有 s 的（照 mapping 原順序）"""
+        chars = self._char_postings()
+        postings = []
+        for ch in set(s):
+            p = chars.get(ch)
+            if not p:
+                return []
+            postings.append(p)
+        shortest = min(postings, key=len)
+        return [self.names[i] for i in shortest if s in self.names[i]]
+
+    def _lookup(self, s: str) -> Tuple[str, str, str]:
+        """回傳 (名稱, 代碼, 錯誤訊息)；錯誤訊息裡的 {raw} 由呼叫端換成原輸入"""
+        if s in AREA_ALIASES:
+            target = AREA_ALIASES[s]
+            code = self.mapping.get(target)
+            if not code:
+                return "", "", f"地區「{{raw}}」對應到「{target}」但未找到代碼。"
+            return target, code, ""
+
+        # 直接命中
+        if s in self.mapping:
+            return s, self.mapping[s], ""
+        name = self._exact.get(s)
+        if name is not None:
+            return name, self.mapping[name], ""
+
+        # 省略市/縣：台北 -> 台北市
+        candidates = self._stems.get(s, [])
+        if len(candidates) == 1:
+            return candidates[0], self.mapping[candidates[0]], ""
+
+        # 模糊包含：輸入「桃園」匹配到「桃園市」
+        fuzzy = self.contains(s)
+        if len(fuzzy) == 1:
+            return fuzzy[0], self.mapping[fuzzy[0]], ""
+        if len(fuzzy) > 1:
+            options = "、".join(fuzzy[:10])
+            return "", "", f"地區「{{raw}}」匹配到多個可能：{options}（請輸入更完整名稱）"
+
+        return "", "", f"找不到地區「{{raw}}」。可用縣市例如：{', '.join(sorted(self.names)[:10])} ..."
+
+    def resolve(self, user_input: str) -> AreaResolveResult:
+        raw = user_input or ""
+        s = _normalize_text(raw)
+        if not s:
+            raise ValueError("地區不可為空。")
+        hit = self._results.get(s)
+        if hit is None:
+            hit = self._results[s] = self._lookup(s)
+        name, code, error = hit
+        if error:
+            raise ValueError(error.replace("{raw}", raw))
+        return AreaResolveResult(raw, s, name, code)
+
+    def resolve_many(self, text: str) -> List[AreaResolveResult]:
+        parts = [p.strip() for p in _SPLIT_RE.split(text or "") if p.strip()]
+        if not parts:
+            raise ValueError("地區不可為空。")
+        return [self.resolve(p) for p in parts]
 
 
 def resolve_area(user_input: str, force_refresh: bool = False) -> AreaResolveResult:
-    raw = user_input or ""
-    s = _normalize_text(raw)
-    if not s:
-        raise ValueError("地區不可為空。")
+    if force_refresh:
+        refresh_area_mapping()
+    return _current_index().resolve(user_input)
 
-    mapping = get_area_mapping(force_refresh=force_refresh)
 
-    # 常見別名
-    alias = {
-        "新竹": "新竹縣市",
-        "嘉義": "嘉義縣市",
-    }
-    if s in alias:
-        target = alias[s]
-        code = mapping.get(target)
-        if not code:
-            raise ValueError(f"地區「{raw}」對應到「{target}」但未找到代碼。")
-        return AreaResolveResult(raw, s, target, code)
-
-    # 直接命中
-    if s in mapping:
-        return AreaResolveResult(raw, s, s, mapping[s])
-
-    # 省略市/縣：台北 -> 台北市
-    candidates: List[Tuple[str, str]] = []
-    for suffix in ("市", "縣", "縣市"):
-        name = s + suffix
-        if name in mapping:
-            candidates.append((name, mapping[name]))
-
-    if len(candidates) == 1:
-        name, code = candidates[0]
-        return AreaResolveResult(raw, s, name, code)
+def resolve_many(areas_text: str, force_refresh: bool = False,
+                 expand_districts: bool = False) -> List[AreaResolveResult]:
+    """
+    一次解析整串地區（逗號 / 全形逗號 / 頓號分隔），照輸入順序回傳；任何一個失敗就丟 ValueError
+    expand_districts：縣市展開成底下每一個區（各自一筆結果，重複的區只留一次）
+    """
+    if force_refresh:
+        refresh_area_mapping()
+    resolved = _current_index().resolve_many(areas_text)
+    if not expand_districts:
+        return resolved
+    tree = get_area_tree()
+    out: List[AreaResolveResult] = []
+    seen = set()
+    for r in resolved:
+        for code in tree.expand([r.area_code]):
+            if code not in seen:
+                seen.add(code)
+                out.append(AreaResolveResult(r.input_text, r.normalized, tree.name(code), code))
+    return out
+
+
+# -------------------------
+# 縣市 / 區 樹
+# -------------------------
+def _city_code(code: str) -> str:
+    return code[:7] + "000"
+
+
+class AreaTree:
+    """
+    縣市 -> 區 的樹（從扁平 mapping 建一次）
+    - name(code)：縣市回「桃園市」、區回「桃園市龜山區」（Area.json 的區名有時自帶縣市，會去掉重複）
+    - code(name)：完整名稱 / 縣市+區 都查得到（臺/台、空白不影響）
+    - parent(code) / children(code) / is_city(code)
+    - expand(codes)：縣市換成底下所有區、區照原樣，去重並保持順序
+    """
 
-    # 模糊包含：輸入「桃園」匹配到「桃園市」
-    fuzzy = [(k, v) for k, v in mapping.items() if s in k]
-    if len(fuzzy) == 1:
-        name, code = fuzzy[0]
-        return AreaResolveResult(raw, s, name, code)
+    __slots__ = ("_mapping", "_names", "_codes", "_children")
+
+    def __init__(self, mapping: Dict[str, str]):
+        self._mapping = mapping
+        self._names: Dict[str, str] = {}                # code -> 顯示名稱
+        self._codes: Optional[Dict[str, str]] = None    # 正規化名稱 -> code（第一次 code() 才建）
+        children: Dict[str, List[str]] = {}
+
+        for name, code in mapping.items():
+            if code == _city_code(code):
+                self._names.setdefault(code, name)
+                children.setdefault(code, [])
+        for name, code in mapping.items():
+            city = _city_code(code)
+            if code == city or code in self._names:
+                continue
+            city_name = self._names.get(city)
+            if city_name is None:
+                # 上層縣市不在 mapping 裡：當成沒有上層的獨立節點
+                self._names[code] = name
+                continue
+            short = name
+            while city_name and short.startswith(city_name) and len(short) > len(city_name):
+                short = short[len(city_name):]
+            self._names[code] = city_name + short
+            children[city].append(code)
+        self._children: Dict[str, Tuple[str, ...]] = {c: tuple(v) for c, v in children.items()}
+
+    def to_state(self) -> Tuple[Any, ...]:
+        return (self._names, self._children)
+
+    @classmethod
+    def from_state(cls, mapping: Dict[str, str], state: Tuple[Any, ...]) -> "AreaTree":
+        obj = cls.__new__(cls)
+        obj._mapping = mapping
+        obj._names, obj._children = state
+        obj._codes = None
+        return obj
+
+    def _code_lookup(self) -> Dict[str, str]:
+        if self._codes is None:
+            codes: Dict[str, str] = {}
+            for name, code in self._mapping.items():
+                codes.setdefault(_normalize_text(name), code)
+                display = self._names.get(code)
+                if display and display != name:
+                    codes.setdefault(_normalize_text(display), code)
+            self._codes = codes
+        return self._codes
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._names
+
+    def name(self, code: str) -> str:
+        return self._names.get(code, "")
+
+    def code(self, name: str) -> Optional[str]:
+        return self._code_lookup().get(_normalize_text(name))
+
+    def is_city(self, code: str) -> bool:
+        return code in self._children
+
+    def parent(self, code: str) -> Optional[str]:
+        city = _city_code(code)
+        if code == city or city not in self._children:
+            return None
+        return city
+
+    def children(self, code: str) -> Tuple[str, ...]:
+        return self._children.get(code, ())
+
+    def cities(self) -> List[str]:
+        return list(self._children)
+
+    def expand(self, codes: Iterable[str]) -> List[str]:
+        out: List[str] = []
+        seen = set()
+        for code in codes:
+            for c in self._children.get(code) or (code,):
+                if c not in seen:
+                    seen.add(c)
+                    out.append(c)
+        return out
+
+    def label(self, codes: Iterable[str], sep: str = ",") -> str:
+        """代碼 -> 顯示名稱（報表用）；查不到的照原代碼"""
+        return sep.join(self._names.get(c) or c for c in codes)
+
+
+def area_name(code: str) -> str:
+    return get_area_tree().name(code)
 
-    if len(fuzzy) > 1:
-        options = "、".join(k for k, _ in fuzzy[:10])
-        raise ValueError(f"地區「{raw}」匹配到多個可能：{options}（請輸入更完整名稱）")
 
-    raise ValueError(f"找不到地區「{raw}」。可用縣市例如：{', '.join(list_supported_areas()[:10])} ...")
+def expand_area_codes(area_codes_csv: str) -> str:
+    """「6001005000,6001001003」-> 桃園市所有區 + 6001001003"""
+    codes = [c.strip() for c in (area_codes_csv or "").split(",") if c.strip()]
+    return ",".join(get_area_tree().expand(codes))
 
 
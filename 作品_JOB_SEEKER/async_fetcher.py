@@ -0,0 +1,334 @@
+# 張詠鈞的python工作區
+# File: async_fetcher
+# Created: 2026/2/7 上午 10:20
+
+# async_fetcher.py
+# 104 JSON 清單 API 的 asyncio 分頁抓取引擎：
+# - 多頁同時抓（concurrency 上限）
+# - token bucket 控制每秒請求數（取代固定 sleep）
+# - 某頁回空就停止，後面的頁不再送出
+# - 回傳結果依頁碼排序
+#
+# 底層仍是 requests（同步），用 asyncio.to_thread 丟到執行緒跑；
+# fetch_page 可替換，方便接本機替身伺服器或其他抓取策略做離線 benchmark。
+#
+# iter_pages()：串流版，依頁碼一頁一頁 yield 給呼叫端（邊抓邊寫 CSV / DB），
+# 呼叫端處理不完時抓取端會停下來等（backpressure），記憶體只放得下幾頁。
+
+import asyncio
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+PageFetcher = Callable[[int], Dict[str, Any]]
+RowsParser = Callable[[Dict[str, Any]], List[Dict[str, str]]]
+StopPredicate = Callable[[int, List[Dict[str, str]]], bool]
+PageSink = Callable[["PageResult"], Awaitable[None]]
+
+
+class TokenBucket:
+    """
+    非同步 token bucket：
+    rate = 每秒補充幾個 token，capacity = 最多可累積幾個（允許的瞬間爆量）
+    rate <= 0 代表不限速
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                # 算出還差多少 token，睡剛好需要的時間
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+@dataclass
+class PageResult:
+    page: int
+    rows: List[Dict[str, str]] = field(default_factory=list)
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class FetchReport:
+    pages: List[PageResult]
+    stopped_at: Optional[int]     # 決定停止的那一頁；它本身還算，之後的頁不會送出
+    elapsed: float
+
+    def included(self, page_no: int) -> bool:
+        return self.stopped_at is None or page_no <= self.stopped_at
+
+    @property
+    def rows(self) -> List[Dict[str, str]]:
+        """依頁碼串起來的所有 rows（停止頁之後截斷；停止頁本身有 rows 就保留）"""
+        out: List[Dict[str, str]] = []
+        for p in self.pages:
+            if not self.included(p.page):
+                break
+            out.extend(p.rows)
+        return out
+
+    @property
+    def errors(self) -> List[PageResult]:
+        return [p for p in self.pages if p.error is not None]
+
+
+class _StopState:
+    """
+    stop：決定停止的那一頁。它本身照常交給呼叫端（有 rows 就保留、回空 / 失敗也看得到），
+    > stop 的頁不再送出、也不交出去
+    並行時較後面的頁可能先判定停止，之後較前面的頁再停就以前面的為準
+    """
+
+    def __init__(self):
+        self.stop: Optional[int] = None
+
+    def after_stop(self, page_no: int) -> bool:
+        return self.stop is not None and page_no > self.stop
+
+    def mark(self, page_no: int) -> None:
+        if self.stop is None or page_no < self.stop:
+            self.stop = page_no
+
+
+async def fetch_pages_async(
+    fetch_page: PageFetcher,
+    parse_rows: RowsParser,
+    max_pages: int = 3,
+    concurrency: int = 4,
+    rps: float = 2.0,
+    burst: Optional[float] = None,
+    should_stop: Optional[StopPredicate] = None,
+) -> FetchReport:
+    """
+    fetch_page(page_no) -> payload（同步函式，會被丟到 thread 執行）
+    parse_rows(payload) -> rows
+    should_stop(page_no, rows)：回 True 代表「這頁之後不用再抓」（預設：rows 為空就停）
+
+    停止規則：
+    - 某頁回空 / should_stop 成立 -> 記下 stop 頁，之後尚未送出的頁全部取消
+      （停止頁本身的 rows 仍保留給呼叫端，例如增量模式部分重疊）
+    - 某頁抓取失敗 -> 視同停在該頁（與原本 main() 遇錯就 break 一致）
+    """
+    if max_pages <= 0:
+        return FetchReport(pages=[], stopped_at=None, elapsed=0.0)
+
+    if should_stop is None:
+        def should_stop(_page: int, rows: List[Dict[str, str]]) -> bool:
+            return not rows
+
+    bucket = TokenBucket(rps, burst)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    state = _StopState()
+    t0 = time.perf_counter()
+
+    async def _one(page_no: int) -> PageResult:
+        async with sem:
+            # 排隊期間前面的頁可能已經停了，這頁就不用送了
+            if state.after_stop(page_no):
+                return PageResult(page=page_no)
+            await bucket.acquire()
+            if state.after_stop(page_no):
+                return PageResult(page=page_no)
+
+            p0 = time.perf_counter()
+            try:
+                payload = await asyncio.to_thread(fetch_page, page_no)
+                rows = parse_rows(payload)
+            except Exception as e:
+                state.mark(page_no)
+                return PageResult(page=page_no, error=e, elapsed=time.perf_counter() - p0)
+
+            res = PageResult(page=page_no, rows=rows, elapsed=time.perf_counter() - p0)
+            if should_stop(page_no, rows):
+                state.mark(page_no)
+            return res
+
+    results = await asyncio.gather(*(_one(p) for p in range(1, max_pages + 1)))
+    results.sort(key=lambda r: r.page)
+
+    return FetchReport(pages=results, stopped_at=state.stop, elapsed=time.perf_counter() - t0)
+
+
+def fetch_pages(
+    fetch_page: PageFetcher,
+    parse_rows: RowsParser,
+    max_pages: int = 3,
+    concurrency: int = 4,
+    rps: float = 2.0,
+    burst: Optional[float] = None,
+    should_stop: Optional[StopPredicate] = None,
+) -> FetchReport:
+    """同步入口（main() / UI worker thread 用）"""
+    return asyncio.run(fetch_pages_async(
+        fetch_page,
+        parse_rows,
+        max_pages=max_pages,
+        concurrency=concurrency,
+        rps=rps,
+        burst=burst,
+        should_stop=should_stop,
+    ))
+
+
+async def stream_pages_async(
+    fetch_page: PageFetcher,
+    parse_rows: RowsParser,
+    emit: PageSink,
+    max_pages: int = 3,
+    concurrency: int = 4,
+    rps: float = 2.0,
+    burst: Optional[float] = None,
+    should_stop: Optional[StopPredicate] = None,
+    max_buffered: int = 2,
+) -> Optional[int]:
+    """
+    跟 fetch_pages_async 同樣的抓取 / 停止規則，但結果不累積：
+    每頁依頁碼順序交給 await emit(page_result)，停止頁本身會交出、之後的頁不會
+    - 同時「抓取中 + 等待交出」的頁數上限 = concurrency + max_buffered
+      emit 慢（下游寫 DB 卡住）時，後面的頁就不會再送出請求
+    回傳停止頁（沒有停就是 None）
+    """
+    if max_pages <= 0:
+        return None
+
+    if should_stop is None:
+        def should_stop(_page: int, rows: List[Dict[str, str]]) -> bool:
+            return not rows
+
+    bucket = TokenBucket(rps, burst)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    window = asyncio.Semaphore(max(1, concurrency) + max(0, max_buffered))
+    emit_lock = asyncio.Lock()
+    ready: Dict[int, PageResult] = {}
+    state = _StopState()
+    cursor = {"next": 1}
+
+    async def _flush() -> None:
+        # 只有「前面的頁都交出去了」才交這一頁，確保依頁碼順序
+        async with emit_lock:
+            while cursor["next"] in ready:
+                res = ready.pop(cursor["next"])
+                cursor["next"] += 1
+                try:
+                    if not state.after_stop(res.page):
+                        await emit(res)
+                finally:
+                    window.release()
+
+    async def _fetch(page_no: int) -> PageResult:
+        async with sem:
+            if state.after_stop(page_no):
+                return PageResult(page=page_no)
+            await bucket.acquire()
+            if state.after_stop(page_no):
+                return PageResult(page=page_no)
+
+            p0 = time.perf_counter()
+            try:
+                payload = await asyncio.to_thread(fetch_page, page_no)
+                rows = parse_rows(payload)
+            except Exception as e:
+                state.mark(page_no)
+                return PageResult(page=page_no, error=e, elapsed=time.perf_counter() - p0)
+
+            if should_stop(page_no, rows):
+                state.mark(page_no)
+            return PageResult(page=page_no, rows=rows, elapsed=time.perf_counter() - p0)
+
+    async def _one(page_no: int) -> None:
+        await window.acquire()
+        ready[page_no] = await _fetch(page_no)
+        await _flush()
+
+    await asyncio.gather(*(_one(p) for p in range(1, max_pages + 1)))
+    return state.stop
+
+
+_STREAM_DONE = object()
+
+
+def iter_pages(
+    fetch_page: PageFetcher,
+    parse_rows: RowsParser,
+    max_pages: int = 3,
+    concurrency: int = 4,
+    rps: float = 2.0,
+    burst: Optional[float] = None,
+    should_stop: Optional[StopPredicate] = None,
+    max_buffered: int = 2,
+) -> Iterator[PageResult]:
+    """
+    同步串流入口：for page in iter_pages(...) 依頁碼拿到每頁結果
+    抓取在背景 thread 的 event loop 跑；呼叫端中途 break / 丟例外時，背景抓取會跟著收掉
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_buffered))
+    cancelled = threading.Event()
+    failure: List[BaseException] = []
+
+    def _put(item: Any) -> None:
+        # 佇列滿就等（backpressure）；呼叫端已放棄就不要卡住
+        while not cancelled.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    async def _emit(res: PageResult) -> None:
+        if cancelled.is_set():
+            raise asyncio.CancelledError()
+        await asyncio.to_thread(_put, res)
+
+    def _producer() -> None:
+        try:
+            asyncio.run(stream_pages_async(
+                fetch_page,
+                parse_rows,
+                _emit,
+                max_pages=max_pages,
+                concurrency=concurrency,
+                rps=rps,
+                burst=burst,
+                should_stop=should_stop,
+                max_buffered=0,
+            ))
+        except asyncio.CancelledError:
+            pass
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            _put(_STREAM_DONE)
+
+    t = threading.Thread(target=_producer, name="iter-pages", daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _STREAM_DONE:
+                break
+            yield item
+        if failure:
+            raise failure[0]
+    finally:
+        cancelled.set()
+        t.join()
@@ -0,0 +1,395 @@
+# 張詠鈞的python工作區
+# File: batch_search
+# Created: 2026/2/21 上午 09:15
+
+# batch_search.py
+# 批次搜尋：多個關鍵字 × 多組地區，一個 process 跑完
+# - 從 json 檔讀「已存搜尋」，展開成 (keyword, areas) 矩陣
+# - 所有搜尋共用同一個 HTTP session / cookie bootstrap / DB 連線 / 地區解析結果
+# - 同一個 job_id 在多個搜尋出現時只保留一份資料（統計重複數）
+# - 每個搜尋各自輸出一份 CSV 快照 + 寫入 DB 快照（--parquet 另外輸出欄式快照，見 snapshot_columnar）
+# - --cdc：DB 改用 cdc 儲存（只存內容有變的版本，見 job_MSSQL_db）
+#
+# 用法：python batch_search.py saved_searches.json [--parquet] [--cdc]
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import job_MSSQL_db as job_db
+import job_seeker
+from area_mapper import AreaResolveResult, resolve_many
+from async_fetcher import fetch_pages
+from incremental_crawl import crawl_incremental
+from job_row import JobRow
+from http_cache import get_default_cache
+from http_transport import Transport, TransportConfig
+from resilience import Resilience
+from run_metrics import RunMetrics
+from session_bootstrap import SessionBootstrap
+from snapshot_columnar import DEFAULT_COLUMNAR_DIR, write_columnar
+
+DEFAULT_CSV_DIR = os.path.join(os.path.dirname(__file__), "csv_file")
+
+
+@dataclass
+class SearchSpec:
+    keyword: str
+    areas_text: str
+    max_pages: int = 3
+    name: str = ""
+    incremental: bool = False
+    schedule: str = ""        # cron 5 欄位（scheduler_daemon.py 用；空字串 = 用 daemon 預設）
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.keyword, self.areas_text)
+
+
+@dataclass
+class SearchResult:
+    spec: SearchSpec
+    area_names: str = ""
+    rows: List[JobRow] = field(default_factory=list)
+    csv_path: str = ""
+    columnar_path: str = ""
+    inserted: int = 0
+    new_ids: List[str] = field(default_factory=list)
+    removed_ids: List[str] = field(default_factory=list)
+    error: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class BatchReport:
+    results: List[SearchResult] = field(default_factory=list)
+    unique_jobs: int = 0
+    duplicate_hits: int = 0
+    elapsed: float = 0.0
+    resilience: str = ""
+    transport: str = ""       # 連線池統計（新連線 / 重用 / 線上 bytes）
+    timing: str = ""          # run_metrics 摘要（各段耗時 + 計數器）
+
+    @property
+    def failed(self) -> List[SearchResult]:
+        return [r for r in self.results if not r.ok]
+
+
+# -------------------------
+# 讀取已存搜尋
+# -------------------------
+def _as_list(v: Any) -> List[str]:
+    if isinstance(v, str):
+        return [v]
+    return [str(x) for x in (v or [])]
+
+
+def load_saved_searches(path: str) -> List[SearchSpec]:
+    """
+    檔案格式（json）：
+    {
+      "max_pages": 3,
+      "searches": [
+        {"name": "北部", "keywords": ["Python工程師", "資料工程師"], "area_sets": ["台北市,新北市", "桃園市"]},
+        {"keyword": "C#", "areas": "台中市", "max_pages": 5, "incremental": true, "schedule": "30 8 * * 1-5"}
+      ]
+    }
+    每一筆會展開成 keywords × area_sets 個搜尋；重複的 (keyword, areas) 只跑一次
+    incremental：遇到上次快照已知的職缺就停止翻頁（見 incremental_crawl.py）
+    schedule：排程（cron 格式，見 scheduler_daemon.py）；最外層的 schedule 為預設值
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+
+    default_pages = int(obj.get("max_pages", 3))
+    specs: List[SearchSpec] = []
+    seen = set()
+    for s in obj.get("searches") or []:
+        keywords = _as_list(s.get("keywords") or s.get("keyword"))
+        area_sets = _as_list(s.get("area_sets") or s.get("areas"))
+        pages = int(s.get("max_pages", default_pages))
+        incremental = bool(s.get("incremental", obj.get("incremental", False)))
+        schedule = str(s.get("schedule") or obj.get("schedule") or "").strip()
+        for kw in keywords:
+            for areas in area_sets:
+                kw, areas = kw.strip(), areas.replace("，", ",").strip()
+                if not kw or not areas or (kw, areas) in seen:
+                    continue
+                seen.add((kw, areas))
+                specs.append(SearchSpec(kw, areas, pages, str(s.get("name") or ""), incremental, schedule))
+    return specs
+
+
+# -------------------------
+# 共用資源
+# -------------------------
+class AreaResolver:
+    """同一組地區字串只解析一次（單一地區的結果 area_mapper 的索引本身也會記住）"""
+
+    def __init__(self, expand_districts: bool = False):
+        self.expand_districts = expand_districts      # True：縣市展開成底下所有區各自帶代碼
+        self._memo: Dict[str, List[AreaResolveResult]] = {}
+
+    def resolve_csv(self, areas_text: str) -> Tuple[str, str]:
+        resolved = self._memo.get(areas_text)
+        if resolved is None:
+            resolved = self._memo[areas_text] = resolve_many(areas_text, expand_districts=self.expand_districts)
+        codes = ",".join(r.area_code for r in resolved)
+        names = ",".join(r.matched_name for r in resolved)
+        return codes, names
+
+
+class JobDeduper:
+    """跨搜尋去重：同一個 job_id 只留第一次看到的那份 row（後面的搜尋共用同一個物件）"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobRow] = {}
+        self.duplicate_hits = 0
+
+    def add(self, rows: List[JobRow]) -> List[JobRow]:
+        out = []
+        for r in rows:
+            jid = r.job_id
+            if jid in self._jobs:
+                self.duplicate_hits += 1
+                out.append(self._jobs[jid])
+            else:
+                self._jobs[jid] = r
+                out.append(r)
+        return out
+
+    @property
+    def unique_jobs(self) -> int:
+        return len(self._jobs)
+
+
+# -------------------------
+# 執行
+# -------------------------
+def _unique_path(path: str) -> str:
+    if not os.path.exists(path):
+        return path
+    name, ext = os.path.splitext(path)
+    k = 1
+    while os.path.exists(f"{name}_{k:02d}{ext}"):
+        k += 1
+    return f"{name}_{k:02d}{ext}"
+
+
+def run_batch(
+    specs: List[SearchSpec],
+    conn_str: Optional[str] = None,
+    csv_dir: Optional[str] = DEFAULT_CSV_DIR,
+    workers: int = 2,
+    rps: float = 2.0,
+    concurrency: int = 3,
+    write_db: bool = True,
+    columnar_dir: Optional[str] = None,
+    http2: bool = False,
+    expand_districts: bool = False,
+) -> BatchReport:
+    """
+    抓取階段：workers 個搜尋同時跑（總請求速率 rps 平均分給各 worker）
+    寫入階段：在呼叫端 thread 依序寫 CSV / DB（pyodbc 連線不跨 thread 共用）
+    csv_dir=None 不寫 CSV；columnar_dir：有給就另外寫 Parquet 欄式快照
+    http2：有裝 httpx[http2] 才會生效（見 http_transport.py）
+    expand_districts：地區裡的縣市展開成所有區代碼（見 area_mapper.AreaTree）
+    """
+    t0 = time.perf_counter()
+    metrics = RunMetrics("batch", searches=[f"{s.keyword}@{s.areas_text}" for s in specs])
+    cache_stats = get_default_cache().stats
+    bytes_before = cache_stats.bytes_fetched
+    conn_str = conn_str or job_seeker.CONN_STR
+    if csv_dir:
+        os.makedirs(csv_dir, exist_ok=True)
+
+    # 連線池依同時在飛的請求數開：workers 個搜尋 × 每個搜尋 concurrency 頁
+    in_flight = max(1, workers) * max(1, concurrency)
+    transport = Transport(TransportConfig(pool_maxsize=max(16, in_flight), max_per_host=max(8, in_flight),
+                                          http2=http2))
+    session = job_seeker.build_session(transport)
+    bootstrap = SessionBootstrap(base_url=job_seeker.BASE_URL_104, user_agent=job_seeker.UA)
+    # 所有搜尋共用同一個斷路器：被擋時全部 worker 一起暫停
+    resilience = Resilience(bootstrap=bootstrap)
+    areas = AreaResolver(expand_districts=expand_districts)
+    deduper = JobDeduper()
+    workers = max(1, workers)
+    per_worker_rps = rps / workers if rps > 0 else 0
+
+    # 地區先在主 thread 解析完（resolve 失敗的搜尋直接記錯，不進抓取）
+    results: List[SearchResult] = []
+    jobs: List[Tuple[SearchResult, str]] = []
+    for spec in specs:
+        res = SearchResult(spec=spec)
+        results.append(res)
+        try:
+            with metrics.span("area_resolve"):
+                codes, res.area_names = areas.resolve_csv(spec.areas_text)
+        except Exception as e:
+            res.error = f"地區解析失敗：{e}"
+            continue
+        jobs.append((res, codes))
+
+    def _fetch(res: SearchResult, codes: str) -> SearchResult:
+        s0 = time.perf_counter()
+        if res.spec.incremental:
+            # 增量模式要讀 DB 上次快照；pyodbc 連線不跨 thread，所以這裡自己開
+            with metrics.span("incremental_fetch"):
+                inc = crawl_incremental(
+                    session,
+                    keyword=res.spec.keyword,
+                    area_codes_csv=codes,
+                    area_names=res.area_names,
+                    conn_str=conn_str,
+                    max_pages=res.spec.max_pages,
+                    bootstrap=bootstrap,
+                    rps=per_worker_rps,
+                    resilience=resilience,
+                )
+            res.rows = inc.rows
+            res.elapsed = time.perf_counter() - s0
+            return res
+
+        fetch, parse = resilience.page_fetcher(session, res.spec.keyword, codes)
+        with metrics.span("fetch"):
+            report = fetch_pages(
+                fetch,
+                parse,
+                max_pages=res.spec.max_pages,
+                concurrency=concurrency,
+                rps=per_worker_rps,
+            )
+        metrics.add("pages", sum(1 for p in report.pages if p.rows))
+        res.rows = report.rows
+        if not res.rows and report.errors:
+            res.error = f"抓取失敗：{report.errors[0].error}"
+        res.elapsed = time.perf_counter() - s0
+        return res
+
+    conn = job_db.connect(conn_str) if write_db else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(_fetch, res, codes) for res, codes in jobs]
+            for fut in futures:
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    # _fetch 自己會把抓取錯誤記在 res；到這裡是意料外的錯
+                    print(f"[ERR] 批次工作失敗：{e}")
+                    continue
+                if res.error or not res.rows:
+                    continue
+                _write_result(res, deduper, csv_dir, conn_str, conn, columnar_dir, metrics)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    metrics.add("rows", sum(len(r.rows) for r in results))
+    metrics.add("bytes", cache_stats.bytes_fetched - bytes_before)
+    metrics.add("bytes_wire", transport.stats.bytes_wire)
+    metrics.add("connections", transport.stats.connections)
+    metrics.add("retries", resilience.stats.retries)
+    metrics.add("inserted", sum(r.inserted for r in results))
+    if write_db:
+        # 跟 UI 一樣：有送進 DB 但被忽略（同日已存在）的筆數；跨搜尋重複的 rows 還是會寫，見 report.duplicate_hits
+        metrics.add("skipped", sum(len(r.rows) - r.inserted for r in results if r.ok and r.rows))
+    failed = [r for r in results if not r.ok]
+    metrics.finish(status="error" if failed else "ok", error="; ".join(r.error for r in failed[:3]))
+
+    return BatchReport(
+        results=results,
+        unique_jobs=deduper.unique_jobs,
+        duplicate_hits=deduper.duplicate_hits,
+        elapsed=time.perf_counter() - t0,
+        resilience=resilience.stats.summary(),
+        transport=transport.stats.summary(),
+        timing=metrics.summary(),
+    )
+
+
+def _write_result(
+    res: SearchResult,
+    deduper: JobDeduper,
+    csv_dir: Optional[str],
+    conn_str: str,
+    conn: Any,
+    columnar_dir: Optional[str] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> None:
+    spec = res.spec
+    res.rows = deduper.add(res.rows)
+    metrics = metrics or RunMetrics("batch_write", log_path=None)
+
+    if csv_dir:
+        out_name = f"{job_seeker.now_tag()}_104_{job_seeker.safe_filename(spec.keyword)}_{job_seeker.safe_filename(res.area_names)}.csv"
+        res.csv_path = _unique_path(os.path.join(csv_dir, out_name))
+        with metrics.span("csv_write"):
+            job_seeker.write_csv(res.rows, res.csv_path, keyword=spec.keyword, areas_text=res.area_names)
+    if columnar_dir:
+        with metrics.span("columnar_write"):
+            res.columnar_path = write_columnar(res.rows, columnar_dir, keyword=spec.keyword,
+                                               areas_text=res.area_names)
+
+    if conn is None:
+        return
+    try:
+        with metrics.span("db_insert"):
+            res.inserted = job_db.insert_snapshot_rows(
+                rows=res.rows, keyword=spec.keyword, areas=res.area_names, conn_str=conn_str, conn=conn
+            )
+        with metrics.span("diff"):
+            res.new_ids, res.removed_ids, _, _ = job_db.diff_today_yesterday(
+                keyword=spec.keyword, areas=res.area_names, conn_str=conn_str, conn=conn
+            )
+    except Exception as e:
+        res.error = f"DB 寫入失敗：{e}"
+
+
+def print_report(report: BatchReport) -> None:
+    for r in report.results:
+        label = f"{r.spec.keyword} @ {r.area_names or r.spec.areas_text}"
+        if r.ok:
+            print(f"[OK] {label}：{len(r.rows)} 筆，DB 新增 {r.inserted}，"
+                  f"新增 {len(r.new_ids)} / 消失 {len(r.removed_ids)}（{r.elapsed:.1f}s）")
+        else:
+            print(f"[ERR] {label}：{r.error}")
+    print(f"[INFO] {len(report.results)} 個搜尋，失敗 {len(report.failed)}；"
+          f"不重複職缺 {report.unique_jobs}，跨搜尋重複 {report.duplicate_hits} 次；"
+          f"總耗時 {report.elapsed:.1f}s")
+    if report.resilience:
+        print(f"[INFO] 容錯：{report.resilience}")
+    if report.transport:
+        print(f"[INFO] 連線：{report.transport}")
+    if report.timing:
+        print(f"[TIME] {report.timing}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法：python batch_search.py saved_searches.json [--parquet] [--cdc]")
+        return 2
+
+    specs = load_saved_searches(argv[0])
+    if not specs:
+        print("[ERR] 檔案裡沒有可執行的搜尋")
+        return 2
+
+    if "--cdc" in argv[1:]:
+        job_db.STORAGE_MODE = job_db.STORAGE_CDC
+
+    report = run_batch(specs, columnar_dir=DEFAULT_COLUMNAR_DIR if "--parquet" in argv[1:] else None)
+    print_report(report)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# 張詠鈞的python工作區
+# File: bench_area_resolve
+# Created: 2026/3/9 上午 10:30
+
+# bench_area_resolve.py
+# 微 benchmark：地區解析 cold（每次丟掉記憶、重新載入編譯索引 / cache json）vs warm（process 內記憶）
+# 啟動時間（import + 第一次解析）見 bench_area_startup.py
+# 用 area_cache_104.json 複製一份到暫存檔（時間戳記改成現在），不會打網路、也不會動到原本的 cache 檔
+# 最後順便驗證：
+# - cache 檔 mtime 變了，記憶會自動失效重讀
+# - cache 過期時（stale-while-revalidate）解析不等下載：下載用 sleep 模擬，不會真的打網路
+#
+# 用法：python bench_area_resolve.py --areas 台北市,新北市,桃園市 --repeat 2000
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+
+import area_mapper
+
+
+def _resolve_all(areas: List[str]) -> str:
+    return ",".join(r.area_code for r in area_mapper.resolve_many(",".join(areas)))
+
+
+def measure(fn: Callable[[], None], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def _prepare_cache(src: str, dst: str, age: float = 0.0) -> int:
+    with open(src, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+    obj["_fetched_at"] = int(time.time() - age)
+    with open(dst, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    return len(obj.get("mapping") or {})
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="地區解析 cold vs warm")
+    ap.add_argument("--areas", default="台北市,新北市,桃園市")
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--cache-file", default=area_mapper.CACHE_FILE)
+    ap.add_argument("--fetch-delay", type=float, default=0.5, help="模擬 Area.json 下載耗時（秒）")
+    args = ap.parse_args()
+
+    areas = [a.strip() for a in args.areas.replace("，", ",").split(",") if a.strip()]
+    tmp_dir = tempfile.mkdtemp(prefix="bench_area_")
+    try:
+        area_mapper.CACHE_FILE = os.path.join(tmp_dir, "area_cache_104.json")
+        entries = _prepare_cache(args.cache_file, area_mapper.CACHE_FILE)
+        print(f"[INFO] cache 檔 {entries} 筆，解析 {areas} × {args.repeat} 次")
+
+        def cold() -> None:
+            area_mapper.invalidate_area_mapping()
+            _resolve_all(areas)
+
+        def warm() -> None:
+            _resolve_all(areas)
+
+        expected = _resolve_all(areas)
+        print(f"{'mode':<8}{'µs/call':>12}{'µs/area':>12}")
+        base = None
+        for name, fn in (("cold", cold), ("warm", warm)):
+            per = measure(fn, args.repeat)
+            base = base or per
+            print(f"{name:<8}{per * 1e6:>12.1f}{per * 1e6 / len(areas):>12.1f}"
+                  + ("" if per == base else f"   ({base / per:.0f}x faster)"))
+        print(f"[INFO] {area_mapper.stats.summary()}")
+
+        # cache 檔被別的 process 更新（mtime 改變）-> 下一次解析會重讀
+        loads = area_mapper.stats.loads
+        st = os.stat(area_mapper.CACHE_FILE)
+        os.utime(area_mapper.CACHE_FILE, (st.st_atime, st.st_mtime + 1))
+        assert _resolve_all(areas) == expected
+        print(f"[INFO] mtime 變更後重讀 {area_mapper.stats.loads - loads} 次（應為 1）")
+
+        # cache 過期：先用舊資料回傳，背景「下載」（sleep 模擬網路）完再換掉
+        with open(area_mapper.CACHE_FILE, "r", encoding="utf-8") as f:
+            mapping = json.load(f)["mapping"]
+
+        def slow_fetch(*_a, **_kw):
+            time.sleep(args.fetch_delay)
+            return mapping
+
+        area_mapper.fetch_area_mapping = slow_fetch
+        _prepare_cache(args.cache_file, area_mapper.CACHE_FILE, age=area_mapper.CACHE_MAX_AGE_SECONDS + 60)
+        t0 = time.perf_counter()
+        assert _resolve_all(areas) == expected
+        first = time.perf_counter() - t0
+        print(f"[INFO] 過期 cache：第一次解析 {first * 1000:.1f}ms（來源 {area_mapper.area_mapping_source()}，"
+              f"模擬下載 {args.fetch_delay * 1000:.0f}ms 在背景）")
+        outcome = area_mapper.wait_for_refresh(timeout=10)
+        print(f"[INFO] 背景更新：ok={outcome.ok}，{outcome.entries} 筆，{outcome.elapsed * 1000:.0f}ms；"
+              f"之後來源 {area_mapper.area_mapping_source()}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# 張詠鈞的python工作區
+# File: bench_area_startup
+# Created: 2026/3/9 下午 04:10
+
+# bench_area_startup.py
+# 啟動 benchmark：每次開一個新的 python process，量「import area_mapper + 第一次解析地區」要多久
+#   eager   ：模擬舊版 — 一開始就 import requests / bs4 / http_transport，再讀縮排 json + 建索引
+#   json    ：網路模組延後 import，但還是讀 json + 建索引（USE_COMPILED_INDEX=False）
+#   compiled：網路模組延後 import，直接載入編譯好的二進位索引（area_cache_104.idx）
+# 用暫存目錄裡的 cache 複本（時間戳記改成現在），不會打網路、也不會動到原本的檔案
+#
+# 用法：python bench_area_startup.py --runs 15
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+if {eager}:
+    import requests, bs4, http_transport  # noqa: F401  舊版 area_mapper 最上面就 import 這些
+import area_mapper
+t1 = time.perf_counter()
+area_mapper.CACHE_FILE = {cache_file!r}
+area_mapper.USE_COMPILED_INDEX = {compiled}
+area_mapper.resolve_many({areas!r})
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "resolve": t2 - t1, "net": "requests" in sys.modules,
+                   "stats": area_mapper.stats.summary()}}))
+"""
+
+MODES = (
+    ("eager", True, False),
+    ("json", False, False),
+    ("compiled", False, True),
+)
+
+
+def run_child(cache_file: str, areas: str, eager: bool, compiled: bool) -> Dict:
+    code = _CHILD.format(eager=eager, compiled=compiled, cache_file=cache_file, areas=areas)
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["wall"] = time.perf_counter() - t0
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="area_mapper 冷啟動：json vs 編譯索引")
+    ap.add_argument("--runs", type=int, default=15)
+    ap.add_argument("--areas", default="台北市,新北市,桃園")
+    ap.add_argument("--cache-file", default=os.path.join(HERE, "area_cache_104.json"))
+    args = ap.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_area_startup_")
+    try:
+        cache_file = os.path.join(tmp_dir, "area_cache_104.json")
+        with open(args.cache_file, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        obj["_fetched_at"] = int(time.time())
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] cache json {os.path.getsize(cache_file) / 1024:.0f}KB，每種模式 {args.runs} 個 process")
+
+        # 先跑一次把 .idx 編出來（之後 compiled 模式都是讀現成的）
+        run_child(cache_file, args.areas, eager=False, compiled=True)
+        idx = os.path.splitext(cache_file)[0] + ".idx"
+        print(f"[INFO] 編譯索引 {os.path.getsize(idx) / 1024:.0f}KB")
+
+        print(f"{'mode':<10}{'import ms':>11}{'resolve ms':>12}{'total ms':>10}{'process ms':>12}  requests?")
+        for name, eager, compiled in MODES:
+            runs: List[Dict] = [run_child(cache_file, args.areas, eager, compiled) for _ in range(args.runs)]
+            imp = statistics.median(r["import"] for r in runs) * 1000
+            res = statistics.median(r["resolve"] for r in runs) * 1000
+            wall = statistics.median(r["wall"] for r in runs) * 1000
+            print(f"{name:<10}{imp:>11.2f}{res:>12.2f}{imp + res:>10.2f}{wall:>12.1f}  "
+                  f"{'yes' if runs[-1]['net'] else 'no'}")
+        print(f"[INFO] 最後一次 compiled：{runs[-1]['stats']}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# 張詠鈞的python工作區
+# File: bench_fetch
+# Created: 2026/3/1 下午 03:05
+
+# bench_fetch.py
+# 抓取策略 benchmark：對本機 104 替身伺服器（stand_in_server.py）跑各種抓取方式，
+# 輸出 pages/s、rows/s、總耗時，改動抓取程式後可以比對有沒有退步。
+#
+# 策略：
+#   sequential   逐頁抓、每頁都重種 cookie、頁與頁之間固定 sleep（舊版 main() 的做法）
+#   async        async_fetcher + token bucket + cookie bootstrap
+#   async_cache  同上，但快取已暖（第二次重跑 pipeline 的情況）
+#   playwright   瀏覽器池 + 事件驅動攔截（要有裝 playwright 才會跑）
+#
+# 用法：python bench_fetch.py --pages 10 --latency-ms 150 --rps 0 --strategies sequential,async
+
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import job_seeker
+from async_fetcher import fetch_pages
+from http_cache import ResponseCache
+from session_bootstrap import SessionBootstrap
+from stand_in_server import StandInConfig, StandInServer, start_stand_in
+
+STRATEGIES = ("sequential", "async", "async_cache", "playwright")
+
+BENCH_KEYWORD = "Python"
+BENCH_AREA_CODES = "6001001000"
+
+
+@dataclass
+class BenchResult:
+    strategy: str
+    pages: int = 0
+    rows: int = 0
+    elapsed: float = 0.0
+    requests: int = 0
+    error: str = ""
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+# -------------------------
+# 各策略：回傳 (頁數, 筆數)
+# -------------------------
+def _run_sequential(base_url: str, max_pages: int, args: argparse.Namespace, tmp: str) -> Tuple[int, int]:
+    session = job_seeker.build_session()
+    cache = ResponseCache(cache_dir=os.path.join(tmp, "cache_off"), mode="off")
+    pages = rows = 0
+    for p in range(1, max_pages + 1):
+        payload = job_seeker.fetch_104_jobs_json(
+            session, BENCH_KEYWORD, BENCH_AREA_CODES, page=p, base_url=base_url, cache=cache
+        )
+        got = job_seeker.normalize_jobs(payload)
+        if not got:
+            break
+        pages += 1
+        rows += len(got)
+        time.sleep(args.page_sleep)
+    return pages, rows
+
+
+def _run_async(base_url: str, max_pages: int, args: argparse.Namespace, tmp: str,
+               cache: Optional[ResponseCache] = None) -> Tuple[int, int]:
+    session = job_seeker.build_session()
+    bootstrap = SessionBootstrap(base_url=base_url, user_agent=job_seeker.UA,
+                                 cookie_file=os.path.join(tmp, "cookies.json"))
+    cache = cache or ResponseCache(cache_dir=os.path.join(tmp, "cache_off"), mode="off")
+    report = fetch_pages(
+        lambda page: job_seeker.fetch_104_jobs_json(
+            session, BENCH_KEYWORD, BENCH_AREA_CODES, page=page, base_url=base_url,
+            bootstrap=bootstrap, cache=cache,
+        ),
+        job_seeker.normalize_jobs,
+        max_pages=max_pages,
+        concurrency=args.concurrency,
+        rps=args.rps,
+    )
+    if report.errors and not report.rows:
+        raise RuntimeError(report.errors[0].error)
+    return sum(1 for p in report.pages if p.rows), len(report.rows)
+
+
+def _run_playwright(base_url: str, max_pages: int, args: argparse.Namespace, tmp: str) -> Tuple[int, int]:
+    from browser_pool import BrowserPool
+    from route_filter import RouteFilter
+
+    pool = BrowserPool(size=args.concurrency, headless=True, route_filter=RouteFilter())
+    try:
+        pool.start()
+        rows = job_seeker.fetch_jobs_via_playwright(
+            BENCH_KEYWORD, max_pages=max_pages, area_codes_csv=BENCH_AREA_CODES,
+            pool=pool, base_url=base_url, tabs=args.concurrency,
+        )
+    finally:
+        pool.close()
+    pages = -(-len(rows) // args.page_size) if rows else 0
+    return pages, len(rows)
+
+
+_RUNNERS: Dict[str, Callable[..., Tuple[int, int]]] = {
+    "sequential": _run_sequential,
+    "async": _run_async,
+    "playwright": _run_playwright,
+}
+
+
+def run_strategy(name: str, server: StandInServer, args: argparse.Namespace) -> BenchResult:
+    res = BenchResult(strategy=name)
+    before = sum(server.stats.requests.values())
+    with tempfile.TemporaryDirectory(prefix="bench_104_") as tmp:
+        t0 = time.perf_counter()
+        try:
+            if name == "async_cache":
+                # 暖快取那一輪不計：先跑一次，再量第二次
+                cache = ResponseCache(cache_dir=os.path.join(tmp, "cache_warm"), mode="normal")
+                _run_async(server.base_url, args.pages, args, tmp, cache=cache)
+                before = sum(server.stats.requests.values())
+                t0 = time.perf_counter()
+                res.pages, res.rows = _run_async(server.base_url, args.pages, args, tmp, cache=cache)
+            else:
+                t0 = time.perf_counter()
+                res.pages, res.rows = _RUNNERS[name](server.base_url, args.pages, args, tmp)
+        except ImportError as e:
+            res.error = f"略過（缺套件：{e.name}）"
+        except Exception as e:
+            res.error = f"{type(e).__name__}: {e}"
+        res.elapsed = time.perf_counter() - t0
+    res.requests = sum(server.stats.requests.values()) - before
+    return res
+
+
+def print_results(results: List[BenchResult]) -> None:
+    print(f"{'strategy':<13}{'pages':>7}{'rows':>8}{'req':>6}{'elapsed(s)':>12}{'pages/s':>10}{'rows/s':>10}")
+    for r in results:
+        if r.error:
+            print(f"{r.strategy:<13}  {r.error}")
+            continue
+        print(f"{r.strategy:<13}{r.pages:>7}{r.rows:>8}{r.requests:>6}{r.elapsed:>12.2f}"
+              f"{r.pages_per_sec:>10.2f}{r.rows_per_sec:>10.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="104 抓取策略 benchmark（本機替身伺服器）")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=100.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--downgrade-rate", type=float, default=0.0)
+    ap.add_argument("--concurrency", type=int, default=3)
+    ap.add_argument("--rps", type=float, default=0.0, help="async 策略的每秒請求上限（0 = 不限速）")
+    ap.add_argument("--page-sleep", type=float, default=0.0, help="sequential 每頁之間 sleep 秒數")
+    ap.add_argument("--strategies", default=",".join(STRATEGIES))
+    ap.add_argument("--seed", type=int, default=104)
+    args = ap.parse_args()
+
+    names = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = [n for n in names if n not in STRATEGIES]
+    if unknown:
+        ap.error(f"不認得的策略：{', '.join(unknown)}（可用：{', '.join(STRATEGIES)}）")
+
+    server = start_stand_in(StandInConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        downgrade_rate=args.downgrade_rate,
+        page_size=args.page_size,
+        max_pages=args.pages,
+        seed=args.seed,
+    ))
+    print(f"[INFO] 替身伺服器 {server.base_url}：{len(server.data.pages)} 頁 / {server.data.total_rows} 筆")
+    try:
+        results = [run_strategy(n, server, args) for n in names]
+    finally:
+        server.shutdown()
+        server.server_close()
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# 張詠鈞的python工作區
+# File: bench_job_row
+# Created: 2026/3/3 上午 11:00
+
+# bench_job_row.py
+# 記憶體 benchmark：10 萬筆歷史職缺載入，dict 版 vs JobRow（__slots__ + intern）版
+# 資料用 csv_file/ 的歷史快照循環產生（job_id / url 每筆不同，其他欄位照原樣重複），
+# 每個欄位都重新 decode 一次，模擬從 DB / CSV 讀出來時每筆都是新的字串物件。
+#
+# 用法：python bench_job_row.py --rows 100000
+
+import argparse
+import csv
+import gc
+import glob
+import os
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from job_row import JOB_FIELDS, JobRow
+
+DEFAULT_CSV_DIR = os.path.join(os.path.dirname(__file__), "csv_file")
+
+
+def load_templates(csv_dir: str = DEFAULT_CSV_DIR) -> List[Tuple[str, ...]]:
+    out = []
+    for path in sorted(glob.glob(os.path.join(csv_dir, "*.csv"))):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                out.append(tuple(r.get(k) or "" for k in JOB_FIELDS))
+    if not out:
+        raise SystemExit(f"[ERR] {csv_dir} 沒有可用的 CSV")
+    return out
+
+
+def _raw_rows(templates: List[Tuple[str, ...]], n: int):
+    """每筆都產生新的字串物件（跟 pyodbc / csv 讀出來一樣，不會自動共用）"""
+    for i in range(n):
+        t = templates[i % len(templates)]
+        job_id = f"{t[0]}{i}"
+        vals = [v.encode("utf-8").decode("utf-8") for v in t[1:6]]
+        yield (job_id, *vals, f"https://www.104.com.tw/job/{job_id}")
+
+
+def _as_dict(raw) -> dict:
+    return dict(zip(JOB_FIELDS, raw))
+
+
+def _as_jobrow(raw) -> JobRow:
+    return JobRow(*raw)
+
+
+def measure(build: Callable, templates: List[Tuple[str, ...]], n: int) -> Tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = [build(raw) for raw in _raw_rows(templates, n)]
+    elapsed = time.perf_counter() - t0
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    gc.collect()
+    return current, elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="JobRow vs dict 記憶體比較")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--csv-dir", default=DEFAULT_CSV_DIR)
+    args = ap.parse_args()
+
+    templates = load_templates(args.csv_dir)
+    print(f"[INFO] 樣本 {len(templates)} 筆，產生 {args.rows:,} 筆")
+    print(f"{'layout':<10}{'total MB':>10}{'bytes/job':>12}{'build s':>10}")
+    base = None
+    for name, build in (("dict", _as_dict), ("JobRow", _as_jobrow)):
+        total, elapsed = measure(build, templates, args.rows)
+        per = total / args.rows
+        base = base or per
+        print(f"{name:<10}{total / 1024 / 1024:>10.1f}{per:>12.0f}{elapsed:>10.2f}"
+              + ("" if per == base else f"   ({per / base:.0%} of dict)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# 張詠鈞的python工作區
+# File: browser_pool
+# Created: 2026/2/14 下午 02:10
+
+# browser_pool.py
+# 常駐的 Playwright 瀏覽器池：
+# - Chromium + context 只啟動一次，預先開好幾個「暖」分頁，搜尋時借用（lease）
+# - 借出前做健康檢查（分頁關了 / 瀏覽器斷線就重建）
+# - 每個分頁導覽 N 次後回收重開，避免長跑記憶體越吃越多
+# - 程式結束時（atexit / UI 關窗）統一關閉
+# - 可掛 route_filter（route_filter.py）擋掉圖片 / 字型 / 廣告等不需要的請求
+#
+# Playwright 物件只能在建立它的執行緒使用，而 UI 每次查詢都開新 thread，
+# 所以池子自己養一條 event loop thread，所有瀏覽器操作都丟進去跑（run()）。
+
+import asyncio
+import atexit
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+from route_filter import RouteFilter
+
+T = TypeVar("T")
+
+DEFAULT_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+@dataclass
+class PoolStats:
+    launches: int = 0        # 啟動瀏覽器次數（正常應該只有 1）
+    leases: int = 0          # 借出分頁次數
+    navigations: int = 0     # 總導覽次數
+    recycled: int = 0        # 因為導覽次數到上限而重開的分頁數
+    unhealthy: int = 0       # 健康檢查失敗而重建的次數
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 3,
+        headless: bool = True,
+        max_navigations: int = 50,
+        user_agent: str = DEFAULT_UA,
+        locale: str = "zh-TW",
+        context_setup: Optional[Callable[[BrowserContext], Awaitable[None]]] = None,
+        route_filter: Optional[RouteFilter] = None,
+    ):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_navigations = max(1, max_navigations)
+        self.user_agent = user_agent
+        self.locale = locale
+        self.context_setup = context_setup
+        self.route_filter = route_filter
+        self.stats = PoolStats()
+
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+        # 以下只在 pool 的 loop thread 裡碰
+        self._pw: Any = None
+        self._browser: Optional[Browser] = None
+        self._context: Optional[BrowserContext] = None
+        self._idle: Optional["asyncio.Queue[Page]"] = None
+        self._nav_count: Dict[int, int] = {}
+        self._generation = 0                     # 每次 _launch +1；舊瀏覽器的分頁還回來時直接丟掉
+        self._page_gen: Dict[int, int] = {}
+
+    # -------------------------
+    # 生命週期
+    # -------------------------
+    @property
+    def started(self) -> bool:
+        return self._loop is not None and self._browser is not None
+
+    def start(self) -> "BrowserPool":
+        """啟動 loop thread + 瀏覽器 + 暖分頁（可重複呼叫）"""
+        with self._start_lock:
+            if self.started:
+                return self
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+            self._thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._astart(), self._loop).result()
+            except BaseException:
+                # 啟動失敗：把 loop thread 收掉，下次 start() 才不會再多漏一條
+                try:
+                    asyncio.run_coroutine_threadsafe(self._aclose(), self._loop).result(timeout=15)
+                except Exception:
+                    pass
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+                raise
+        return self
+
+    async def _astart(self) -> None:
+        self._pw = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        await self._launch()
+
+    async def _launch(self) -> None:
+        self._browser = await self._pw.chromium.launch(headless=self.headless)
+        self._context = await self._browser.new_context(
+            locale=self.locale,
+            user_agent=self.user_agent,
+            viewport={"width": 1280, "height": 720},
+        )
+        if self.route_filter is not None:
+            await self.route_filter.install(self._context)
+        if self.context_setup is not None:
+            await self.context_setup(self._context)
+        self.stats.launches += 1
+        self._generation += 1
+
+        self._nav_count.clear()
+        self._page_gen.clear()
+        for _ in range(self.size):
+            await self._idle.put(await self._new_page())
+
+    async def _new_page(self) -> Page:
+        page = await self._context.new_page()
+        self._nav_count[id(page)] = 0
+        self._page_gen[id(page)] = self._generation
+        return page
+
+    def _forget(self, page: Page) -> None:
+        self._nav_count.pop(id(page), None)
+        self._page_gen.pop(id(page), None)
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._aclose(), self._loop).result(timeout=15)
+            except Exception:
+                pass
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+            # UI 會關掉再重新暖池：loop 不 close 的話每輪都漏一個 selector fd
+            if self._thread is None or not self._thread.is_alive():
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    async def _aclose(self) -> None:
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        finally:
+            self._browser = None
+            self._context = None
+            if self._pw is not None:
+                await self._pw.stop()
+                self._pw = None
+
+    # -------------------------
+    # 借用分頁
+    # -------------------------
+    async def _healthy(self, page: Page) -> bool:
+        if self._browser is None or not self._browser.is_connected():
+            return False
+        return not page.is_closed()
+
+    async def _relaunch(self) -> None:
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        except Exception:
+            pass
+        # 舊的暖分頁全部作廢
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        await self._launch()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Page]:
+        """在 pool loop 裡使用：async with pool.lease() as page: ..."""
+        page = await self._idle.get()
+        if not await self._healthy(page):
+            self.stats.unhealthy += 1
+            if self._browser is None or not self._browser.is_connected():
+                await self._relaunch()
+                page = await self._idle.get()
+            else:
+                self._forget(page)
+                page = await self._new_page()
+
+        self.stats.leases += 1
+        try:
+            yield page
+        finally:
+            await self._release(page)
+
+    async def _release(self, page: Page) -> None:
+        if self._page_gen.get(id(page)) != self._generation:
+            # 借出期間瀏覽器重啟過：_relaunch 已經補滿 size 個新分頁，這頁不再放回去
+            if not page.is_closed():
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            self._forget(page)
+            return
+        if page.is_closed() or self._nav_count.get(id(page), 0) >= self.max_navigations:
+            if not page.is_closed():
+                self.stats.recycled += 1
+                await page.close()
+            self._forget(page)
+            if self._context is not None and self._browser is not None and self._browser.is_connected():
+                page = await self._new_page()
+            else:
+                return
+        await self._idle.put(page)
+
+    async def goto(self, page: Page, url: str, **kwargs: Any) -> Any:
+        """導覽並計數（回收判斷用）"""
+        self._nav_count[id(page)] = self._nav_count.get(id(page), 0) + 1
+        self.stats.navigations += 1
+        return await page.goto(url, **kwargs)
+
+    # -------------------------
+    # 從任意 thread 提交工作
+    # -------------------------
+    def run(self, fn: Callable[["BrowserPool"], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """fn(pool) 是 async 函式，會在 pool 的 loop thread 執行；這裡同步等結果"""
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(fn(self), self._loop)
+        return fut.result(timeout=timeout)
+
+
+# -------------------------
+# 預設池（整個 process 共用）
+# -------------------------
+_DEFAULT_POOLS: Dict[bool, BrowserPool] = {}
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_pool(headless: bool = True) -> BrowserPool:
+    """依 headless 與否各一個共用池（UI 用有頭、批次用無頭），預設掛上資源攔截"""
+    with _DEFAULT_LOCK:
+        pool = _DEFAULT_POOLS.get(headless)
+        if pool is None:
+            pool = BrowserPool(headless=headless, route_filter=RouteFilter())
+            _DEFAULT_POOLS[headless] = pool
+        return pool
+
+
+def shutdown_default_pools() -> None:
+    with _DEFAULT_LOCK:
+        pools = list(_DEFAULT_POOLS.values())
+        _DEFAULT_POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(shutdown_default_pools)
@@ -0,0 +1,214 @@
+# 張詠鈞的python工作區
+# File: cli
+# Created: 2026/3/8 上午 09:20
+
+# cli.py
+# 非互動命令列：關鍵字 / 地區 / 頁數 / 輸出格式都從參數或批次檔來，不用 input()
+# - 一個 process 跑多個搜尋：共用 HTTP session、地區解析、DB 連線（底層走 batch_search.run_batch）
+# - --json：結果用 JSON 印到 stdout（其他訊息改印 stderr），給排程器 / 其他程式讀
+# - 結束碼：0 全部成功、1 部分失敗、2 參數錯誤、3 全部失敗
+#
+# 用法：
+#   python -m 作品_JOB_SEEKER -k Python工程師 -k 資料工程師 -a 台北市,新北市 -a 桃園市 --max-pages 2
+#   python -m 作品_JOB_SEEKER --batch saved_searches.json --format csv,parquet --json
+#   python cli.py -k C# -a 台中市 --format parquet --no-db --json --output result.json
+
+import argparse
+import contextlib
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+import job_MSSQL_db as job_db
+from batch_search import (
+    DEFAULT_CSV_DIR,
+    BatchReport,
+    SearchSpec,
+    SearchResult,
+    load_saved_searches,
+    print_report,
+    run_batch,
+)
+from snapshot_columnar import DEFAULT_COLUMNAR_DIR
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMATS = (FORMAT_CSV, FORMAT_PARQUET)
+
+
+# -------------------------
+# 參數
+# -------------------------
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="job_seeker",
+        description="104 職缺搜尋（非互動）：多個關鍵字 × 多組地區，一次跑完",
+    )
+    src = ap.add_argument_group("搜尋")
+    src.add_argument("-k", "--keyword", action="append", default=[],
+                     help="關鍵字（可重複給多個）")
+    src.add_argument("-a", "--areas", action="append", default=[],
+                     help="一組地區，逗號分隔，例如 台北市,新北市（可重複給多組）")
+    src.add_argument("--batch", metavar="FILE",
+                     help="已存搜尋 json（格式見 batch_search.load_saved_searches），可跟 -k/-a 一起用")
+    src.add_argument("--max-pages", type=int, default=3, help="每個搜尋最多抓幾頁（預設 3）")
+    src.add_argument("--incremental", action="store_true",
+                     help="增量抓取：遇到上次快照已知的職缺就停止翻頁")
+    src.add_argument("--districts", action="store_true",
+                     help="縣市展開成底下所有區分別帶代碼（例如 桃園市 -> 13 個區）")
+
+    out = ap.add_argument_group("輸出")
+    out.add_argument("--format", default=FORMAT_CSV,
+                     help="輸出格式，逗號分隔：csv、parquet（預設 csv）")
+    out.add_argument("--csv-dir", default=DEFAULT_CSV_DIR)
+    out.add_argument("--parquet-dir", default=DEFAULT_COLUMNAR_DIR)
+    out.add_argument("--no-db", action="store_true", help="不寫 DB（只輸出檔案）")
+    out.add_argument("--cdc", action="store_true", help="DB 改用 cdc 儲存（只存內容有變的版本）")
+    out.add_argument("--conn-str", default=None, help="MSSQL 連線字串（預設用 job_seeker.CONN_STR）")
+    out.add_argument("--json", action="store_true",
+                     help="結果用 JSON 印到 stdout；其他訊息改印 stderr")
+    out.add_argument("--output", metavar="FILE", help="JSON 結果另外寫到檔案")
+
+    run = ap.add_argument_group("執行")
+    run.add_argument("--workers", type=int, default=2, help="同時跑幾個搜尋（預設 2）")
+    run.add_argument("--rps", type=float, default=2.0, help="總請求速率上限（每秒，預設 2）")
+    run.add_argument("--concurrency", type=int, default=3, help="單一搜尋同時抓幾頁（預設 3）")
+    run.add_argument("--http2", action="store_true", help="用 HTTP/2（需要 pip install httpx[http2]）")
+    return ap
+
+
+def parse_formats(text: str) -> List[str]:
+    formats = [f.strip().lower() for f in (text or "").split(",") if f.strip()]
+    bad = [f for f in formats if f not in FORMATS]
+    if bad:
+        raise ValueError(f"不支援的輸出格式：{','.join(bad)}（可用：{','.join(FORMATS)}）")
+    return formats
+
+
+def specs_from_args(args: argparse.Namespace) -> List[SearchSpec]:
+    """-k × -a 展開成搜尋矩陣，再接上 --batch 檔裡的；重複的 (keyword, areas) 只留一個"""
+    specs: List[SearchSpec] = []
+    if args.keyword or args.areas:
+        if not args.keyword or not args.areas:
+            raise ValueError("-k/--keyword 跟 -a/--areas 要一起給")
+        for kw in args.keyword:
+            for areas in args.areas:
+                kw, areas = kw.strip(), areas.replace("，", ",").strip()
+                if kw and areas:
+                    specs.append(SearchSpec(kw, areas, args.max_pages, incremental=args.incremental))
+    if args.batch:
+        specs.extend(load_saved_searches(args.batch))
+
+    out: List[SearchSpec] = []
+    seen = set()
+    for s in specs:
+        if s.key not in seen:
+            seen.add(s.key)
+            out.append(s)
+    return out
+
+
+# -------------------------
+# 結果
+# -------------------------
+def result_to_dict(r: SearchResult) -> Dict[str, Any]:
+    return {
+        "keyword": r.spec.keyword,
+        "areas": r.spec.areas_text,
+        "area_names": r.area_names,
+        "name": r.spec.name,
+        "ok": r.ok,
+        "error": r.error,
+        "rows": len(r.rows),
+        "inserted": r.inserted,
+        "new": len(r.new_ids),
+        "removed": len(r.removed_ids),
+        "new_ids": r.new_ids,
+        "removed_ids": r.removed_ids,
+        "csv_path": r.csv_path,
+        "columnar_path": r.columnar_path,
+        "elapsed": round(r.elapsed, 3),
+    }
+
+
+def exit_code(report: BatchReport) -> int:
+    if not report.failed:
+        return EXIT_OK
+    if len(report.failed) == len(report.results):
+        return EXIT_FAILED
+    return EXIT_PARTIAL
+
+
+def report_to_dict(report: BatchReport) -> Dict[str, Any]:
+    code = exit_code(report)
+    return {
+        "status": {EXIT_OK: "ok", EXIT_PARTIAL: "partial", EXIT_FAILED: "failed"}[code],
+        "exit_code": code,
+        "searches": [result_to_dict(r) for r in report.results],
+        "failed": len(report.failed),
+        "unique_jobs": report.unique_jobs,
+        "duplicate_hits": report.duplicate_hits,
+        "elapsed": round(report.elapsed, 3),
+        "resilience": report.resilience,
+        "transport": report.transport,
+        "timing": report.timing,
+    }
+
+
+def _usage_error(msg: str, as_json: bool) -> int:
+    if as_json:
+        print(json.dumps({"status": "usage_error", "exit_code": EXIT_USAGE, "error": msg}, ensure_ascii=False))
+    print(f"[ERR] {msg}", file=sys.stderr)
+    return EXIT_USAGE
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        formats = parse_formats(args.format)
+        specs = specs_from_args(args)
+    except (ValueError, OSError) as e:
+        return _usage_error(str(e), args.json)
+    if not specs:
+        return _usage_error("沒有可執行的搜尋（給 -k/-a 或 --batch）", args.json)
+    if not formats and args.no_db:
+        return _usage_error("沒有任何輸出（--format 空白又 --no-db）", args.json)
+
+    if args.cdc:
+        job_db.STORAGE_MODE = job_db.STORAGE_CDC
+
+    # --json：stdout 只留最後那份 JSON，過程訊息（[INFO] / [WARN] …）全部改到 stderr
+    log_out = sys.stderr if args.json else sys.stdout
+    with contextlib.redirect_stdout(log_out):
+        report = run_batch(
+            specs,
+            conn_str=args.conn_str,
+            csv_dir=args.csv_dir if FORMAT_CSV in formats else None,
+            workers=args.workers,
+            rps=args.rps,
+            concurrency=args.concurrency,
+            write_db=not args.no_db,
+            columnar_dir=args.parquet_dir if FORMAT_PARQUET in formats else None,
+            http2=args.http2,
+            expand_districts=args.districts,
+        )
+        print_report(report)
+
+    result = report_to_dict(report)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.json:
+        print(text)
+    return result["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
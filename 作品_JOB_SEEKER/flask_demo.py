@@ -19,6 +19,10 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "1234")
 # 你機器上可能是 "ODBC Driver 17 for SQL Server" 或 "ODBC Driver 18 for SQL Server"
 ODBC_DRIVER = os.getenv("ODBC_DRIVER", "ODBC Driver 17 for SQL Server")
 
+# 跟 job_MSSQL_db.STORAGE_MODE 對應：抓取端用 cdc（main 的 cdc=True、batch_search / cli 的 --cdc）時，
+# 新資料只寫 dbo.job_version，這裡也要設 STORAGE_MODE=cdc 才看得到
+STORAGE_MODE = os.getenv("STORAGE_MODE", "snapshot")
+
 def get_conn():
     """
     ODBC Driver 18 預設 Encrypt=Yes，若你是本機開發，最省事是 TrustServerCertificate=Yes。
@@ -34,6 +38,31 @@ def get_conn():
     )
     return pyodbc.connect(conn_str, timeout=5)
 
+# 排序選項 -> ORDER BY（薪資用 job_MSSQL_db 預先算好的月薪數字欄，有索引；沒有數字的排最後）
+SORT_OPTIONS = {
+    "time": "[snapshot_time] DESC, [id] DESC",
+    "salary_desc": "CASE WHEN [salary_month_min] IS NULL THEN 1 ELSE 0 END, [salary_month_min] DESC, "
+                   "[salary_month_max] DESC, [id] DESC",
+    "salary_asc": "CASE WHEN [salary_month_min] IS NULL THEN 1 ELSE 0 END, [salary_month_min] ASC, "
+                  "[salary_month_max] ASC, [id] DESC",
+}
+
+# 資料來源：cdc 的 job_version 用子查詢把欄位別名成跟 job_snapshot 一樣，
+# 下面的篩選 / 排序 / 分頁兩種模式共用（snapshot_date / snapshot_time = 最後一次看到）
+SNAPSHOT_SOURCE = "[job_seek].[dbo].[job_snapshot]"
+CDC_SOURCE = """(
+            SELECT
+                [version_id] AS [id],
+                [valid_from],
+                [valid_to],
+                [valid_to] AS [snapshot_date],
+                [last_seen] AS [snapshot_time],
+                [keyword], [areas], [job_id], [title], [company], [location],
+                [salary_text], [salary_month_min], [salary_month_max], [salary_negotiable],
+                [post_date], [url]
+            FROM [job_seek].[dbo].[job_version]
+        ) AS V"""
+
 def rows_to_dicts(cursor, rows):
     cols = [c[0] for c in cursor.description]
     return [dict(zip(cols, r)) for r in rows]
@@ -53,6 +82,12 @@ def jobs():
     keyword = (request.args.get("keyword") or "").strip()
     areas = (request.args.get("areas") or "").strip()
     snapshot_date = (request.args.get("snapshot_date") or "").strip()  # 'YYYY-MM-DD' or empty
+    # 月薪區間（年薪 / 時薪都已換算成月薪）；空白 = 不限
+    salary_min = request.args.get("salary_min", type=int)
+    salary_max = request.args.get("salary_max", type=int)
+    sort = request.args.get("sort") or "time"
+    if sort not in SORT_OPTIONS:
+        sort = "time"
 
     where = []
     params = []
@@ -66,17 +101,34 @@ def jobs():
         where.append("[areas] LIKE ?")
         params.append(f"%{areas}%")
 
+    cdc = STORAGE_MODE == "cdc"
+
     if snapshot_date:
-        where.append("[snapshot_date] = ?")
-        params.append(snapshot_date)
+        if cdc:
+            # 版本在 valid_from ~ valid_to 這段期間每天都有出現
+            where.append("[valid_from] <= ? AND [valid_to] >= ?")
+            params.extend([snapshot_date, snapshot_date])
+        else:
+            where.append("[snapshot_date] = ?")
+            params.append(snapshot_date)
+
+    # 跟職缺薪資區間有交集就算（條件同 salary_parser.in_range）
+    if salary_min is not None:
+        where.append("[salary_month_min] IS NOT NULL AND ([salary_month_max] IS NULL OR [salary_month_max] >= ?)")
+        params.append(salary_min)
+
+    if salary_max is not None:
+        where.append("[salary_month_min] <= ?")
+        params.append(salary_max)
 
     where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    source = CDC_SOURCE if cdc else SNAPSHOT_SOURCE
 
     offset = (page - 1) * page_size
 
     count_sql = f"""
         SELECT COUNT(1)
-        FROM [job_seek].[dbo].[job_snapshot]
+        FROM {source}
         {where_sql}
     """
 
@@ -92,11 +144,14 @@ def jobs():
             [company],
             [location],
             [salary_text],
+            [salary_month_min],
+            [salary_month_max],
+            [salary_negotiable],
             [post_date],
             [url]
-        FROM [job_seek].[dbo].[job_snapshot]
+        FROM {source}
         {where_sql}
-        ORDER BY [snapshot_time] DESC, [id] DESC
+        ORDER BY {SORT_OPTIONS[sort]}
         OFFSET ? ROWS FETCH NEXT ? ROWS ONLY;
     """
 
@@ -124,6 +179,9 @@ def jobs():
         keyword=keyword,
         areas=areas,
         snapshot_date=snapshot_date,
+        salary_min="" if salary_min is None else salary_min,
+        salary_max="" if salary_max is None else salary_max,
+        sort=sort,
     )
 
 if __name__ == "__main__":
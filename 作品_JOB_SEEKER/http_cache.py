@@ -0,0 +1,346 @@
+# 張詠鈞的python工作區
+# File: http_cache
+# Created: 2026/2/28 上午 10:05
+
+# http_cache.py
+# 所有爬蟲共用的本機 HTTP 回應快取（重跑 pipeline 除錯解析時不必再打網路）
+# - 內容定址：body 依 sha256 存成 blobs/ab/<hash>，同樣內容只存一份
+# - 索引：請求指紋（method + url + params + 影響內容的 headers）-> body hash，存在 sqlite
+# - 每個來源（104_list / 104_area / tb_rate ...）各自的 TTL
+# - 總大小超過上限就依「最後使用時間」LRU 淘汰
+# - 模式（環境變數 HTTP_CACHE_MODE）：
+#     normal  先查快取，沒有/過期才上網，成功就存（預設）
+#     replay  只用快取，不上網；沒命中直接丟 CacheMissError（離線測試 / benchmark 用）
+#     refresh 一律上網並覆寫快取
+#     off     完全不用快取
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".http_cache")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# 各來源的 TTL（秒）；沒列到的用 "default"
+DEFAULT_TTLS: Dict[str, int] = {
+    "104_list": 10 * 60,
+    "104_detail": 30 * 24 * 3600,   # 指紋含 appearDate，職缺有更新會自動換 key
+    "104_area": 7 * 24 * 3600,
+    "tb_rate": 5 * 60,
+    "default": 3600,
+}
+
+MODES = ("normal", "replay", "refresh", "off")
+
+
+class CacheMissError(RuntimeError):
+    """replay 模式下快取沒有這個請求"""
+
+
+class HTTPStatusError(RuntimeError):
+    """CachedResponse.raise_for_status()：帶 status_code，讓重試邏輯分辨 429 / 5xx"""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"HTTP {status_code}: {url}")
+        self.status_code = status_code
+        self.url = url
+
+
+@dataclass
+class CachedResponse:
+    """長得像 requests.Response 的最小子集，讓既有解析程式不用改"""
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    from_cache: bool = False
+    encoding: Optional[str] = None
+
+    @property
+    def apparent_encoding(self) -> str:
+        """跟 requests.Response.apparent_encoding 一樣從 body 猜編碼（快取命中時也猜得到）"""
+        try:
+            from requests.compat import chardet  # charset_normalizer / chardet，requests 自帶
+        except ImportError:
+            return "utf-8"
+        if chardet is None or not self.content:
+            return "utf-8"
+        return chardet.detect(self.content)["encoding"] or "utf-8"
+
+    @property
+    def text(self) -> str:
+        enc = self.encoding
+        if not enc:
+            ctype = self.headers.get("Content-Type") or ""
+            for part in ctype.split(";"):
+                part = part.strip()
+                if part.lower().startswith("charset="):
+                    enc = part.split("=", 1)[1].strip()
+        return self.content.decode(enc or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPStatusError(self.status_code, self.url)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evicted: int = 0
+    bytes_served: int = 0
+    bytes_fetched: int = 0      # 真的從網路收下來的 body 大小（run_metrics 用）
+    by_source: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return f"快取命中 {self.hits}/{total}，新存 {self.stores}，淘汰 {self.evicted}"
+
+
+def fingerprint(method: str, url: str, params: Optional[Mapping[str, Any]] = None,
+                headers: Optional[Mapping[str, str]] = None, vary: Tuple[str, ...] = ("Accept",)) -> str:
+    """請求指紋：參數排序後 hash；headers 只取會影響回應內容的幾個"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(str(k), str(v)) for k, v in params.items()]
+    query.sort()
+    base = urllib.parse.urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, "", ""))
+    h = {k: str((headers or {}).get(k, "")) for k in vary}
+    raw = json.dumps([method.upper(), base, query, h], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[Dict[str, int]] = None,
+        mode: Optional[str] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        mode = (mode or os.getenv("HTTP_CACHE_MODE") or "normal").strip().lower()
+        if mode not in MODES:
+            raise ValueError(f"HTTP_CACHE_MODE 只能是 {', '.join(MODES)}，收到：{mode}")
+        self.mode = mode
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    # -------------------------
+    # 儲存層
+    # -------------------------
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.join(self.cache_dir, "blobs"), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    fp TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_hash ON entries(body_hash);")
+            self._db.commit()
+        return self._db
+
+    def _blob_path(self, body_hash: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", body_hash[:2], body_hash)
+
+    def _write_blob(self, body: bytes) -> str:
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        return body_hash
+
+    def ttl_for(self, source: str) -> int:
+        return self.ttls.get(source, self.ttls["default"])
+
+    # -------------------------
+    # 查 / 存
+    # -------------------------
+    def get(self, source: str, fp: str, ignore_ttl: bool = False) -> Optional[CachedResponse]:
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT url, body_hash, status, headers, stored_at FROM entries WHERE fp = ?;", (fp,)
+            ).fetchone()
+            if not row:
+                return None
+            url, body_hash, status, headers, stored_at = row
+            if not ignore_ttl and time.time() - stored_at > self.ttl_for(source):
+                return None
+            try:
+                with open(self._blob_path(body_hash), "rb") as f:
+                    body = f.read()
+            except OSError:
+                db.execute("DELETE FROM entries WHERE fp = ?;", (fp,))
+                db.commit()
+                return None
+            db.execute("UPDATE entries SET last_access = ? WHERE fp = ?;", (time.time(), fp))
+            db.commit()
+        return CachedResponse(url=url, status_code=status, headers=json.loads(headers), content=body, from_cache=True)
+
+    def put(self, source: str, fp: str, resp: CachedResponse) -> None:
+        with self._lock:
+            db = self._conn()
+            body_hash = self._write_blob(resp.content)
+            now = time.time()
+            keep = {k: v for k, v in resp.headers.items() if k.lower() in ("content-type", "content-encoding", "etag")}
+            db.execute("""
+                INSERT OR REPLACE INTO entries (fp, source, url, body_hash, size, status, headers, stored_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, (fp, source, resp.url, body_hash, len(resp.content), resp.status_code,
+                  json.dumps(keep, ensure_ascii=False), now, now))
+            db.commit()
+            self.stats.stores += 1
+            self._evict_locked()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes_locked()
+
+    def _total_bytes_locked(self) -> int:
+        # 同一份 body 只算一次
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT body_hash, MAX(size) AS size FROM entries GROUP BY body_hash);"
+        ).fetchone()
+        return int(row[0])
+
+    def _evict_locked(self) -> None:
+        db = self._conn()
+        total = self._total_bytes_locked()
+        if total <= self.max_bytes:
+            return
+        for fp, body_hash, size in db.execute(
+            "SELECT fp, body_hash, size FROM entries ORDER BY last_access ASC;"
+        ).fetchall():
+            db.execute("DELETE FROM entries WHERE fp = ?;", (fp,))
+            self.stats.evicted += 1
+            still_used = db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1;", (body_hash,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._blob_path(body_hash))
+                except OSError:
+                    pass
+                total -= size
+            if total <= self.max_bytes:
+                break
+        db.commit()
+
+    # -------------------------
+    # 對外主要入口
+    # -------------------------
+    def fetch(
+        self,
+        source: str,
+        fp: str,
+        send: Callable[[], CachedResponse],
+        cacheable: Callable[[CachedResponse], bool] = lambda r: 200 <= r.status_code < 300,
+        refresh: bool = False,
+    ) -> CachedResponse:
+        """
+        send()：真的上網，回 CachedResponse
+        cacheable(resp)：決定這個回應能不能存（例如 104 降級回 HTML 就不要存）
+        refresh：只有這一次當成 refresh 模式（不看快取、上網後覆寫）；replay / off 模式不受影響
+        """
+        mode = "refresh" if refresh and self.mode == "normal" else self.mode
+        if mode == "off":
+            resp = send()
+            self.stats.bytes_fetched += len(resp.content)
+            return resp
+
+        if mode != "refresh":
+            hit = self.get(source, fp, ignore_ttl=(mode == "replay"))
+            if hit is not None:
+                self.stats.hits += 1
+                self.stats.bytes_served += len(hit.content)
+                self.stats.by_source[source] = self.stats.by_source.get(source, 0) + 1
+                return hit
+
+        self.stats.misses += 1
+        if mode == "replay":
+            raise CacheMissError(f"replay 模式：快取沒有這個請求（source={source}, fp={fp[:12]}…）")
+
+        resp = send()
+        self.stats.bytes_fetched += len(resp.content)
+        if cacheable(resp):
+            self.put(source, fp, resp)
+        return resp
+
+
+def from_requests(r: Any) -> CachedResponse:
+    """requests.Response -> CachedResponse"""
+    return CachedResponse(
+        url=str(r.url),
+        status_code=int(r.status_code),
+        headers=dict(r.headers),
+        content=r.content,
+        encoding=None,
+    )
+
+
+def cached_get(
+    session: Any,
+    source: str,
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    cache: Optional[ResponseCache] = None,
+    cacheable: Callable[[CachedResponse], bool] = lambda r: 200 <= r.status_code < 300,
+    refresh: bool = False,
+    **kwargs: Any,
+) -> CachedResponse:
+    """
+    session 可以是 requests.Session 或 requests 模組本身（有 .get 就行）
+    回傳 CachedResponse（有 status_code / headers / content / text / json() / raise_for_status()）
+    refresh=True：這一次不看快取，直接上網並覆寫（使用者明確要求重抓時用）
+    """
+    cache = cache or get_default_cache()
+    fp = fingerprint("GET", url, params, headers)
+
+    def _send() -> CachedResponse:
+        return from_requests(session.get(url, params=params, headers=headers, **kwargs))
+
+    return cache.fetch(source, fp, _send, cacheable, refresh=refresh)
+
+
+_DEFAULT_CACHE: Optional[ResponseCache] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    global _DEFAULT_CACHE
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = ResponseCache()
+        return _DEFAULT_CACHE
@@ -0,0 +1,336 @@
+# 張詠鈞的python工作區
+# File: http_transport
+# Created: 2026/3/8 下午 02:10
+
+# http_transport.py
+# 共用 HTTP 傳輸層：所有打 104 的請求都走同一個連線池，不要每次重新 TCP + TLS 握手
+# - 連線池大小：pool_maxsize 至少要 >= 同時在飛的請求數（workers × concurrency），不然多出來的連線用完就丟
+# - keep-alive：同一個 session 的請求共用池裡的連線；stats 看得出新開幾條、重用幾次
+# - 壓縮：Accept-Encoding 送 gzip / deflate（有裝 brotli 才加 br，不然伺服器回 br 會解不開）
+# - 每個 host 的同時請求上限（max_per_host）：www.104.com.tw 跟 static.104.com.tw 各自計算
+# - HTTP/2（可選）：有裝 httpx[http2] 且 http2=True 才用；回傳的 session 介面跟 requests.Session 一樣
+#   （cookie jar 也是 requests 的，SessionBootstrap / Resilience 不用改）
+# - stats：請求數、新開連線、重用、線上 bytes（壓縮後）vs 解壓後 bytes
+#
+# 用法：
+#   from http_transport import build_session, shared_session, get_default_transport
+#   session = build_session()                       # 給一次搜尋 / 批次用（自己的 cookie）
+#   shared_session().get(...)                       # 不需要 cookie 的靜態資源（Area.json）
+#   print(get_default_transport().stats.summary())
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401  有裝才協商 br（urllib3 靠它解壓）
+    _HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _HAS_BROTLI = True
+    except ImportError:
+        _HAS_BROTLI = False
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 是選配
+    httpx = None
+
+ACCEPT_ENCODING = "gzip, deflate, br" if _HAS_BROTLI else "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+
+@dataclass
+class TransportConfig:
+    pool_connections: int = 4      # 要保留幾個 host 的連線池（104 實際只有 www / static 兩個）
+    pool_maxsize: int = 16         # 每個 host 池裡最多留幾條連線
+    max_per_host: int = 8          # 每個 host 同時在飛的請求上限；0 = 不限
+    connect_retries: int = 2       # 只重試「連不上」；HTTP 狀態碼的重試交給 resilience
+    http2: bool = False
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    connections: int = 0
+    bytes_wire: int = 0
+    bytes_body: int = 0
+    wait_seconds: float = 0.0      # 卡在 max_per_host 排隊的時間
+
+
+@dataclass
+class TransportStats:
+    requests: int = 0
+    connections: int = 0           # 新開的 TCP/TLS 連線
+    http2_requests: int = 0
+    bytes_wire: int = 0            # 線上實際收到的 body（壓縮後）
+    bytes_body: int = 0            # 解壓後
+    wait_seconds: float = 0.0
+    hosts: Dict[str, HostStats] = field(default_factory=dict)
+
+    @property
+    def reused(self) -> int:
+        return max(0, self.requests - self.connections)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        text = (f"請求 {self.requests}（新連線 {self.connections}、重用 {self.reused}，"
+                f"{self.reuse_ratio:.0%}）；線上 {self.bytes_wire / 1024:.0f}KB / 解壓後 {self.bytes_body / 1024:.0f}KB")
+        if self.http2_requests:
+            text += f"；HTTP/2 {self.http2_requests}"
+        if self.wait_seconds >= 0.01:
+            text += f"；排隊 {self.wait_seconds:.2f}s"
+        return text
+
+
+class HostLimiter:
+    """每個 host 一個 semaphore"""
+
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max_per_host
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[float]:
+        if self.max_per_host <= 0:
+            yield 0.0
+            return
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.max_per_host)
+        t0 = time.perf_counter()
+        sem.acquire()
+        try:
+            yield time.perf_counter() - t0
+        finally:
+            sem.release()
+
+
+class Transport:
+    """一份設定 + 一份 stats + 一組 host 限流；底下可以開多個 session（各自 cookie，連線池各自）"""
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.stats = TransportStats()
+        self.limiter = HostLimiter(self.config.max_per_host)
+        self._lock = threading.Lock()
+        self._shared: Optional[requests.Session] = None
+
+    # -------------------------
+    # stats
+    # -------------------------
+    def _host(self, host: str) -> HostStats:
+        hs = self.stats.hosts.get(host)
+        if hs is None:
+            hs = self.stats.hosts[host] = HostStats()
+        return hs
+
+    def record_connection(self, host: str) -> None:
+        with self._lock:
+            self.stats.connections += 1
+            self._host(host).connections += 1
+
+    def record_response(self, host: str, wire: int, body: int, waited: float, http2: bool = False) -> None:
+        with self._lock:
+            hs = self._host(host)
+            self.stats.requests += 1
+            self.stats.bytes_wire += wire
+            self.stats.bytes_body += body
+            self.stats.wait_seconds += waited
+            if http2:
+                self.stats.http2_requests += 1
+            hs.requests += 1
+            hs.bytes_wire += wire
+            hs.bytes_body += body
+            hs.wait_seconds += waited
+
+    # -------------------------
+    # session
+    # -------------------------
+    def build_session(self, headers: Optional[Mapping[str, str]] = None, http2: Optional[bool] = None) -> requests.Session:
+        use_h2 = self.config.http2 if http2 is None else http2
+        if use_h2 and httpx is not None:
+            s: requests.Session = Http2Session(self)
+        else:
+            s = requests.Session()
+            adapter = PooledAdapter(self)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+        s.headers.update(DEFAULT_HEADERS)
+        if headers:
+            s.headers.update(headers)
+        return s
+
+    def shared_session(self) -> requests.Session:
+        """不帶 cookie 狀態的請求（Area.json 之類）共用這一個 session"""
+        with self._lock:
+            if self._shared is None:
+                self._shared = self.build_session(http2=False)
+            return self._shared
+
+
+def _wire_bytes(resp: requests.Response) -> int:
+    raw = getattr(resp, "raw", None)
+    try:
+        n = raw.tell()  # urllib3：從 socket 讀到的 body bytes（解壓前）
+        if n:
+            return int(n)
+    except Exception:
+        pass
+    try:
+        return int(resp.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+def _counting_pool(base: type, transport: Transport) -> type:
+    class _Pool(base):
+        def _new_conn(self):
+            transport.record_connection(self.host)
+            return super()._new_conn()
+    return _Pool
+
+
+class PooledAdapter(HTTPAdapter):
+    """requests 的 adapter：連線池大小 + 每 host 限流 + 計算新連線 / 線上 bytes"""
+
+    def __init__(self, transport: Transport):
+        self.transport = transport
+        cfg = transport.config
+        super().__init__(
+            pool_connections=cfg.pool_connections,
+            pool_maxsize=cfg.pool_maxsize,
+            max_retries=Retry(total=cfg.connect_retries, connect=cfg.connect_retries, read=0, status=0,
+                              backoff_factor=0.2),
+            pool_block=False,
+        )
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.transport),
+            "https": _counting_pool(HTTPSConnectionPool, self.transport),
+        }
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        host = urlsplit(request.url).hostname or ""
+        with self.transport.limiter.slot(host) as waited:
+            resp = super().send(request, **kwargs)
+            if not kwargs.get("stream"):
+                # body 在 slot 裡讀完，連線才會還回池子；順便拿得到線上 bytes
+                body = len(resp.content)
+                self.transport.record_response(host, _wire_bytes(resp), body, waited)
+        return resp
+
+
+class Http2Session(requests.Session):
+    """
+    介面跟 requests.Session 一樣（headers / cookies / get），底下用 httpx 走 HTTP/2
+    - cookie jar 直接交給 httpx 共用，SessionBootstrap 的 cookies.set / clear 照常可用
+    - 回傳轉成 requests.Response，httpx 的連線錯誤轉成 requests 的例外（Resilience 才認得）
+    """
+
+    def __init__(self, transport: Transport):
+        super().__init__()
+        self.transport = transport
+        cfg = transport.config
+        limits = httpx.Limits(max_connections=cfg.pool_maxsize * max(1, cfg.pool_connections),
+                              max_keepalive_connections=cfg.pool_maxsize)
+        self._client = httpx.Client(
+            cookies=self.cookies,
+            transport=httpx.HTTPTransport(http2=True, limits=limits, retries=cfg.connect_retries),
+        )
+        self._seen_conns: "set[int]" = set()
+
+    def request(self, method: str, url: str, params: Any = None, data: Any = None, headers: Any = None,
+                cookies: Any = None, files: Any = None, auth: Any = None, timeout: Any = None,
+                allow_redirects: bool = True, proxies: Any = None, hooks: Any = None, stream: Any = None,
+                verify: Any = None, cert: Any = None, json: Any = None) -> requests.Response:
+        merged = dict(self.headers)
+        merged.update(headers or {})
+        host = urlsplit(url).hostname or ""
+        with self.transport.limiter.slot(host) as waited:
+            try:
+                r = self._client.request(method, url, params=params, data=data, json=json, headers=merged,
+                                         timeout=timeout, follow_redirects=allow_redirects)
+            except httpx.TimeoutException as e:
+                raise requests.Timeout(str(e)) from e
+            except httpx.TransportError as e:
+                raise requests.ConnectionError(str(e)) from e
+        self._record(host, r, waited)
+        return _to_requests(r)
+
+    def _record(self, host: str, r: "httpx.Response", waited: float) -> None:
+        # HTTP/2 一條連線多工，用 network_stream 的 id 判斷是不是新連線
+        stream = r.extensions.get("network_stream")
+        if stream is not None and id(stream) not in self._seen_conns:
+            self._seen_conns.add(id(stream))
+            self.transport.record_connection(host)
+        self.transport.record_response(host, r.num_bytes_downloaded, len(r.content), waited,
+                                       http2=r.http_version == "HTTP/2")
+
+    def close(self) -> None:
+        self._client.close()
+        super().close()
+
+
+def _to_requests(r: "httpx.Response") -> requests.Response:
+    out = requests.Response()
+    out.status_code = r.status_code
+    out.headers = CaseInsensitiveDict(r.headers.items())
+    out._content = r.content
+    out.url = str(r.url)
+    out.encoding = r.encoding
+    out.reason = r.reason_phrase
+    return out
+
+
+# -------------------------
+# 預設 transport（整個 process 共用）
+# -------------------------
+_DEFAULT_TRANSPORT: Optional[Transport] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    global _DEFAULT_TRANSPORT
+    with _DEFAULT_LOCK:
+        if _DEFAULT_TRANSPORT is None:
+            _DEFAULT_TRANSPORT = Transport()
+        return _DEFAULT_TRANSPORT
+
+
+def configure(config: TransportConfig) -> Transport:
+    """換掉預設 transport（例如批次依 workers × concurrency 調大連線池、開 HTTP/2）"""
+    global _DEFAULT_TRANSPORT
+    with _DEFAULT_LOCK:
+        _DEFAULT_TRANSPORT = Transport(config)
+        return _DEFAULT_TRANSPORT
+
+
+def build_session(headers: Optional[Mapping[str, str]] = None, http2: Optional[bool] = None) -> requests.Session:
+    return get_default_transport().build_session(headers, http2)
+
+
+def shared_session() -> requests.Session:
+    return get_default_transport().shared_session()
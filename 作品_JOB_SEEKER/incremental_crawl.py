@@ -0,0 +1,118 @@
+# 張詠鈞的python工作區
+# File: incremental_crawl
+# Created: 2026/2/22 上午 10:30
+
+# incremental_crawl.py
+# 增量抓取：搜尋用 order=15（最新在前），所以一旦某頁幾乎都是上次快照就有的職缺，
+# 後面的頁大概都沒變，不必再抓。
+# - 先從 DB 讀這組 keyword/areas 最近一次快照的 job_id
+# - 逐頁抓，某頁「已知比例」>= overlap_threshold 就停
+# - 因為重疊而停下時，上次快照裡「沒被重抓到」的職缺直接沿用到今天的快照
+#   （若是抓到最後一頁自然結束，代表全部都看過了，沒出現的就是真的消失，不沿用）
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import requests
+
+import job_MSSQL_db as job_db
+import job_seeker
+from job_row import JobRow
+from async_fetcher import fetch_pages
+from resilience import Resilience
+from session_bootstrap import SessionBootstrap
+
+
+@dataclass
+class IncrementalResult:
+    rows: List[JobRow] = field(default_factory=list)   # 今天快照要寫的全部 rows
+    fetched: int = 0              # 這次實際抓到的筆數
+    carried: int = 0              # 從上次快照沿用的筆數
+    pages_fetched: int = 0
+    stopped_by_overlap: bool = False
+    last_snapshot_date: Optional[str] = None
+
+    def summary(self) -> str:
+        if self.last_snapshot_date is None:
+            return f"無歷史快照，完整抓取 {self.pages_fetched} 頁（{self.fetched} 筆）"
+        how = "遇到已知職缺提前停止" if self.stopped_by_overlap else "抓到最後一頁"
+        return (f"對照 {self.last_snapshot_date} 快照：抓 {self.pages_fetched} 頁 {self.fetched} 筆，"
+                f"沿用 {self.carried} 筆（{how}）")
+
+
+def page_overlap(rows: List[JobRow], known_ids: "set[str]") -> float:
+    if not rows:
+        return 0.0
+    hit = sum(1 for r in rows if r.job_id in known_ids)
+    return hit / len(rows)
+
+
+def crawl_incremental(
+    session: requests.Session,
+    keyword: str,
+    area_codes_csv: str,
+    area_names: str,
+    conn_str: str,
+    max_pages: int = 10,
+    overlap_threshold: float = 1.0,
+    bootstrap: Optional[SessionBootstrap] = None,
+    rps: float = 2.0,
+    conn=None,
+    resilience: Optional[Resilience] = None,
+) -> IncrementalResult:
+    """
+    overlap_threshold：一頁中已知 job_id 的比例達到多少就停（1.0 = 整頁都已知）
+    抓取是逐頁進行（concurrency=1），停在重疊頁就不會再多送任何一頁
+    resilience：有給就跟一般搜尋一樣帶重試 / 斷路器 / 瀏覽器補抓
+    """
+    last_date, known_rows = job_db.get_latest_snapshot_rows(
+        keyword=keyword, areas=area_names, conn_str=conn_str, conn=conn
+    )
+    known: Dict[str, JobRow] = {r.job_id: r for r in known_rows}
+    known_ids = set(known)
+    state = {"overlap_stop": False}
+
+    def should_stop(_page: int, rows: List[JobRow]) -> bool:
+        if not rows:
+            return True
+        if known_ids and page_overlap(rows, known_ids) >= overlap_threshold:
+            state["overlap_stop"] = True
+            return True
+        return False
+
+    if resilience is not None:
+        fetch, parse = resilience.page_fetcher(session, keyword, area_codes_csv)
+    else:
+        def fetch(page: int):
+            return job_seeker.fetch_104_jobs_json(
+                session, keyword=keyword, area_codes_csv=area_codes_csv, page=page, bootstrap=bootstrap
+            )
+        parse = job_seeker.normalize_jobs
+
+    report = fetch_pages(
+        fetch,
+        parse,
+        max_pages=max_pages,
+        concurrency=1,
+        rps=rps,
+        should_stop=should_stop,
+    )
+
+    fetched = report.rows
+    res = IncrementalResult(
+        fetched=len(fetched),
+        # 停止頁之後的頁不會送出；只算停止頁（含）以前真的拿到結果的頁
+        pages_fetched=sum(1 for p in report.pages if report.included(p.page) and (p.rows or p.error)),
+        stopped_by_overlap=state["overlap_stop"],
+        last_snapshot_date=last_date,
+    )
+
+    rows = list(fetched)
+    if state["overlap_stop"]:
+        seen = {r.job_id for r in fetched}
+        carried = [r for jid, r in known.items() if jid not in seen]
+        rows.extend(carried)
+        res.carried = len(carried)
+
+    res.rows = rows
+    return res
@@ -8,22 +8,72 @@
 # job_MSSQL_db.py
 # MSSQL 版本：寫入每日快照 + 昨天/今天新增消失
 # 依賴：pyodbc
+#
+# 兩種儲存方式（STORAGE_MODE，或各函式的 storage 參數）：
+# - snapshot：每天每筆職缺完整存一份（dbo.job_snapshot）
+# - cdc：只存「內容有變」的版本（dbo.job_version），內容沒變只把有效區間 valid_to 往後延；
+#        每次抓取另記一筆到 dbo.job_capture。「第 D 天有哪些職缺」= valid_from <= D <= valid_to
 
 import datetime
-from typing import Dict, List, Tuple, Optional
+import hashlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional, Union
 
 import pyodbc
 
+from job_row import JobRow
+from salary_parser import SALARY_COLUMNS, parse_salary
+
 TABLE_FULLNAME = "dbo.job_snapshot"
+DETAIL_TABLE = "dbo.job_detail"      # 職缺明細（job_enrich.py），一個 job_id 一筆，標記變了才更新
+VERSION_TABLE = "dbo.job_version"    # cdc：職缺內容版本 + 有效區間
+CAPTURE_TABLE = "dbo.job_capture"    # cdc：每個搜尋條件抓過哪幾天
+
+STORAGE_SNAPSHOT = "snapshot"
+STORAGE_CDC = "cdc"
+# 沒指定 storage 時用這個（main / batch 啟動時可以整個切成 cdc）
+STORAGE_MODE = STORAGE_SNAPSHOT
+
+# 薪資數字欄（salary_parser 解析 salary_text；月薪換算欄位有索引，給薪資區間篩選 / 排序）
+_SALARY_DDL = (
+    ("salary_period", "NVARCHAR(10) NULL"),
+    ("salary_min", "INT NULL"),
+    ("salary_max", "INT NULL"),
+    ("salary_negotiable", "BIT NULL"),
+    ("salary_month_min", "INT NULL"),
+    ("salary_month_max", "INT NULL"),
+)
+_SALARY_COLS_SQL = ", ".join(SALARY_COLUMNS)
+
+# 參與內容雜湊的欄位（job_id 是鍵，不算內容）
+_CONTENT_FIELDS = ("title", "company", "location", "salary_text", "post_date", "url")
+
+# 這個 process 已經建過表的連線字串（批次跑很多搜尋時不用每次都檢查）
+_INITIALIZED: "set[str]" = set()
 
 
 def connect(conn_str: str) -> pyodbc.Connection:
     return pyodbc.connect(conn_str, autocommit=False)
 
 
-def init_db(conn_str: str) -> None:
-    conn = connect(conn_str)
+@contextmanager
+def _use_conn(conn_str: str, conn: Optional[pyodbc.Connection] = None) -> Iterator[pyodbc.Connection]:
+    """有傳入共用連線就直接用（不關），沒有就開一條用完關掉"""
+    if conn is not None:
+        yield conn
+        return
+    own = connect(conn_str)
     try:
+        yield own
+    finally:
+        own.close()
+
+
+def init_db(conn_str: str, conn: Optional[pyodbc.Connection] = None) -> None:
+    if conn_str in _INITIALIZED:
+        return
+    with _use_conn(conn_str, conn) as conn:
         cur = conn.cursor()
         cur.execute(f"""
         SET NOCOUNT ON;
@@ -42,7 +92,13 @@ def init_db(conn_str: str) -> None:
                 location NVARCHAR(500) NULL,
                 salary_text NVARCHAR(500) NULL,
                 post_date NVARCHAR(50) NULL,
-                url NVARCHAR(1000) NULL
+                url NVARCHAR(1000) NULL,
+                salary_period NVARCHAR(10) NULL,
+                salary_min INT NULL,
+                salary_max INT NULL,
+                salary_negotiable BIT NULL,
+                salary_month_min INT NULL,
+                salary_month_max INT NULL
             );
 
             CREATE UNIQUE INDEX UX_job_snapshot
@@ -57,10 +113,85 @@ def init_db(conn_str: str) -> None:
             CREATE INDEX IX_job_snapshot_kw_area
             ON {TABLE_FULLNAME}(keyword, areas);
         END
+
+        IF OBJECT_ID('{VERSION_TABLE}', 'U') IS NULL
+        BEGIN
+            CREATE TABLE {VERSION_TABLE} (
+                version_id BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                keyword NVARCHAR(200) NOT NULL,
+                areas NVARCHAR(200) NOT NULL,
+                job_id NVARCHAR(50) NOT NULL,
+                content_hash BINARY(20) NOT NULL,
+                valid_from DATE NOT NULL,
+                valid_to DATE NOT NULL,             -- 最後一次看到（含）
+                first_seen DATETIME2(0) NOT NULL,
+                last_seen DATETIME2(0) NOT NULL,
+                title NVARCHAR(500) NULL,
+                company NVARCHAR(500) NULL,
+                location NVARCHAR(500) NULL,
+                salary_text NVARCHAR(500) NULL,
+                post_date NVARCHAR(50) NULL,
+                url NVARCHAR(1000) NULL,
+                salary_period NVARCHAR(10) NULL,
+                salary_min INT NULL,
+                salary_max INT NULL,
+                salary_negotiable BIT NULL,
+                salary_month_min INT NULL,
+                salary_month_max INT NULL
+            );
+
+            CREATE UNIQUE INDEX UX_job_version
+            ON {VERSION_TABLE}(keyword, areas, job_id, valid_from);
+
+            -- 「第 D 天有哪些職缺」走這個
+            CREATE INDEX IX_job_version_range
+            ON {VERSION_TABLE}(keyword, areas, valid_from, valid_to) INCLUDE (job_id);
+
+            CREATE INDEX IX_job_version_jobid
+            ON {VERSION_TABLE}(job_id);
+        END
+
+        IF OBJECT_ID('{CAPTURE_TABLE}', 'U') IS NULL
+        BEGIN
+            CREATE TABLE {CAPTURE_TABLE} (
+                keyword NVARCHAR(200) NOT NULL,
+                areas NVARCHAR(200) NOT NULL,
+                snapshot_date DATE NOT NULL,
+                snapshot_time DATETIME2(0) NOT NULL,
+                row_count INT NOT NULL,
+                CONSTRAINT PK_job_capture PRIMARY KEY (keyword, areas, snapshot_date)
+            );
+        END
+
+        IF OBJECT_ID('{DETAIL_TABLE}', 'U') IS NULL
+        BEGIN
+            CREATE TABLE {DETAIL_TABLE} (
+                job_id NVARCHAR(50) NOT NULL PRIMARY KEY,
+                marker NVARCHAR(50) NOT NULL,
+                requirements NVARCHAR(MAX) NULL,
+                work_exp NVARCHAR(100) NULL,
+                edu NVARCHAR(200) NULL,
+                skills NVARCHAR(2000) NULL,
+                headcount NVARCHAR(50) NULL,
+                remote NVARCHAR(200) NULL,
+                updated_at DATETIME2(0) NOT NULL
+            );
+        END
         """)
+        _ensure_salary_columns(cur)
         conn.commit()
-    finally:
-        conn.close()
+    _INITIALIZED.add(conn_str)
+
+
+def _ensure_salary_columns(cur: pyodbc.Cursor) -> None:
+    """舊資料庫補上薪資數字欄 + 索引（ALTER 跟 CREATE INDEX 要分開送，同一個 batch 編譯時看不到新欄位）"""
+    for table, index in ((TABLE_FULLNAME, "IX_job_snapshot_salary"), (VERSION_TABLE, "IX_job_version_salary")):
+        for col, ddl in _SALARY_DDL:
+            cur.execute(f"IF COL_LENGTH('{table}', '{col}') IS NULL ALTER TABLE {table} ADD {col} {ddl};")
+        cur.execute(f"""
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{index}' AND object_id = OBJECT_ID('{table}'))
+                CREATE INDEX {index} ON {table}(salary_month_min) INCLUDE (salary_month_max);
+        """)
 
 
 def _parse_snapshot_time(snapshot_time: Optional[str]) -> datetime.datetime:
@@ -69,7 +200,7 @@ def _parse_snapshot_time(snapshot_time: Optional[str]) -> datetime.datetime:
     return datetime.datetime.now().replace(second=0, microsecond=0)
 
 
-def _fetch_first_scalar(cur: pyodbc.Cursor) -> int:
+def _fetch_first_row(cur: pyodbc.Cursor) -> Optional[pyodbc.Row]:
     """
     對付 pyodbc 多 statement batch：
     一直 nextset() 到遇到真正有結果集（cur.description != None）再 fetchone()
@@ -77,131 +208,431 @@ def _fetch_first_scalar(cur: pyodbc.Cursor) -> int:
     while cur.description is None:
         has_next = cur.nextset()
         if not has_next:
-            return 0
-    row = cur.fetchone()
+            return None
+    return cur.fetchone()
+
+
+def _fetch_first_scalar(cur: pyodbc.Cursor) -> int:
+    row = _fetch_first_row(cur)
     if not row:
         return 0
     return int(row[0])
 
 
-def insert_snapshot_rows(
-    rows: List[Dict[str, str]],
-    keyword: str,
-    areas: str,
-    conn_str: str,
-    snapshot_time: Optional[str] = None
-) -> int:
-    init_db(conn_str)
-
-    st = _parse_snapshot_time(snapshot_time)
-    sd = st.date()
-
-    payload = []
-    for r in rows:
-        job_id = (r.get("job_id") or "").strip()
-        if not job_id:
-            continue
-        payload.append((
-            sd,
-            st,
-            keyword,
-            areas,
-            job_id,
-            (r.get("title") or "").strip(),
-            (r.get("company") or "").strip(),
-            (r.get("location") or "").strip(),
-            (r.get("salary_text") or "").strip(),
-            (r.get("post_date") or "").strip(),
-            (r.get("url") or "").strip(),
-        ))
-
-    if not payload:
-        return 0
+def _storage(storage: Optional[str]) -> str:
+    mode = storage or STORAGE_MODE
+    if mode not in (STORAGE_SNAPSHOT, STORAGE_CDC):
+        raise ValueError(f"未知的儲存方式：{mode}")
+    return mode
 
-    conn = connect(conn_str)
-    try:
-        cur = conn.cursor()
 
-        cur.execute("""
-        SET NOCOUNT ON;
+def _content_hash(r: JobRow) -> bytes:
+    # 欄位用 \x1f 隔開，避免 "ab"+"c" 跟 "a"+"bc" 撞在一起
+    return hashlib.sha1("\x1f".join(getattr(r, k) for k in _CONTENT_FIELDS).encode("utf-8")).digest()
 
-        IF OBJECT_ID('tempdb..#job_stage') IS NOT NULL DROP TABLE #job_stage;
-
-        CREATE TABLE #job_stage (
-            snapshot_date DATE NOT NULL,
-            snapshot_time DATETIME2(0) NOT NULL,
-            keyword NVARCHAR(200) NOT NULL,
-            areas NVARCHAR(200) NOT NULL,
-            job_id NVARCHAR(50) NOT NULL,
-            title NVARCHAR(500) NULL,
-            company NVARCHAR(500) NULL,
-            location NVARCHAR(500) NULL,
-            salary_text NVARCHAR(500) NULL,
-            post_date NVARCHAR(50) NULL,
-            url NVARCHAR(1000) NULL
-        );
-        """)
 
-        cur.fast_executemany = True
-        cur.executemany("""
-            INSERT INTO #job_stage
-            (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-        """, payload)
+def _stage_tuple(sd: Any, st: Any, keyword: str, areas: str, r: JobRow) -> tuple:
+    # 欄位順序跟 #job_stage 一致：快照欄位 + 職缺欄位 + 內容雜湊 + 薪資數字欄
+    return (sd, st, keyword, areas) + r.astuple() + (_content_hash(r),) + parse_salary(r.salary_text).columns()
 
-        # ⚠️ 這裡是重點：NOCOUNT ON + 最後有 SELECT inserted_count
-        cur.execute(f"""
-        SET NOCOUNT ON;
 
-        DECLARE @Inserted TABLE (job_id NVARCHAR(50));
+def _row_tuple(sd: datetime.date, st: datetime.datetime, keyword: str, areas: str,
+               r: Union[JobRow, Dict[str, str]]) -> Optional[tuple]:
+    r = JobRow.coerce(r)
+    if not r.job_id:
+        return None
+    return _stage_tuple(sd, st, keyword, areas, r)
 
-        MERGE {TABLE_FULLNAME} WITH (HOLDLOCK) AS T
-        USING #job_stage AS S
-        ON  T.snapshot_date = S.snapshot_date
-        AND T.keyword = S.keyword
-        AND T.areas = S.areas
-        AND T.job_id = S.job_id
-        WHEN NOT MATCHED THEN
-            INSERT (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url)
-            VALUES (S.snapshot_date, S.snapshot_time, S.keyword, S.areas, S.job_id, S.title, S.company, S.location, S.salary_text, S.post_date, S.url)
-        OUTPUT inserted.job_id INTO @Inserted(job_id);
 
-        SELECT COUNT(1) AS inserted_count FROM @Inserted;
-        """)
+def insert_snapshot_rows(
+    rows: List[JobRow],
+    keyword: str,
+    areas: str,
+    conn_str: str,
+    snapshot_time: Optional[str] = None,
+    conn: Optional[pyodbc.Connection] = None,
+    storage: Optional[str] = None,
+) -> int:
+    with SnapshotWriter(keyword, areas, conn_str, snapshot_time=snapshot_time, conn=conn, storage=storage) as w:
+        w.add(rows)
+        return w.commit()
 
-        inserted_count = _fetch_first_scalar(cur)
 
-        conn.commit()
-        return inserted_count
+class SnapshotWriter:
+    """
+    分批寫入的快照（串流 pipeline 用）：
+    - add(rows) 先放進 #job_stage（每 batch_size 筆 executemany 一次，記憶體只留一批）
+    - commit() 才 MERGE 進正式表並 commit；中途出錯 / rollback() 正式表完全不動
+    - 同一個快照裡重複的 job_id 只 stage 第一筆（避免 MERGE 來源重複撞 unique index）
+    - add_details()：職缺明細（job_enrich.JobDetail）也一起 stage，commit 時跟快照同一個交易寫進 job_detail
+    - storage=cdc：commit 時改成「內容沒變就延長區間、有變才新增版本」；inserted 仍是這一天新記錄的職缺數，
+      versions_written 是實際新增的版本列數
+    """
 
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    def __init__(
+        self,
+        keyword: str,
+        areas: str,
+        conn_str: str,
+        snapshot_time: Optional[str] = None,
+        conn: Optional[pyodbc.Connection] = None,
+        batch_size: int = 500,
+        storage: Optional[str] = None,
+    ):
+        self.keyword = keyword
+        self.areas = areas
+        self.conn_str = conn_str
+        self.batch_size = max(1, batch_size)
+        self.storage = _storage(storage)
+        self.staged = 0
+        self.inserted = 0
+        self.versions_written = 0
+
+        self._st = _parse_snapshot_time(snapshot_time)
+        self._sd = self._st.date()
+        self._shared_conn = conn
+        self._conn: Optional[pyodbc.Connection] = None
+        self._cur: Optional[pyodbc.Cursor] = None
+        self._buf: List[tuple] = []
+        self._seen: "set[str]" = set()
+        self._detail_buf: List[tuple] = []
+        self._detail_staged = False
+        self._done = False
+
+    def _cursor(self) -> pyodbc.Cursor:
+        # 第一批資料進來才連線 / 建 stage（完全沒資料就不碰 DB）
+        if self._cur is None:
+            init_db(self.conn_str, self._shared_conn)
+            self._conn = self._shared_conn or connect(self.conn_str)
+            self._cur = self._conn.cursor()
+            _create_stage(self._cur)
+        return self._cur
+
+    def add(self, rows: List[JobRow]) -> None:
+        for r in rows:
+            t = _row_tuple(self._sd, self._st, self.keyword, self.areas, r)
+            if t is None or t[4] in self._seen:
+                continue
+            self._seen.add(t[4])
+            self._buf.append(t)
+            if len(self._buf) >= self.batch_size:
+                self.flush()
+
+    def add_details(self, details: Iterable[Any]) -> None:
+        for d in details:
+            self._detail_buf.append((d.job_id, d.marker, d.requirements, d.work_exp, d.edu,
+                                     d.skills, d.headcount, d.remote))
+        if len(self._detail_buf) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buf and not self._detail_buf:
+            return
+        try:
+            cur = self._cursor()
+            if self._buf:
+                _stage_rows(cur, self._buf)
+            if self._detail_buf:
+                if not self._detail_staged:
+                    _create_detail_stage(cur)
+                    self._detail_staged = True
+                _stage_details(cur, self._detail_buf)
+        except Exception:
+            self.rollback()
+            raise
+        self.staged += len(self._buf)
+        self._buf = []
+        self._detail_buf = []
+
+    def commit(self) -> int:
+        if self._done:
+            return self.inserted
+        self.flush()
+        if self._cur is None:
+            self._done = True
+            return 0
+        try:
+            if self.storage == STORAGE_CDC:
+                self.inserted, self.versions_written = _merge_stage_cdc(self._cur)
+            else:
+                self.inserted = _merge_stage(self._cur)
+            if self._detail_staged:
+                _merge_detail_stage(self._cur)
+            self._conn.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self._done = True
+        self._release()
+        return self.inserted
+
+    def rollback(self) -> None:
+        if self._conn is not None and not self._done:
+            try:
+                self._conn.rollback()
+            finally:
+                self._done = True
+                self._release()
+        self._done = True
+        self._buf = []
+
+    def _release(self) -> None:
+        if self._conn is not None and self._shared_conn is None:
+            self._conn.close()
+        self._conn = None
+        self._cur = None
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None or not self._done:
+            # 沒有明確 commit() 就離開 = 放棄這份快照
+            self.rollback()
+
+
+def _create_stage(cur: pyodbc.Cursor) -> None:
+    cur.execute("""
+    SET NOCOUNT ON;
+
+    IF OBJECT_ID('tempdb..#job_stage') IS NOT NULL DROP TABLE #job_stage;
+
+    CREATE TABLE #job_stage (
+        snapshot_date DATE NOT NULL,
+        snapshot_time DATETIME2(0) NOT NULL,
+        keyword NVARCHAR(200) NOT NULL,
+        areas NVARCHAR(200) NOT NULL,
+        job_id NVARCHAR(50) NOT NULL,
+        title NVARCHAR(500) NULL,
+        company NVARCHAR(500) NULL,
+        location NVARCHAR(500) NULL,
+        salary_text NVARCHAR(500) NULL,
+        post_date NVARCHAR(50) NULL,
+        url NVARCHAR(1000) NULL,
+        content_hash BINARY(20) NOT NULL,
+        salary_period NVARCHAR(10) NULL,
+        salary_min INT NULL,
+        salary_max INT NULL,
+        salary_negotiable BIT NULL,
+        salary_month_min INT NULL,
+        salary_month_max INT NULL
+    );
+    """)
+
+
+def _stage_rows(cur: pyodbc.Cursor, payload: List[tuple]) -> None:
+    cur.fast_executemany = True
+    cur.executemany(f"""
+        INSERT INTO #job_stage
+        (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url,
+         content_hash, {_SALARY_COLS_SQL})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    """, payload)
+
+
+def _merge_stage(cur: pyodbc.Cursor) -> int:
+    # ⚠️ 這裡是重點：NOCOUNT ON + 最後有 SELECT inserted_count
+    cur.execute(f"""
+    SET NOCOUNT ON;
+
+    DECLARE @Inserted TABLE (job_id NVARCHAR(50));
+
+    MERGE {TABLE_FULLNAME} WITH (HOLDLOCK) AS T
+    USING #job_stage AS S
+    ON  T.snapshot_date = S.snapshot_date
+    AND T.keyword = S.keyword
+    AND T.areas = S.areas
+    AND T.job_id = S.job_id
+    WHEN NOT MATCHED THEN
+        INSERT (snapshot_date, snapshot_time, keyword, areas, job_id, title, company, location, salary_text, post_date, url,
+                {_SALARY_COLS_SQL})
+        VALUES (S.snapshot_date, S.snapshot_time, S.keyword, S.areas, S.job_id, S.title, S.company, S.location, S.salary_text, S.post_date, S.url,
+                S.salary_period, S.salary_min, S.salary_max, S.salary_negotiable, S.salary_month_min, S.salary_month_max)
+    OUTPUT inserted.job_id INTO @Inserted(job_id);
+
+    SELECT COUNT(1) AS inserted_count FROM @Inserted;
+
+    DROP TABLE #job_stage;
+    """)
+    return _fetch_first_scalar(cur)
+
+
+def _merge_stage_cdc(cur: pyodbc.Cursor) -> Tuple[int, int]:
+    """
+    #job_stage（同一個搜尋條件、同一天）-> job_version
+    - 該 job 最新版本內容相同，且上一次抓取（job_capture 裡比今天早的最後一天）還在 -> 只延長 valid_to
+    - 新職缺 / 內容變了 / 中間消失過又出現 -> 新增一個版本（舊版本的 valid_to 留在最後看到的那天）
+    - 今天已經記過（同一天重跑）-> 不動（跟 snapshot 模式「同一天只留第一筆」一致）
+    回傳 (今天新記錄的職缺數, 新增的版本數)
+    """
+    cur.execute(f"""
+    SET NOCOUNT ON;
+
+    DECLARE @sd DATE, @st DATETIME2(0), @kw NVARCHAR(200), @areas NVARCHAR(200), @prev DATE, @staged INT;
+    SELECT TOP 1 @sd = snapshot_date, @st = snapshot_time, @kw = keyword, @areas = areas FROM #job_stage;
+    SELECT @staged = COUNT(1) FROM #job_stage;
+    SELECT @prev = MAX(snapshot_date) FROM {CAPTURE_TABLE} WITH (HOLDLOCK)
+    WHERE keyword = @kw AND areas = @areas AND snapshot_date < @sd;
+
+    SELECT S.*, V.version_id, V.content_hash AS cur_hash, V.valid_to AS cur_to, CAST(0 AS BIT) AS extend
+    INTO #cdc
+    FROM #job_stage AS S
+    OUTER APPLY (
+        SELECT TOP 1 version_id, content_hash, valid_to
+        FROM {VERSION_TABLE} WITH (UPDLOCK, HOLDLOCK)
+        WHERE keyword = S.keyword AND areas = S.areas AND job_id = S.job_id
+        ORDER BY valid_from DESC
+    ) AS V;
+
+    DELETE FROM #cdc WHERE cur_to >= @sd;
+
+    UPDATE #cdc SET extend = 1
+    WHERE version_id IS NOT NULL AND cur_hash = content_hash AND @prev IS NOT NULL AND cur_to >= @prev;
+
+    UPDATE V SET valid_to = C.snapshot_date, last_seen = C.snapshot_time
+    FROM {VERSION_TABLE} AS V
+    JOIN #cdc AS C ON C.version_id = V.version_id
+    WHERE C.extend = 1;
+    DECLARE @extended INT = @@ROWCOUNT;
+
+    INSERT INTO {VERSION_TABLE}
+    (keyword, areas, job_id, content_hash, valid_from, valid_to, first_seen, last_seen,
+     title, company, location, salary_text, post_date, url, {_SALARY_COLS_SQL})
+    SELECT keyword, areas, job_id, content_hash, snapshot_date, snapshot_date, snapshot_time, snapshot_time,
+           title, company, location, salary_text, post_date, url, {_SALARY_COLS_SQL}
+    FROM #cdc
+    WHERE extend = 0;
+    DECLARE @versions INT = @@ROWCOUNT;
+
+    IF @sd IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM {CAPTURE_TABLE} WHERE keyword = @kw AND areas = @areas AND snapshot_date = @sd
+    )
+        INSERT INTO {CAPTURE_TABLE} (keyword, areas, snapshot_date, snapshot_time, row_count)
+        VALUES (@kw, @areas, @sd, @st, @staged);
+
+    SELECT @extended + @versions AS recorded_count, @versions AS version_count;
+
+    DROP TABLE #cdc;
+    DROP TABLE #job_stage;
+    """)
+    row = _fetch_first_row(cur)
+    if not row:
+        return 0, 0
+    return int(row[0] or 0), int(row[1] or 0)
+
+
+def _create_detail_stage(cur: pyodbc.Cursor) -> None:
+    cur.execute("""
+    SET NOCOUNT ON;
+
+    IF OBJECT_ID('tempdb..#detail_stage') IS NOT NULL DROP TABLE #detail_stage;
+
+    CREATE TABLE #detail_stage (
+        job_id NVARCHAR(50) NOT NULL,
+        marker NVARCHAR(50) NOT NULL,
+        requirements NVARCHAR(MAX) NULL,
+        work_exp NVARCHAR(100) NULL,
+        edu NVARCHAR(200) NULL,
+        skills NVARCHAR(2000) NULL,
+        headcount NVARCHAR(50) NULL,
+        remote NVARCHAR(200) NULL
+    );
+    """)
+
+
+def _stage_details(cur: pyodbc.Cursor, payload: List[tuple]) -> None:
+    cur.fast_executemany = True
+    cur.executemany("""
+        INSERT INTO #detail_stage (job_id, marker, requirements, work_exp, edu, skills, headcount, remote)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+    """, payload)
+
+
+def _merge_detail_stage(cur: pyodbc.Cursor) -> None:
+    # 同一個 job_id 在 stage 裡出現多次時取任一筆（同一輪抓的，內容相同）
+    cur.execute(f"""
+    SET NOCOUNT ON;
+
+    MERGE {DETAIL_TABLE} WITH (HOLDLOCK) AS T
+    USING (
+        SELECT job_id, marker, requirements, work_exp, edu, skills, headcount, remote
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY job_id ORDER BY job_id) AS rn
+            FROM #detail_stage
+        ) x
+        WHERE rn = 1
+    ) AS S
+    ON T.job_id = S.job_id
+    WHEN MATCHED AND T.marker <> S.marker THEN
+        UPDATE SET marker = S.marker, requirements = S.requirements, work_exp = S.work_exp, edu = S.edu,
+                   skills = S.skills, headcount = S.headcount, remote = S.remote, updated_at = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (job_id, marker, requirements, work_exp, edu, skills, headcount, remote, updated_at)
+        VALUES (S.job_id, S.marker, S.requirements, S.work_exp, S.edu, S.skills, S.headcount, S.remote, SYSDATETIME());
+
+    DROP TABLE #detail_stage;
+    """)
+
+
+def get_detail_markers(
+    job_ids: List[str],
+    conn_str: str,
+    conn: Optional[pyodbc.Connection] = None,
+) -> Dict[str, str]:
+    """已存明細的更新標記：{job_id: marker}（job_enrich 用來判斷要不要重抓）"""
+    if not job_ids:
+        return {}
+    init_db(conn_str, conn)
+    out: Dict[str, str] = {}
+    with _use_conn(conn_str, conn) as conn:
+        cur = conn.cursor()
+        # SQL Server 參數上限 2100，分批查
+        for i in range(0, len(job_ids), 1000):
+            chunk = job_ids[i:i + 1000]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT job_id, marker FROM {DETAIL_TABLE} WHERE job_id IN ({marks});
+            """, chunk)
+            out.update({r[0]: r[1] for r in cur.fetchall()})
+    return out
 
 
-def _get_job_ids_for_day(conn_str: str, keyword: str, areas: str, snapshot_date: str) -> List[str]:
-    init_db(conn_str)
-    conn = connect(conn_str)
-    try:
+def _get_job_ids_for_day(
+    conn_str: str,
+    keyword: str,
+    areas: str,
+    snapshot_date: str,
+    conn: Optional[pyodbc.Connection] = None,
+    storage: Optional[str] = None,
+) -> List[str]:
+    init_db(conn_str, conn)
+    with _use_conn(conn_str, conn) as conn:
         cur = conn.cursor()
-        cur.execute(f"""
-            SET NOCOUNT ON;
-            SELECT DISTINCT job_id
-            FROM {TABLE_FULLNAME}
-            WHERE snapshot_date = ? AND keyword = ? AND areas = ?;
-        """, (snapshot_date, keyword, areas))
+        if _storage(storage) == STORAGE_CDC:
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT DISTINCT job_id
+                FROM {VERSION_TABLE}
+                WHERE keyword = ? AND areas = ? AND valid_from <= ? AND valid_to >= ?;
+            """, (keyword, areas, snapshot_date, snapshot_date))
+        else:
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT DISTINCT job_id
+                FROM {TABLE_FULLNAME}
+                WHERE snapshot_date = ? AND keyword = ? AND areas = ?;
+            """, (snapshot_date, keyword, areas))
         return [r[0] for r in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def diff_today_yesterday(
     keyword: str,
     areas: str,
     conn_str: str,
-    today: Optional[str] = None
+    today: Optional[str] = None,
+    conn: Optional[pyodbc.Connection] = None,
+    storage: Optional[str] = None,
 ) -> Tuple[List[str], List[str], str, str]:
     if today is None:
         today_date = datetime.date.today().strftime("%Y-%m-%d")
@@ -211,21 +642,81 @@ def diff_today_yesterday(
     y_date = (datetime.datetime.strptime(today_date, "%Y-%m-%d").date()
               - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
 
-    today_ids = set(_get_job_ids_for_day(conn_str, keyword, areas, today_date))
-    y_ids = set(_get_job_ids_for_day(conn_str, keyword, areas, y_date))
+    today_ids = set(_get_job_ids_for_day(conn_str, keyword, areas, today_date, conn, storage))
+    y_ids = set(_get_job_ids_for_day(conn_str, keyword, areas, y_date, conn, storage))
 
     new_ids = sorted(list(today_ids - y_ids))
     removed_ids = sorted(list(y_ids - today_ids))
     return new_ids, removed_ids, today_date, y_date
 
 
-def fetch_jobs_by_ids(job_ids: List[str], conn_str: str) -> List[Dict[str, str]]:
+def get_latest_snapshot_rows(
+    keyword: str,
+    areas: str,
+    conn_str: str,
+    before: Optional[str] = None,
+    conn: Optional[pyodbc.Connection] = None,
+    storage: Optional[str] = None,
+) -> Tuple[Optional[str], List[JobRow]]:
+    """
+    取某個搜尋條件「最近一次」快照（snapshot_date < before；before 預設今天）
+    回傳：(snapshot_date, rows)；沒有任何快照就回 (None, [])
+    增量抓取用：拿來判斷哪些 job_id 已經知道、以及沿用沒重抓的資料
+    """
+    if before is None:
+        before = datetime.date.today().strftime("%Y-%m-%d")
+
+    cdc = _storage(storage) == STORAGE_CDC
+    init_db(conn_str, conn)
+    with _use_conn(conn_str, conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SET NOCOUNT ON;
+            SELECT CONVERT(VARCHAR(10), MAX(snapshot_date), 120)
+            FROM {CAPTURE_TABLE if cdc else TABLE_FULLNAME}
+            WHERE keyword = ? AND areas = ? AND snapshot_date < ?;
+        """, (keyword, areas, before))
+        row = cur.fetchone()
+        last_date = row[0] if row else None
+        if not last_date:
+            return None, []
+
+        if cdc:
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT job_id, title, company, location, salary_text, post_date, url
+                FROM {VERSION_TABLE}
+                WHERE keyword = ? AND areas = ? AND valid_from <= ? AND valid_to >= ?
+                ORDER BY version_id;
+            """, (keyword, areas, last_date, last_date))
+        else:
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT job_id, title, company, location, salary_text, post_date, url
+                FROM {TABLE_FULLNAME}
+                WHERE snapshot_date = ? AND keyword = ? AND areas = ?
+                ORDER BY id;
+            """, (last_date, keyword, areas))
+        rows = [JobRow(*(v or "" for v in r)) for r in cur.fetchall()]
+        return last_date, rows
+
+
+def fetch_jobs_by_ids(
+    job_ids: List[str],
+    conn_str: str,
+    conn: Optional[pyodbc.Connection] = None,
+    storage: Optional[str] = None,
+) -> List[Dict[str, str]]:
     if not job_ids:
         return []
 
-    init_db(conn_str)
-    conn = connect(conn_str)
-    try:
+    if _storage(storage) == STORAGE_CDC:
+        table, time_col = VERSION_TABLE, "last_seen"
+    else:
+        table, time_col = TABLE_FULLNAME, "snapshot_time"
+
+    init_db(conn_str, conn)
+    with _use_conn(conn_str, conn) as conn:
         cur = conn.cursor()
         out: List[Dict[str, str]] = []
 
@@ -234,10 +725,10 @@ def fetch_jobs_by_ids(job_ids: List[str], conn_str: str) -> List[Dict[str, str]]
                 SET NOCOUNT ON;
                 SELECT TOP 1
                     job_id, title, company, location, salary_text, post_date, url,
-                    CONVERT(VARCHAR(16), snapshot_time, 120) AS snapshot_time
-                FROM {TABLE_FULLNAME}
+                    CONVERT(VARCHAR(16), {time_col}, 120) AS snapshot_time
+                FROM {table}
                 WHERE job_id = ?
-                ORDER BY snapshot_time DESC;
+                ORDER BY {time_col} DESC;
             """, (jid,))
             row = cur.fetchone()
             if not row:
@@ -253,6 +744,154 @@ def fetch_jobs_by_ids(job_ids: List[str], conn_str: str) -> List[Dict[str, str]]
                 "snapshot_time": row[7] or "",
             })
         return out
-    finally:
-        conn.close()
 
+
+
+# -------------------------
+# cdc：儲存量報告 / 從舊快照轉入
+# -------------------------
+@dataclass
+class StorageReport:
+    captures: int = 0          # 抓過幾次（搜尋條件 × 天）
+    versions: int = 0          # cdc 實際存的列數
+    snapshot_rows: int = 0     # 同樣資料用 snapshot 模式要存的列數
+    version_bytes: int = 0     # 內容欄位的資料量（DATALENGTH 加總，不含索引 / 列開銷）
+    snapshot_bytes: int = 0
+
+    @property
+    def rows_saved(self) -> int:
+        return self.snapshot_rows - self.versions
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.snapshot_bytes - self.version_bytes
+
+    def summary(self) -> str:
+        ratio = (self.versions / self.snapshot_rows) if self.snapshot_rows else 0.0
+        return (f"抓取 {self.captures} 次：cdc {self.versions:,} 列 vs 完整快照 {self.snapshot_rows:,} 列"
+                f"（{ratio:.0%}），省下 {self.rows_saved:,} 列、約 {self.bytes_saved / 1024 / 1024:.1f} MB")
+
+
+def storage_report(
+    conn_str: str,
+    keyword: Optional[str] = None,
+    areas: Optional[str] = None,
+    conn: Optional[pyodbc.Connection] = None,
+) -> StorageReport:
+    """
+    cdc 跟「每天完整存一份」相比省了多少：
+    每個版本在 snapshot 模式下要存的份數 = 它有效區間內實際抓過的天數（job_capture）
+    """
+    init_db(conn_str, conn)
+    with _use_conn(conn_str, conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @kw NVARCHAR(200) = ?, @areas NVARCHAR(200) = ?;
+
+            SELECT
+                (SELECT COUNT(1) FROM {CAPTURE_TABLE}
+                 WHERE (@kw IS NULL OR keyword = @kw) AND (@areas IS NULL OR areas = @areas)),
+                COUNT(1),
+                ISNULL(SUM(CAST(d.days AS BIGINT)), 0),
+                ISNULL(SUM(CAST(b.bytes AS BIGINT)), 0),
+                ISNULL(SUM(CAST(b.bytes AS BIGINT) * d.days), 0)
+            FROM {VERSION_TABLE} AS V
+            CROSS APPLY (
+                SELECT COUNT(1) AS days FROM {CAPTURE_TABLE} AS C
+                WHERE C.keyword = V.keyword AND C.areas = V.areas
+                  AND C.snapshot_date BETWEEN V.valid_from AND V.valid_to
+            ) AS d
+            CROSS APPLY (
+                SELECT ISNULL(DATALENGTH(V.keyword), 0) + ISNULL(DATALENGTH(V.areas), 0)
+                     + ISNULL(DATALENGTH(V.job_id), 0) + ISNULL(DATALENGTH(V.title), 0)
+                     + ISNULL(DATALENGTH(V.company), 0) + ISNULL(DATALENGTH(V.location), 0)
+                     + ISNULL(DATALENGTH(V.salary_text), 0) + ISNULL(DATALENGTH(V.post_date), 0)
+                     + ISNULL(DATALENGTH(V.url), 0) AS bytes
+            ) AS b
+            WHERE (@kw IS NULL OR V.keyword = @kw) AND (@areas IS NULL OR V.areas = @areas);
+        """, (keyword, areas))
+        row = _fetch_first_row(cur)
+    if not row:
+        return StorageReport()
+    return StorageReport(*(int(v or 0) for v in row))
+
+
+def backfill_cdc_from_snapshots(
+    conn_str: str,
+    conn: Optional[pyodbc.Connection] = None,
+) -> int:
+    """
+    把 job_snapshot 既有的每日快照依日期順序重播進 job_version（已經轉過的天會自動略過）
+    回傳處理了幾份快照（搜尋條件 × 天）
+    """
+    init_db(conn_str, conn)
+    done = 0
+    with _use_conn(conn_str, conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SET NOCOUNT ON;
+            SELECT S.keyword, S.areas, S.snapshot_date
+            FROM {TABLE_FULLNAME} AS S
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {CAPTURE_TABLE} AS C
+                WHERE C.keyword = S.keyword AND C.areas = S.areas AND C.snapshot_date = S.snapshot_date
+            )
+            GROUP BY S.keyword, S.areas, S.snapshot_date
+            ORDER BY S.snapshot_date, S.keyword, S.areas;
+        """)
+        todo = cur.fetchall()
+        for kw, areas, sd in todo:
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT snapshot_date, snapshot_time, keyword, areas,
+                       job_id, title, company, location, salary_text, post_date, url
+                FROM {TABLE_FULLNAME}
+                WHERE keyword = ? AND areas = ? AND snapshot_date = ?
+                ORDER BY id;
+            """, (kw, areas, sd))
+            payload = [_stage_tuple(*r[:4], JobRow(*(v or "" for v in r[4:]))) for r in cur.fetchall()]
+            try:
+                _create_stage(cur)
+                _stage_rows(cur, payload)
+                _merge_stage_cdc(cur)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            done += 1
+    return done
+
+
+def backfill_salary_columns(
+    conn_str: str,
+    conn: Optional[pyodbc.Connection] = None,
+) -> int:
+    """
+    既有資料補算薪資數字欄（salary_period 還是 NULL 的列）
+    薪資文字種類很少：先撈不重複的 salary_text，各解析一次，再以文字為單位整批 UPDATE
+    回傳處理的不重複薪資文字數
+    """
+    init_db(conn_str, conn)
+    done = 0
+    with _use_conn(conn_str, conn) as conn:
+        cur = conn.cursor()
+        for table in (TABLE_FULLNAME, VERSION_TABLE):
+            cur.execute(f"""
+                SET NOCOUNT ON;
+                SELECT DISTINCT ISNULL(salary_text, N'') FROM {table} WHERE salary_period IS NULL;
+            """)
+            texts = [r[0] for r in cur.fetchall()]
+            if not texts:
+                continue
+            payload = [parse_salary(t).columns() + (t,) for t in texts]
+            cur.fast_executemany = True
+            cur.executemany(f"""
+                UPDATE {table}
+                SET salary_period = ?, salary_min = ?, salary_max = ?, salary_negotiable = ?,
+                    salary_month_min = ?, salary_month_max = ?
+                WHERE salary_period IS NULL AND ISNULL(salary_text, N'') = ?;
+            """, payload)
+            conn.commit()
+            done += len(texts)
+    return done
@@ -0,0 +1,200 @@
+# 張詠鈞的python工作區
+# File: job_enrich
+# Created: 2026/3/4 下午 02:15
+
+# job_enrich.py
+# 職缺明細補充（選用）：清單 API 只有標題 / 公司 / 薪資 / 地點，
+# 這裡再去打每筆職缺的明細 JSON（/job/ajax/content/<code>），補上
+# 條件要求、技能、需求人數、遠端工作 等欄位，跟快照一起存進 DB（dbo.job_detail）。
+#
+# - 多筆同時抓（concurrency 上限）+ token bucket 控制每秒請求數
+# - 以 job_id + 更新標記（清單的 appearDate）當快取鍵：
+#     DB 已有同一個標記的明細 -> 完全不抓
+#     HTTP 快取（http_cache，source=104_detail）有同一個標記 -> 不上網
+#   104 更新職缺時 appearDate 會變，才會重新抓
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from async_fetcher import TokenBucket
+from http_cache import ResponseCache, fingerprint, from_requests, get_default_cache
+from http_transport import build_session
+from job_row import JobRow
+
+BASE_URL_104 = "https://www.104.com.tw"
+DETAIL_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+# 職缺網址 https://www.104.com.tw/job/8b8bs?jobsource=... 裡的 8b8bs 才是明細 API 用的代碼
+_JOB_CODE_RE = re.compile(r"/job/([0-9A-Za-z]+)")
+
+# 給 DB 查「哪些 job_id 已經有這個標記的明細」：job_ids -> {job_id: marker}
+MarkerLookup = Callable[[List[str]], Dict[str, str]]
+
+
+@dataclass
+class JobDetail:
+    job_id: str
+    marker: str               # 抓取當下清單上的 appearDate（變了才重抓）
+    requirements: str = ""    # 其他條件（條件要求的自由文字）
+    work_exp: str = ""        # 工作經歷
+    edu: str = ""             # 學歷要求
+    skills: str = ""          # 擅長工具 + 工作技能（頓號分隔）
+    headcount: str = ""       # 需求人數（例：1~2人）
+    remote: str = ""          # 遠端工作說明（空字串 = 不可遠端 / 未提供）
+
+    @property
+    def is_remote(self) -> bool:
+        return bool(self.remote)
+
+
+@dataclass
+class EnrichStats:
+    requested: int = 0
+    skipped_known: int = 0     # DB 已有同標記明細
+    cache_hits: int = 0        # HTTP 快取命中
+    fetched: int = 0           # 真的上網抓
+    failed: int = 0
+    elapsed: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        return (f"明細 {self.requested} 筆：沿用 {self.skipped_known}、快取 {self.cache_hits}、"
+                f"新抓 {self.fetched}、失敗 {self.failed}（{self.elapsed:.1f}s）")
+
+
+def job_code(row: JobRow) -> str:
+    m = _JOB_CODE_RE.search(row.url or "")
+    return m.group(1) if m else row.job_id
+
+
+def _names(items: Any) -> List[str]:
+    out = []
+    for it in items or []:
+        if isinstance(it, dict):
+            name = str(it.get("description") or "").strip()
+        else:
+            name = str(it or "").strip()
+        if name:
+            out.append(name)
+    return out
+
+
+def parse_job_detail(job_id: str, marker: str, payload: Dict[str, Any]) -> JobDetail:
+    """104 明細 JSON（data.condition / data.jobDetail）-> JobDetail"""
+    data = payload.get("data") or {}
+    cond = data.get("condition") or {}
+    detail = data.get("jobDetail") or {}
+
+    remote = detail.get("remoteWork") or ""
+    if isinstance(remote, dict):
+        remote = remote.get("description") or ""
+
+    skills = _names(cond.get("specialty")) + _names(cond.get("skill"))
+    return JobDetail(
+        job_id=job_id,
+        marker=marker,
+        requirements=str(cond.get("other") or "").strip(),
+        work_exp=str(cond.get("workExp") or "").strip(),
+        edu=str(cond.get("edu") or "").strip(),
+        skills="、".join(dict.fromkeys(skills)),
+        headcount=str(detail.get("needEmp") or "").strip(),
+        remote=str(remote).strip(),
+    )
+
+
+class DetailEnricher:
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        base_url: str = BASE_URL_104,
+        concurrency: int = 4,
+        rps: float = 3.0,
+        timeout: int = 20,
+        cache: Optional[ResponseCache] = None,
+        known_markers: Optional[MarkerLookup] = None,
+    ):
+        self.session = session or build_session()
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.rps = rps
+        self.timeout = timeout
+        self.cache = cache
+        self.known_markers = known_markers
+        self.stats = EnrichStats()
+
+    def _fetch_one(self, row: JobRow) -> Tuple[JobDetail, bool]:
+        code = job_code(row)
+        url = f"{self.base_url}/job/ajax/content/{code}"
+        headers = {
+            "Accept": "application/json, text/plain, */*",
+            "Referer": f"{self.base_url}/job/{code}",
+            "User-Agent": DETAIL_UA,
+        }
+        # 更新標記只放進快取指紋，不會真的送給 104
+        fp = fingerprint("GET", url, {"_marker": row.post_date}, headers)
+        cache = self.cache or get_default_cache()
+        r = cache.fetch(
+            "104_detail", fp,
+            lambda: from_requests(self.session.get(url, headers=headers, timeout=self.timeout)),
+        )
+        r.raise_for_status()
+        return parse_job_detail(row.job_id, row.post_date, r.json()), r.from_cache
+
+    async def _enrich_async(self, rows: List[JobRow]) -> Dict[str, JobDetail]:
+        bucket = TokenBucket(self.rps)
+        sem = asyncio.Semaphore(self.concurrency)
+        out: Dict[str, JobDetail] = {}
+
+        async def _one(row: JobRow) -> None:
+            async with sem:
+                # 快取命中不必等 token；但事先不知道會不會命中，所以一律排隊（保守）
+                await bucket.acquire()
+                try:
+                    detail, from_cache = await asyncio.to_thread(self._fetch_one, row)
+                except Exception as e:
+                    self.stats.failed += 1
+                    self.stats.errors[row.job_id] = str(e)
+                    return
+            # 統計只在 event loop 這個 thread 更新
+            out[row.job_id] = detail
+            if from_cache:
+                self.stats.cache_hits += 1
+            else:
+                self.stats.fetched += 1
+
+        await asyncio.gather(*(_one(r) for r in rows))
+        return out
+
+    def enrich(self, rows: List[JobRow]) -> Dict[str, JobDetail]:
+        """
+        回傳 {job_id: JobDetail}（只含這次「新抓 / 從 HTTP 快取來」的；DB 已有同標記的不回傳）
+        失敗的 job 記在 stats.errors，不影響其他筆
+        """
+        t0 = time.perf_counter()
+        todo: Dict[str, JobRow] = {}
+        for r in rows:
+            r = JobRow.coerce(r)
+            if r.job_id and r.job_id not in todo:
+                todo[r.job_id] = r
+        self.stats.requested += len(todo)
+
+        if self.known_markers is not None and todo:
+            known = self.known_markers(list(todo))
+            for jid, marker in known.items():
+                row = todo.get(jid)
+                if row is not None and marker == row.post_date:
+                    del todo[jid]
+                    self.stats.skipped_known += 1
+
+        out = asyncio.run(self._enrich_async(list(todo.values()))) if todo else {}
+        self.stats.elapsed += time.perf_counter() - t0
+        return out
@@ -0,0 +1,97 @@
+# 張詠鈞的python工作區
+# File: job_row
+# Created: 2026/3/3 上午 10:10
+
+# job_row.py
+# 一筆職缺的輕量記錄（取代到處傳的 7 個 key 的 dict）
+# - __slots__：沒有每筆一個 __dict__，10 萬筆歷史資料載入省很多記憶體
+# - 公司 / 地點 / 薪資文字 / 日期 這些大量重複的字串用 sys.intern 共用同一份
+# - 相容舊的 dict 用法：r["title"]、r.get("title", "")、dict(r) 都還能用，
+#   既有的 UI / DB / CSV 程式不用一次全改
+#
+# 記憶體比較：python bench_job_row.py
+
+import sys
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+JOB_FIELDS: Tuple[str, ...] = ("job_id", "title", "company", "location", "salary_text", "post_date", "url")
+
+_intern = sys.intern
+
+
+class JobRow:
+    __slots__ = JOB_FIELDS
+
+    def __init__(
+        self,
+        job_id: str,
+        title: str = "",
+        company: str = "",
+        location: str = "",
+        salary_text: str = "",
+        post_date: str = "",
+        url: str = "",
+    ):
+        self.job_id = job_id
+        self.title = title
+        # 下面這幾欄在一次搜尋 / 歷史快照裡重複率很高
+        self.company = _intern(company)
+        self.location = _intern(location)
+        self.salary_text = _intern(salary_text)
+        self.post_date = _intern(post_date)
+        self.url = url
+
+    @classmethod
+    def from_mapping(cls, m: Mapping[str, Any]) -> "JobRow":
+        return cls(*(str(m.get(k) or "").strip() for k in JOB_FIELDS))
+
+    @classmethod
+    def coerce(cls, r: Union["JobRow", Mapping[str, Any]]) -> "JobRow":
+        """JobRow 直接回傳；舊的 dict 轉成 JobRow"""
+        return r if isinstance(r, JobRow) else cls.from_mapping(r)
+
+    # -------------------------
+    # dict 相容介面
+    # -------------------------
+    def __getitem__(self, key: str) -> str:
+        if key not in JOB_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        if key not in JOB_FIELDS:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in JOB_FIELDS
+
+    def keys(self) -> Tuple[str, ...]:
+        return JOB_FIELDS
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        return ((k, getattr(self, k)) for k in JOB_FIELDS)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(JOB_FIELDS)
+
+    def __len__(self) -> int:
+        return len(JOB_FIELDS)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {k: getattr(self, k) for k in JOB_FIELDS}
+
+    def astuple(self) -> Tuple[str, ...]:
+        return tuple(getattr(self, k) for k in JOB_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, JobRow):
+            return self.astuple() == other.astuple()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"JobRow(job_id={self.job_id!r}, title={self.title!r}, company={self.company!r})"
@@ -15,17 +15,26 @@
 # 4) 寫入 SQLite（job_db.py）
 # 5) 顯示「今天 vs 昨天」新增/消失
 
+import asyncio
 import csv
 import datetime
+import os
 import re
-import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 import urllib.parse
-from area_mapper import resolve_area
+from area_mapper import resolve_many
+from async_fetcher import PageResult
+from job_row import JobRow
+from http_cache import CachedResponse, ResponseCache, fingerprint, from_requests, get_default_cache
+from http_transport import Transport, get_default_transport
+from session_bootstrap import SessionBootstrap
 import job_MSSQL_db as job_db
-from playwright.sync_api import sync_playwright
+from browser_pool import BrowserPool, get_default_pool
+from response_capture import JobListCapture
+from route_filter import RouteStats
+from run_metrics import RunMetrics
 
 UA_104 = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -33,6 +42,14 @@ UA_104 = (
     "Chrome/122.0.0.0 Safari/537.36"
 )
 UA = UA_104
+
+# 104 站台根網址（改成本機替身伺服器即可離線測試 / benchmark）
+BASE_URL_104 = "https://www.104.com.tw"
+
+# 最近一次 fetch_jobs_via_playwright 的資源攔截統計（UI 狀態列用）
+last_route_stats: Optional[RouteStats] = None
+
+
 def now_tag() -> str:
     return datetime.datetime.now().strftime("%Y%m%d_%H%M")
 
@@ -44,27 +61,67 @@ def safe_filename(s: str) -> str:
     return s[:80] if len(s) > 80 else s
 
 
-def build_session() -> requests.Session:
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": "Mozilla/5.0",
-        "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-    })
-    return s
+def build_session(transport: Optional[Transport] = None) -> requests.Session:
+    """共用連線池 + keep-alive + gzip 的 session（見 http_transport.py）"""
+    return (transport or get_default_transport()).build_session()
+
+
 
 
+class HtmlDowngradeError(RuntimeError):
+    """104 list API 回 HTML（被降級，拿不到 JSON）"""
 
 
-def fetch_104_jobs_json(session: requests.Session, keyword: str, area_codes_csv: str, page: int = 1, timeout: int = 20) -> Dict[str, Any]:
-    # 1) 先進搜尋頁，讓站點把必要 cookie/token 種進 session
-    session.get(
-        "https://www.104.com.tw/jobs/search/",
-        headers={"User-Agent": UA, "Referer": "https://www.104.com.tw/"},
-        timeout=timeout
-    )
+def fetch_104_jobs_json(
+    session: requests.Session,
+    keyword: str,
+    area_codes_csv: str,
+    page: int = 1,
+    timeout: int = 20,
+    base_url: str = BASE_URL_104,
+    bootstrap: Optional[SessionBootstrap] = None,
+    cache: Optional[ResponseCache] = None,
+) -> Dict[str, Any]:
+    url, params, headers = _list_request(keyword, area_codes_csv, page, base_url)
+
+    def _send() -> CachedResponse:
+        # 1) 先進搜尋頁，讓站點把必要 cookie/token 種進 session
+        #    有 bootstrap 就交給它（cookie 有效就不重種）；沒有就維持每次都種
+        generation = None
+        if bootstrap is not None:
+            generation = bootstrap.ensure(session)
+        else:
+            session.get(
+                f"{base_url}/jobs/search/",
+                headers={"User-Agent": UA, "Referer": f"{base_url}/"},
+                timeout=timeout
+            )
+
+        try:
+            return _get_104_list(session, url, params, headers, timeout)
+        except HtmlDowngradeError:
+            if bootstrap is None:
+                raise
+            # cookie 可能過期 / 被站點作廢：重種一次再試（別的 worker 已經重種過就直接用新的）
+            bootstrap.invalidate(session, generation)
+            bootstrap.ensure(session)
+            return _get_104_list(session, url, params, headers, timeout)
+
+    # 快取命中就連種 cookie 都省了；降級回 HTML 會直接丟例外，不會被存進快取
+    cache = cache or get_default_cache()
+    r = cache.fetch("104_list", fingerprint("GET", url, params, headers), _send)
+    r.raise_for_status()
+    return r.json()
+
 
+def _list_request(
+    keyword: str,
+    area_codes_csv: str,
+    page: int,
+    base_url: str,
+) -> Tuple[str, Dict[str, str], Dict[str, str]]:
     # 2) 再打 list
-    url = "https://www.104.com.tw/jobs/search/list"
+    url = f"{base_url}/jobs/search/list"
     params = {
         "ro": "0",
         "keyword": keyword,
@@ -80,21 +137,31 @@ def fetch_104_jobs_json(session: requests.Session, keyword: str, area_codes_csv:
     }
     headers = {
         "Accept": "application/json, text/plain, */*",
-        "Referer": "https://www.104.com.tw/jobs/search/",
+        "Referer": f"{base_url}/jobs/search/",
         "User-Agent": UA,
         "X-Requested-With": "XMLHttpRequest",
         "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
     }
+    return url, params, headers
+
 
+def _get_104_list(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, str],
+    headers: Dict[str, str],
+    timeout: int,
+) -> CachedResponse:
     r = session.get(url, params=params, headers=headers, timeout=timeout, allow_redirects=True)
 
     # 3) 只要回 HTML，就代表仍被降級（等同「拿不到 JSON」）
     ctype = (r.headers.get("Content-Type") or "").lower()
     if "text/html" in ctype or r.text.lstrip().startswith("<!DOCTYPE html"):
-        raise RuntimeError(f"104 回傳 HTML（未取得 JSON）。\nstatus={r.status_code}\nfinal_url={r.url}\nhead={r.text[:120]}")
+        raise HtmlDowngradeError(f"104 回傳 HTML（未取得 JSON）。\nstatus={r.status_code}\nfinal_url={r.url}\nhead={r.text[:120]}")
+
+    return from_requests(r)
+
 
-    r.raise_for_status()
-    return r.json()
 def _looks_like_joblist_json(obj: Any) -> bool:
     """只用結構判斷：是不是「職缺清單」JSON。"""
     if not isinstance(obj, dict):
@@ -118,31 +185,34 @@ def fetch_jobs_via_playwright(
     area_codes_csv: Optional[str] = None,
     headless: bool = True,
     timeout_ms: int = 30000,
-) -> List[Dict[str, str]]:
+    pool: Optional[BrowserPool] = None,
+    base_url: str = BASE_URL_104,
+    tabs: int = 3,
+    pages: Optional[List[int]] = None,
+) -> List[JobRow]:
     """
     104 職缺抓取（Playwright 穩定版）：
     - 不點 input、不點地區 combobox
     - 直接用 URL 進入搜尋結果頁（避免 /jobs/search/list HTML/404）
-    - 監聽所有 JSON response，用結構判斷抓到「職缺清單 data[]」
+    - 監聽 JSON response（事件驅動，response 一到就 resolve），用結構判斷抓到「職缺清單 data[]」
+    - 同一個 context 開多個分頁平行抓多頁（tabs 為同時分頁數上限）
     - 回傳：你 UI 目前用的 rows 格式（title/company/salary_text/location/url...）
+    - 瀏覽器由 browser_pool 常駐共用（pool 沒給就用 headless 對應的預設池），連續查詢不必重開
+    - pages：只抓指定頁碼（JSON API 失敗的頁改走瀏覽器補抓，見 resilience.py）；
+      指定頁碼時某頁沒資料不會停，其他頁照抓
     """
 
     keyword = (keyword or "").strip()
     if not keyword:
         return []
 
-    # 若沒給 area_codes_csv，就嘗試用你既有 resolve_area 轉
+    # 若沒給 area_codes_csv，就嘗試用 resolve_many 轉
     # （失敗就當作不指定地區；避免再卡 UI selector）
     if area_codes_csv is None:
         area_codes_csv = ""
         try:
-            if area_text and area_text.strip() and "resolve_area" in globals():
-                parts = [a.strip() for a in area_text.replace("，", ",").split(",") if a.strip()]
-                codes = []
-                for p in parts:
-                    r = resolve_area(p)  # 你原本就有
-                    codes.append(r.area_code)
-                area_codes_csv = ",".join(codes)
+            if area_text and area_text.strip() and "resolve_many" in globals():
+                area_codes_csv = ",".join(r.area_code for r in resolve_many(area_text))
         except Exception:
             area_codes_csv = ""
 
@@ -150,84 +220,88 @@ def fetch_jobs_via_playwright(
     all_items: List[Dict[str, Any]] = []
     seen_keys = set()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        ctx = browser.new_context(
-            locale="zh-TW",
-            user_agent=UA_104,
-            viewport={"width": 1280, "height": 720},
-        )
-        page = ctx.new_page()
-
-        # 監聽 JSON responses，只要結構像 joblist 就收
-        last_job_json: Dict[str, Any] = {}
-
-        def on_response(resp):
-            nonlocal last_job_json
+    if pool is None:
+        pool = get_default_pool(headless=headless)
+
+    def _search_url(page_no: int) -> str:
+        # 直接組搜尋 URL（不使用 _build_search_url，避免你剛剛的 NameError）
+        params = {
+            "jobsource": "joblist_search",
+            "keyword": keyword,
+            "page": str(page_no),
+            "order": "15",
+        }
+        if area_codes_csv:
+            params["area"] = area_codes_csv
+        return f"{base_url}/jobs/search/?" + urllib.parse.urlencode(params, safe=",")
+
+    # 停止頁：某頁抓不到 / 回空之後，還沒送出的頁就不用開了
+    stop_at: Dict[str, Optional[int]] = {"page": None}
+
+    def _stopped_before(page_no: int) -> bool:
+        return stop_at["page"] is not None and page_no > stop_at["page"]
+
+    def _mark_stop(page_no: int) -> None:
+        if stop_at["page"] is None or page_no < stop_at["page"]:
+            stop_at["page"] = page_no
+
+    page_numbers = sorted(set(pages)) if pages is not None else list(range(1, max_pages + 1))
+
+    async def _crawl_page(pool: BrowserPool, sem: asyncio.Semaphore, page_no: int) -> Optional[List[Any]]:
+        async with sem:
+            if pages is None and _stopped_before(page_no):
+                return None
+            # 從池子借一個暖分頁（同一個 context 裡的多個分頁平行跑）
             try:
-                ct = (resp.headers.get("content-type") or "").lower()
-                if "application/json" not in ct:
-                    return
-                j = resp.json()
-                if _looks_like_joblist_json(j):
-                    last_job_json = j
+                async with pool.lease() as page:
+                    async with JobListCapture(page, _looks_like_joblist_json) as cap:
+                        cap.arm()
+                        await pool.goto(page, _search_url(page_no), wait_until="domcontentloaded", timeout=timeout_ms)
+                        # joblist response 一到就回來，最多等 timeout_ms
+                        payload = await cap.wait(timeout_ms)
             except Exception:
-                return
-
-        page.on("response", on_response)
-
-        # 逐頁進入搜尋頁，等待 joblist JSON 被捕捉
-        for page_no in range(1, max_pages + 1):
-            # 直接組搜尋 URL（不使用 _build_search_url，避免你剛剛的 NameError）
-            params = {
-                "jobsource": "joblist_search",
-                "keyword": keyword,
-                "page": str(page_no),
-                "order": "15",
-            }
-            if area_codes_csv:
-                params["area"] = area_codes_csv
-
-            url = "https://www.104.com.tw/jobs/search/?" + urllib.parse.urlencode(params, safe=",")
-            last_job_json = {}
-
-            page.goto(url, wait_until="domcontentloaded")
-
-            # 等待最多 timeout_ms：直到捕捉到 joblist JSON
-            t0 = time.time()
-            while True:
-                if last_job_json and _looks_like_joblist_json(last_job_json):
-                    break
-                if (time.time() - t0) * 1000 > timeout_ms:
-                    break
-                page.wait_for_timeout(200)
-
-            if not last_job_json or not _looks_like_joblist_json(last_job_json):
-                # 這頁抓不到就停（避免一直卡）
-                break
-
-            items = last_job_json.get("data", [])
-            if not items:
-                break
-
-            added = 0
-            for it in items:
-                if not isinstance(it, dict):
-                    continue
-                job_no = str(it.get("jobNo") or "")
-                cust_no = str(it.get("custNo") or "")
-                key = job_no + "|" + cust_no
-                if key and key in seen_keys:
-                    continue
-                if key:
-                    seen_keys.add(key)
-                all_items.append(it)
-                added += 1
-
-            if added == 0:
-                break
-
-        browser.close()
+                payload = None
+
+        items = (payload or {}).get("data") or []
+        if not items:
+            # 這頁抓不到就停（避免一直卡）
+            _mark_stop(page_no)
+            return None
+        return items
+
+    async def _crawl(pool: BrowserPool) -> List[Optional[List[Any]]]:
+        sem = asyncio.Semaphore(max(1, tabs))
+        return await asyncio.gather(*(_crawl_page(pool, sem, n) for n in page_numbers))
+
+    global last_route_stats
+    route_before = pool.route_filter.stats.copy() if pool.route_filter is not None else None
+    crawled = pool.run(_crawl)
+    if route_before is not None:
+        last_route_stats = pool.route_filter.stats.since(route_before)
+
+    # 依頁碼組回結果：遇到第一個沒資料 / 全部重複的頁就停
+    for items in crawled:
+        if not items:
+            if pages is not None:
+                continue
+            break
+
+        added = 0
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            job_no = str(it.get("jobNo") or "")
+            cust_no = str(it.get("custNo") or "")
+            key = job_no + "|" + cust_no
+            if key and key in seen_keys:
+                continue
+            if key:
+                seen_keys.add(key)
+            all_items.append(it)
+            added += 1
+
+        if added == 0 and pages is None:
+            break
 
     # 交給你原本 normalize_jobs（若存在）統一欄位
     payload = {"data": all_items}
@@ -241,27 +315,27 @@ def fetch_jobs_via_playwright(
             pass
 
     # 保底轉換：至少 UI/CSV 可用
-    out: List[Dict[str, str]] = []
+    out: List[JobRow] = []
     for it in all_items:
         link_job = ""
         if isinstance(it.get("link"), dict):
             link_job = it["link"].get("job", "") or ""
-        out.append({
-            "job_id": str(it.get("jobNo") or ""),
-            "title": str(it.get("jobName") or ""),
-            "company": str(it.get("custName") or ""),
-            "location": str(it.get("jobAddrNoDesc") or ""),
-            "salary_text": str(it.get("salaryDesc") or it.get("salary") or ""),
-            "post_date": str(it.get("appearDate") or ""),
-            "url": link_job,
-        })
+        out.append(JobRow(
+            job_id=str(it.get("jobNo") or ""),
+            title=str(it.get("jobName") or ""),
+            company=str(it.get("custName") or ""),
+            location=str(it.get("jobAddrNoDesc") or ""),
+            salary_text=str(it.get("salaryDesc") or it.get("salary") or ""),
+            post_date=str(it.get("appearDate") or ""),
+            url=link_job,
+        ))
     return out
 
-def normalize_jobs(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+def normalize_jobs(payload: Dict[str, Any]) -> List[JobRow]:
     data = payload.get("data") or {}
     items = data.get("list") or []
 
-    rows: List[Dict[str, str]] = []
+    rows: List[JobRow] = []
 
     for it in items:
         job_id = str(it.get("jobNo") or "").strip()
@@ -284,50 +358,80 @@ def normalize_jobs(payload: Dict[str, Any]) -> List[Dict[str, str]]:
         if not url:
             url = f"https://www.104.com.tw/job/{job_id}"
 
-        rows.append({
-            "job_id": job_id,
-            "title": title,
-            "company": company,
-            "location": location,
-            "salary_text": salary_text,
-            "post_date": post_date,
-            "url": url,
-        })
+        rows.append(JobRow(job_id, title, company, location, salary_text, post_date, url))
 
     return rows
 
 
-def write_csv(rows: List[Dict[str, str]], filepath: str, keyword: str, areas_text: str) -> None:
-    fieldnames = [
-        "keyword",
-        "areas",
-        "title",
-        "company",
-        "location",
-        "salary_text",
-        "post_date",
-        "url",
-        "job_id",
-        "snapshot_time",
-    ]
-    snapshot_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-
-    with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
+CSV_FIELDNAMES = [
+    "keyword",
+    "areas",
+    "title",
+    "company",
+    "location",
+    "salary_text",
+    "post_date",
+    "url",
+    "job_id",
+    "snapshot_time",
+]
+
+
+class CsvSnapshotWriter:
+    """
+    邊抓邊寫的 CSV 快照：
+    - 先寫到 <filepath>.part，commit() 才改名成正式檔（中途失敗不會留下半份 CSV）
+    - write_rows() 可以呼叫很多次（每抓到一頁就寫一次）
+    """
+
+    def __init__(self, filepath: str, keyword: str, areas_text: str, snapshot_time: Optional[str] = None):
+        self.filepath = filepath
+        self.keyword = keyword
+        self.areas_text = areas_text
+        self.snapshot_time = snapshot_time or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.rows_written = 0
+        self._tmp = filepath + ".part"
+        self._f = open(self._tmp, "w", newline="", encoding="utf-8-sig")
+        self._w = csv.writer(self._f)
+        self._w.writerow(CSV_FIELDNAMES)
+
+    def write_rows(self, rows: List[JobRow]) -> None:
+        # 欄位順序固定，直接寫 list（不必每筆再組一個 dict）
         for r in rows:
-            w.writerow({
-                "keyword": keyword,
-                "areas": areas_text,
-                "title": r["title"],
-                "company": r["company"],
-                "location": r["location"],
-                "salary_text": r["salary_text"],
-                "post_date": r["post_date"],
-                "url": r["url"],
-                "job_id": r["job_id"],
-                "snapshot_time": snapshot_time,
-            })
+            r = JobRow.coerce(r)
+            self._w.writerow((
+                self.keyword, self.areas_text, r.title, r.company, r.location,
+                r.salary_text, r.post_date, r.url, r.job_id, self.snapshot_time,
+            ))
+        self.rows_written += len(rows)
+
+    def commit(self) -> None:
+        if self._f.closed:
+            return
+        self._f.close()
+        os.replace(self._tmp, self.filepath)
+
+    def abort(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "CsvSnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def write_csv(rows: List[JobRow], filepath: str, keyword: str, areas_text: str) -> None:
+    with CsvSnapshotWriter(filepath, keyword=keyword, areas_text=areas_text) as w:
+        w.write_rows(rows)
 
 CONN_STR = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
@@ -346,75 +450,157 @@ def main() -> None:
         print("[ERR] 關鍵字與地區不可為空")
         return
 
+    # 各段耗時 + 計數器：結束時印摘要，並寫一行到 logs/run_log.jsonl
+    metrics = RunMetrics("main", keyword=keyword, areas=areas_text)
+    status, error = "ok", ""
+    try:
+        _run_search(metrics, keyword, areas_text)
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        metrics.finish(status=status, error=error)
+        print(f"[TIME] {metrics.summary()}")
+
+
+def _run_search(metrics: RunMetrics, keyword: str, areas_text: str) -> None:
     # 解析多地區（中文）
-    area_inputs = [a.strip() for a in areas_text.split(",") if a.strip()]
     try:
-        resolved = [resolve_area(a) for a in area_inputs]
+        with metrics.span("area_resolve"):
+            resolved = resolve_many(areas_text)
     except Exception as e:
         print(f"[ERR] 地區解析失敗：{e}")
         return
 
     area_codes_csv = ",".join(r.area_code for r in resolved)
     area_names = ",".join(r.matched_name for r in resolved)
+    metrics.meta["areas"] = area_names
 
     print(f"[INFO] 地區解析：{areas_text} -> {area_names} -> {area_codes_csv}")
 
+    cache_stats = get_default_cache().stats
+    bytes_before = cache_stats.bytes_fetched
+    net = get_default_transport().stats
+    conns_before, wire_before = net.connections, net.bytes_wire
     session = build_session()
+    bootstrap = SessionBootstrap(base_url=BASE_URL_104, user_agent=UA)
 
     max_pages = 3          # 你可自行調整
-    page_sleep = 1.2       # 低頻友善
+    concurrency = 3        # 同時抓幾頁
+    rps = 2.0              # 每秒最多幾個請求（token bucket，低頻友善）
+    incremental = False    # True：遇到上次快照已知的職缺就停，其餘沿用上次資料
+    enrich = False         # True：另外抓每筆職缺明細（條件 / 技能 / 人數 / 遠端），存進 dbo.job_detail
+    columnar = False       # True：另外輸出 Parquet 欄式快照（需 pyarrow，依日期 / 關鍵字分區）
+    cdc = False            # True：DB 只存內容有變的職缺版本（job_version），沒變只延長有效區間
 
-    all_rows: List[Dict[str, str]] = []
+    if cdc:
+        job_db.STORAGE_MODE = job_db.STORAGE_CDC
 
-    for page in range(1, max_pages + 1):
-        try:
-            payload = fetch_104_jobs_json(session, keyword=keyword, area_codes_csv=area_codes_csv, page=page)
-        except Exception as e:
-            print(f"[ERR] 抓取第 {page} 頁失敗：{e}")
-            break
+    # 抓取 -> CSV -> DB 一頁一頁串流寫入，全部抓完才 commit（避免循環 import，用到才載入）
+    from resilience import Resilience
+    from snapshot_pipeline import run_snapshot_pipeline, stream_search_pages
 
-        rows = normalize_jobs(payload)
-        if not rows:
-            break
+    # 被降級時：退避重試 + 重種 cookie，降級太多就整體暫停；仍失敗的頁改走瀏覽器補抓
+    resilience = Resilience(bootstrap=bootstrap)
+
+    out_name = f"{now_tag()}_104_{safe_filename(keyword)}_{safe_filename(area_names)}.csv"
+
+    if incremental:
+        from incremental_crawl import crawl_incremental
+
+        with metrics.span("incremental_fetch"):
+            inc = crawl_incremental(
+                session,
+                keyword=keyword,
+                area_codes_csv=area_codes_csv,
+                area_names=area_names,
+                conn_str=CONN_STR,
+                max_pages=max_pages,
+                bootstrap=bootstrap,
+                rps=rps,
+                resilience=resilience,
+            )
+        print(f"[INFO] 增量抓取：{inc.summary()}；{bootstrap.stats.summary()}")
+        # 增量模式要先跟上次快照比對完才知道要沿用哪些，整批當成一頁交給 pipeline
+        pages: Any = [PageResult(page=1, rows=inc.rows)]
+    else:
+        pages = stream_search_pages(
+            session,
+            keyword=keyword,
+            area_codes_csv=area_codes_csv,
+            bootstrap=bootstrap,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            rps=rps,
+            resilience=resilience,
+        )
+
+    enricher = None
+    if enrich:
+        from job_enrich import DetailEnricher
 
-        all_rows.extend(rows)
-        time.sleep(page_sleep)
+        enricher = DetailEnricher(
+            session,
+            base_url=BASE_URL_104,
+            rps=rps,
+            known_markers=lambda ids: job_db.get_detail_markers(ids, conn_str=CONN_STR),
+        )
 
-    if not all_rows:
+    columnar_root = None
+    if columnar:
+        from snapshot_columnar import DEFAULT_COLUMNAR_DIR
+        columnar_root = DEFAULT_COLUMNAR_DIR
+
+    # 1) 輸出 CSV + 2) 寫入 DB（每日快照）
+    result = run_snapshot_pipeline(pages, keyword=keyword, area_names=area_names, csv_path=out_name,
+                                   conn_str=CONN_STR, enricher=enricher, columnar_root=columnar_root,
+                                   metrics=metrics)
+    metrics.add("bytes", cache_stats.bytes_fetched - bytes_before)
+    metrics.add("bytes_wire", net.bytes_wire - wire_before)
+    metrics.add("connections", net.connections - conns_before)
+    metrics.add("retries", resilience.stats.retries)
+    if resilience.stats.fallbacks:
+        metrics.add("fallbacks", resilience.stats.fallbacks)
+    for p in result.errors:
+        print(f"[ERR] 抓取第 {p.page} 頁失敗：{p.error}")
+    if not incremental:
+        print(f"[INFO] 抓取 {result.pages} 頁，耗時 {result.elapsed:.2f}s；{bootstrap.stats.summary()}")
+        if resilience.stats.retries or resilience.stats.fallbacks:
+            print(f"[INFO] 容錯：{resilience.stats.summary()}")
+    print(f"[INFO] 連線：{net.summary()}")
+
+    if not result.rows:
         print("[INFO] 沒抓到任何職缺（條件太嚴格或暫時被限制）。")
         return
 
-    # 1) 輸出 CSV
-    out_name = f"{now_tag()}_104_{safe_filename(keyword)}_{safe_filename(area_names)}.csv"
-    write_csv(all_rows, out_name, keyword=keyword, areas_text=area_names)
     print(f"[OK] 已輸出 CSV：{out_name}")
-
-    # 2) 寫入 DB（每日快照）
-    inserted = job_db.insert_snapshot_rows(
-        rows=all_rows,
-        keyword=keyword,
-        areas=area_names,
-        conn_str=CONN_STR
-    )
-    print(f"[OK] DB 寫入完成（可能忽略重複）：{inserted} rows")
+    if result.columnar_path:
+        print(f"[OK] 已輸出 Parquet：{result.columnar_path}")
+    print(f"[OK] DB 寫入完成（可能忽略重複）：{result.inserted} rows")
+    if cdc:
+        print(f"[INFO] cdc 儲存：{job_db.storage_report(CONN_STR, keyword=keyword, areas=area_names).summary()}")
+    if enricher is not None:
+        print(f"[INFO] {enricher.stats.summary()}")
 
     # 3) 今天 vs 昨天差異
-    new_ids, removed_ids, today_date, y_date = job_db.diff_today_yesterday(
-        keyword=keyword,
-        areas=area_names,
-        conn_str=CONN_STR
-    )
+    with metrics.span("diff"):
+        new_ids, removed_ids, today_date, y_date = job_db.diff_today_yesterday(
+            keyword=keyword,
+            areas=area_names,
+            conn_str=CONN_STR
+        )
     print(f"[DIFF] {today_date} vs {y_date}：新增 {len(new_ids)}，消失 {len(removed_ids)}")
 
     # 4) 預覽前 10 筆（確認有在跑）
-    print(f"[INFO] 共 {len(all_rows)} 筆，預覽前 10 筆：")
-    for i, r in enumerate(all_rows[:10], start=1):
+    print(f"[INFO] 共 {result.rows} 筆，預覽前 10 筆：")
+    for i, r in enumerate(result.preview[:10], start=1):
         print(f"{i:02d}. {r['title']} | {r['company']} | {r['salary_text']} | {r['location']}")
 
     # 5) 額外：列出新增職缺前 10 筆（可選）
     if new_ids:
         print("[NEW] 今日新增（前 10 筆）：")
-        new_jobs = job_db.fetch_jobs_by_ids(new_ids,conn_str=CONN_STR)
+        with metrics.span("new_jobs_lookup"):
+            new_jobs = job_db.fetch_jobs_by_ids(new_ids,conn_str=CONN_STR)
         for j in new_jobs[:10]:
             print(f" - {j['title']} | {j['company']} | {j['salary_text']} | {j['url']}")
 
@@ -283,9 +283,8 @@ class JobSearchUI(tk.Tk):
             messagebox.showwarning("提醒", "關鍵字與區域不可為空。")
             return
 
-        area_inputs = [a.strip() for a in areas_text.replace("，", ",").split(",") if a.strip()]
         try:
-            resolved = [self.job_mod.resolve_area(a) for a in area_inputs]
+            resolved = self.job_mod.resolve_many(areas_text)
         except Exception as e:
             messagebox.showerror("地區解析失敗", str(e))
             return
@@ -17,7 +17,7 @@ import webbrowser
 import urllib.request
 import subprocess
 
-from typing import List, Dict, Optional
+from typing import Dict, Optional
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
@@ -114,6 +114,13 @@ class JobSearchUI(tk.Tk):
 
         self._q: "queue.Queue[tuple]" = queue.Queue()
 
+        # 最近一次結果（薪資篩選時重畫表格用）；salary_parser 解析結果跟 rows 一一對應
+        self._rows: list = []
+        self._salaries: list = []
+        self._salary_keys: Dict[str, tuple] = {}   # tree item -> 薪資排序鍵
+        self._preview_limit = 30
+        self._last_timing = ""   # 上一次執行的耗時摘要（狀態列右側）
+
         try:
             self.job_mod = load_job_module()
         except Exception as e:
@@ -142,6 +149,10 @@ class JobSearchUI(tk.Tk):
         # queue poll
         self.after(120, self._poll_queue)
 
+        # 背景先把 Playwright 瀏覽器池暖起來，第一次查詢就不用等瀏覽器啟動
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        threading.Thread(target=self._warm_browser_pool, daemon=True).start()
+
         # initial
         self.set_status("待命")
 
@@ -289,7 +300,33 @@ class JobSearchUI(tk.Tk):
         self.ent_area.grid(row=4, column=0, sticky="ew", padx=14, pady=(0, 6), ipady=6)
 
         ttk.Label(card, text="範例：台北市,新北市板橋區", style="CardHint.TLabel") \
-            .grid(row=5, column=0, sticky="w", padx=14, pady=(0, 12))
+            .grid(row=5, column=0, sticky="w", padx=14, pady=(0, 8))
+
+        ttk.Label(card, text="月薪範圍（選填，年薪 / 時薪自動換算）", style="CardHint.TLabel") \
+            .grid(row=6, column=0, sticky="w", padx=14, pady=(2, 2))
+
+        salary_row = ttk.Frame(card, style="Card.TFrame")
+        salary_row.grid(row=7, column=0, sticky="ew", padx=14, pady=(0, 12))
+        salary_row.grid_columnconfigure(0, weight=1)
+        salary_row.grid_columnconfigure(2, weight=1)
+
+        entry_style = dict(
+            font=("Segoe UI", 10),
+            bg="#0b1326", fg=self.C_TEXT,
+            insertbackground=self.C_TEXT,
+            relief="flat", highlightthickness=1,
+            highlightbackground=self.C_BORDER,
+            highlightcolor=self.C_PRIMARY
+        )
+        self.ent_salary_min = PlaceholderEntry(salary_row, "最低 40000", width=10, **entry_style)
+        self.ent_salary_min.grid(row=0, column=0, sticky="ew", ipady=4)
+        ttk.Label(salary_row, text="~", style="CardHint.TLabel").grid(row=0, column=1, padx=6)
+        self.ent_salary_max = PlaceholderEntry(salary_row, "最高（不限）", width=10, **entry_style)
+        self.ent_salary_max.grid(row=0, column=2, sticky="ew", ipady=4)
+        ttk.Button(salary_row, text="篩選", style="Secondary.TButton", command=self._render_table) \
+            .grid(row=0, column=3, padx=(8, 0))
+        for ent in (self.ent_salary_min, self.ent_salary_max):
+            ent.bind("<Return>", lambda _e: self._render_table())
 
         # Buttons
         btns = ttk.Frame(left)
@@ -397,8 +434,17 @@ class JobSearchUI(tk.Tk):
         self.tree.heading(col, text=text, command=lambda c=col: self._sort_by(c, False))
 
     def _sort_by(self, col, descending):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children("")]
-        data.sort(reverse=descending)
+        children = self.tree.get_children("")
+        if col == "salary":
+            # 用解析好的月薪數字排，不是比字串；看不出金額的不管升降冪都排最後
+            def key(child):
+                miss, lo, hi = self._salary_keys.get(child, (1, 0, 0))
+                return (miss, -lo, -hi) if descending else (miss, lo, hi)
+            data = sorted(((key(c), c) for c in children))
+        elif col == "no":
+            data = sorted(((int(self.tree.set(c, col)), c) for c in children), reverse=descending)
+        else:
+            data = sorted(((self.tree.set(c, col), c) for c in children), reverse=descending)
         for index, (_, item) in enumerate(data):
             self.tree.move(item, "", index)
             self.tree.item(item, tags=("even" if index % 2 == 0 else "odd",))
@@ -438,7 +484,7 @@ class JobSearchUI(tk.Tk):
             self.btn_open_folder.state(["!disabled"])
             self.btn_web.state(["!disabled"])
             if hasattr(self, "footer_right"):
-                self.footer_right.config(text="")
+                self.footer_right.config(text=self._last_timing)
 
     # -------------------------
     # Table fill (保留你原本邏輯，外觀微調)
@@ -447,34 +493,82 @@ class JobSearchUI(tk.Tk):
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-    def _fill_table(self, rows: List[Dict[str, str]], preview_limit: int = 30):
+    def _salary_range(self):
+        """左側月薪範圍輸入 -> (lo, hi)；空白 / 不是數字 = 不限"""
+        out = []
+        for ent in (self.ent_salary_min, self.ent_salary_max):
+            text = ent.get_value().replace(",", "").strip()
+            out.append(int(text) if text.isdigit() else None)
+        return tuple(out)
+
+    def _fill_table(self, rows: list, preview_limit: int = 30):
+        # salary_parser 跟主程式同一層（load_job_module 已加進 sys.path）
+        from salary_parser import parse_salaries
+
+        # JobRow 跟主程式一起動態載入（見 load_job_module）
+        JobRow = self.job_mod.JobRow
+        self._rows = [JobRow.coerce(r) for r in rows]
+        # 整批解析：同一份結果薪資寫法重複很多，只解析不重複的
+        self._salaries = parse_salaries(r.salary_text for r in self._rows)
+        self._preview_limit = preview_limit
+        self._render_table()
+
+    def _render_table(self):
+        from salary_parser import in_range, sort_key
+
         self._clear_table()
+        self._salary_keys = {}
 
-        n = min(preview_limit, len(rows))
-        self.lbl_count.config(text=f"{n} / {len(rows)} 筆")
+        lo, hi = self._salary_range()
+        matched = [(r, info) for r, info in zip(self._rows, self._salaries) if in_range(info, lo, hi)]
+        n = min(self._preview_limit, len(matched))
+        if lo is None and hi is None:
+            self.lbl_count.config(text=f"{n} / {len(self._rows)} 筆")
+        else:
+            self.lbl_count.config(text=f"{n} / 符合 {len(matched)} / {len(self._rows)} 筆")
         self.empty_hint.place_forget()
 
         self.set_status(f"完成（顯示前 {n} 筆，CSV 為完整資料）")
 
-        for i, r in enumerate(rows[:n], start=1):
+        for i, (r, info) in enumerate(matched[:n], start=1):
             tag = "even" if i % 2 == 0 else "odd"
-            self.tree.insert(
+            item = self.tree.insert(
                 "",
                 "end",
                 values=(
                     i,
-                    trunc(r.get("title", ""), 45),
-                    trunc(r.get("company", ""), 28),
-                    trunc(r.get("salary_text", ""), 18),
-                    trunc(r.get("location", ""), 20),
+                    trunc(r.title, 45),
+                    trunc(r.company, 28),
+                    trunc(r.salary_text, 18),
+                    trunc(r.location, 20),
                 ),
                 tags=(tag,)
             )
+            self._salary_keys[item] = sort_key(info)
 
         if n == 0:
             self.lbl_count.config(text="0 筆")
             self.empty_hint.place(relx=0.5, rely=0.5, anchor="center")
 
+    # -------------------------
+    # Browser pool（常駐瀏覽器）
+    # -------------------------
+    def _warm_browser_pool(self):
+        try:
+            from browser_pool import get_default_pool
+            get_default_pool(headless=False).start()
+        except Exception as e:
+            # 暖機失敗不影響使用，查詢時會再試一次
+            self._q.put(("status", f"瀏覽器預熱失敗（查詢時再啟動）：{e}"))
+
+    def on_close(self):
+        try:
+            from browser_pool import shutdown_default_pools
+            shutdown_default_pools()
+        except Exception:
+            pass
+        self.destroy()
+
     # -------------------------
     # Buttons (保留你原本功能)
     # -------------------------
@@ -499,9 +593,8 @@ class JobSearchUI(tk.Tk):
             messagebox.showwarning("提醒", "關鍵字與區域不可為空。")
             return
 
-        area_inputs = [a.strip() for a in areas_text.replace("，", ",").split(",") if a.strip()]
         try:
-            resolved = [self.job_mod.resolve_area(a) for a in area_inputs]
+            resolved = self.job_mod.resolve_many(areas_text)
         except Exception as e:
             messagebox.showerror("地區解析失敗", str(e))
             return
@@ -536,25 +629,40 @@ class JobSearchUI(tk.Tk):
         th.start()
 
     def _worker_fetch_and_export(self, save_path: str, keyword: str, area_names: str, area_codes_csv: str):
+        # 各段耗時 + 計數器（跟 job_seeker.main 同一份 run log）
+        from run_metrics import RunMetrics
+
+        metrics = RunMetrics("ui", keyword=keyword, areas=area_names)
+        status, error = "ok", ""
         try:
             max_pages = 3
 
-            # ✅ 只走 Playwright
-            all_rows = self.job_mod.fetch_jobs_via_playwright(
-                keyword=keyword,
-                area_text=area_names,
-                area_codes_csv=area_codes_csv,
-                max_pages=max_pages,
-                headless=False,
-                timeout_ms=45000
-            )
+            # ✅ 只走 Playwright（含瀏覽器啟動 / 開分頁）
+            with metrics.span("playwright_fetch"):
+                all_rows = self.job_mod.fetch_jobs_via_playwright(
+                    keyword=keyword,
+                    area_text=area_names,
+                    area_codes_csv=area_codes_csv,
+                    max_pages=max_pages,
+                    headless=False,
+                    timeout_ms=45000
+                )
+            metrics.add("rows", len(all_rows))
 
             if not all_rows:
+                status = "empty"
                 self._q.put(("error", "Playwright 沒抓到任何職缺（可能 104 當下限制或條件太嚴格）。"))
                 return
 
+            route_stats = getattr(self.job_mod, "last_route_stats", None)
+            if route_stats is not None:
+                metrics.add("blocked_requests", route_stats.blocked)
+                metrics.add("bytes_saved", route_stats.est_bytes_saved)
+                self._q.put(("status", f"Playwright：{route_stats.summary()}"))
+
             # 1) 寫 CSV
-            self.job_mod.write_csv(all_rows, save_path, keyword=keyword, areas_text=area_names)
+            with metrics.span("csv_write"):
+                self.job_mod.write_csv(all_rows, save_path, keyword=keyword, areas_text=area_names)
 
             # 2) ✅ 寫入 MSSQL
             try:
@@ -571,17 +679,21 @@ class JobSearchUI(tk.Tk):
                 if not conn_str.strip():
                     raise RuntimeError("找不到 MSSQL 連線字串（請在主程式提供 CONN_STR 或 get_conn_str()）。")
 
-                inserted = insert_snapshot_rows(
-                    rows=all_rows,
-                    keyword=keyword,
-                    areas=area_names,
-                    conn_str=conn_str,
-                    snapshot_time=None
-                )
+                with metrics.span("db_insert"):
+                    inserted = insert_snapshot_rows(
+                        rows=all_rows,
+                        keyword=keyword,
+                        areas=area_names,
+                        conn_str=conn_str,
+                        snapshot_time=None
+                    )
+                metrics.add("inserted", inserted)
+                metrics.add("skipped", len(all_rows) - inserted)
 
                 self._q.put(("status", f"MSSQL：新增 {inserted} 筆（同日重複 job_id 不會更新快照，屬既有設計）"))
 
             except Exception as e:
+                metrics.add("db_errors")
                 self._q.put(("status", f"MSSQL 寫入失敗（不影響 CSV/預覽）：{e}"))
 
             # 3) 更新 UI
@@ -589,8 +701,11 @@ class JobSearchUI(tk.Tk):
             self._q.put(("done", f"匯出成功：\n{save_path}\n\n共 {len(all_rows)} 筆（CSV 為完整資料）"))
 
         except Exception as e:
+            status, error = "error", str(e)
             self._q.put(("error", str(e)))
         finally:
+            metrics.finish(status=status, error=error)
+            self._q.put(("timing", metrics.status_line()))
             self._q.put(("enable", None))
 
     def _poll_queue(self):
@@ -608,6 +723,9 @@ class JobSearchUI(tk.Tk):
                     self._set_busy(False)
                 elif typ == "status":
                     self.set_status(payload)
+                elif typ == "timing":
+                    self._last_timing = f"上次耗時 {payload}"
+                    self.footer_right.config(text=self._last_timing)
         except queue.Empty:
             pass
         finally:
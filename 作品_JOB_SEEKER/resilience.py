@@ -0,0 +1,281 @@
+# 張詠鈞的python工作區
+# File: resilience
+# Created: 2026/3/5 上午 10:40
+
+# resilience.py
+# 104 抓取的容錯層（對付「list API 回 HTML 被降級」這種暫時性封鎖）
+# - 重試：指數退避 + 隨機抖動（full jitter）
+#   降級時的重種 cookie 由 fetch_104_jobs_json 自己做（它知道送出時的 cookie 世代），這裡不再重種一次，
+#   只把 bootstrap 實際重種的次數記進 stats
+# - 斷路器：最近 N 次請求裡降級 / 429 比例超過門檻 -> 所有 worker 一起暫停一段時間，
+#   冷卻後先放一個請求試水溫（half-open），成功才恢復，失敗就加倍冷卻
+# - 重試用完仍失敗的頁：只把那幾頁改走 Playwright（瀏覽器）補抓，整批搜尋不會因為一次封鎖就中斷
+#
+# 用法：
+#   res = Resilience(bootstrap=bootstrap)
+#   fetch, parse = res.page_fetcher(session, keyword, area_codes_csv)
+#   report = fetch_pages(fetch, parse, max_pages=..., concurrency=..., rps=...)
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+import job_seeker
+from http_cache import HTTPStatusError
+from job_row import JobRow
+from session_bootstrap import SessionBootstrap
+
+# 重試用完後改走瀏覽器的頁，payload 用這個 key 直接帶已解析好的 rows
+_ROWS_KEY = "_resilience_rows"
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4          # 含第一次
+    base_delay: float = 1.0        # 秒
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失敗後要等多久（full jitter：0 ~ base * 2^attempt）"""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+
+@dataclass
+class ResilienceStats:
+    requests: int = 0
+    retries: int = 0
+    downgrades: int = 0
+    reseeds: int = 0
+    breaker_trips: int = 0
+    breaker_wait: float = 0.0
+    fallbacks: int = 0             # 改走 Playwright 的頁數
+    fallback_failed: int = 0
+
+    def summary(self) -> str:
+        return (f"請求 {self.requests}，重試 {self.retries}（降級 {self.downgrades}、重種 {self.reseeds}），"
+                f"斷路 {self.breaker_trips} 次（暫停 {self.breaker_wait:.0f}s），"
+                f"瀏覽器補抓 {self.fallbacks} 頁（失敗 {self.fallback_failed}）")
+
+
+class CircuitBreaker:
+    """
+    thread-safe（抓取跑在 asyncio.to_thread 的多個 thread 上）
+    closed：正常；open：全部等到冷卻結束；half_open：只放一個請求試
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        threshold: float = 0.5,
+        min_samples: int = 5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = "closed"
+        self.trips = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._probing = False
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._cond = threading.Condition()
+
+    def failure_rate(self) -> float:
+        with self._cond:
+            if not self._results:
+                return 0.0
+            return self._results.count(False) / len(self._results)
+
+    def wait(self) -> float:
+        """斷路中就擋住呼叫端，回傳實際等了幾秒"""
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == "open" and now >= self._open_until:
+                    self.state = "half_open"
+                    self._probing = False
+                if self.state == "closed":
+                    return waited
+                if self.state == "half_open" and not self._probing:
+                    self._probing = True      # 這個 thread 負責試水溫
+                    return waited
+                timeout = max(0.05, self._open_until - now) if self.state == "open" else 0.5
+                t0 = time.monotonic()
+                self._cond.wait(timeout)
+                waited += time.monotonic() - t0
+
+    def record(self, ok: bool) -> None:
+        with self._cond:
+            if self.state == "half_open":
+                self._probing = False
+                if ok:
+                    self.state = "closed"
+                    self._cooldown = self.base_cooldown
+                    self._results.clear()
+                else:
+                    self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                    self._trip_locked()
+                self._cond.notify_all()
+                return
+
+            self._results.append(ok)
+            n = len(self._results)
+            if (self.state == "closed" and n >= self.min_samples
+                    and self._results.count(False) / n >= self.threshold):
+                self._trip_locked()
+
+    def release(self) -> None:
+        """這次請求的結果不列入統計（但半開試水溫的名額要還回去）"""
+        with self._cond:
+            if self.state == "half_open" and self._probing:
+                self._probing = False
+                self._cond.notify_all()
+
+    def _trip_locked(self) -> None:
+        self.state = "open"
+        self.trips += 1
+        self._open_until = time.monotonic() + self._cooldown
+        self._results.clear()
+
+
+def _is_block(e: BaseException) -> bool:
+    """站點在擋人（降級 / 429）：算進斷路器"""
+    if isinstance(e, job_seeker.HtmlDowngradeError):
+        return True
+    return isinstance(e, HTTPStatusError) and e.status_code == 429
+
+
+def _is_retryable(e: BaseException) -> bool:
+    if _is_block(e):
+        return True
+    if isinstance(e, HTTPStatusError):
+        return e.status_code >= 500
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+class Resilience:
+    """一個 Resilience 可以給很多個搜尋共用（批次時斷路器才是全體一起暫停）"""
+
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        bootstrap: Optional[SessionBootstrap] = None,
+        playwright_fallback: bool = True,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.bootstrap = bootstrap
+        self.playwright_fallback = playwright_fallback
+        self.stats = ResilienceStats()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._reseeds_base = bootstrap.stats.reseeds if bootstrap is not None else 0
+
+    def _bump(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + n)
+
+    def _sync_reseeds(self) -> None:
+        if self.bootstrap is not None:
+            with self._lock:
+                self.stats.reseeds = self.bootstrap.stats.reseeds - self._reseeds_base
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """
+        fn 失敗就依 policy 重試；每次送出前先過斷路器
+        降級（回 HTML）時 fn 裡面已經作廢 + 重種 cookie 再試過一次，這裡只負責退避後重來
+        """
+        last: Optional[BaseException] = None
+        for attempt in range(self.policy.max_attempts):
+            waited = self.breaker.wait()
+            if waited:
+                self._bump("breaker_wait", waited)
+            self._bump("requests")
+            try:
+                out = fn()
+            except Exception as e:
+                if not _is_retryable(e):
+                    # 不是暫時性錯誤（例如解析錯）：不重試，也不算進斷路器
+                    self.breaker.release()
+                    raise
+                last = e
+                blocked = _is_block(e)
+                self.breaker.record(not blocked)
+                with self._lock:
+                    self.stats.breaker_trips = self.breaker.trips
+                if blocked:
+                    self._bump("downgrades")
+                    self._sync_reseeds()
+                if attempt + 1 < self.policy.max_attempts:
+                    self._bump("retries")
+                    self._sleep(self.policy.delay(attempt))
+                continue
+            self.breaker.record(True)
+            self._sync_reseeds()
+            return out
+        assert last is not None
+        raise last
+
+    def page_fetcher(
+        self,
+        session: requests.Session,
+        keyword: str,
+        area_codes_csv: str,
+        base_url: str = job_seeker.BASE_URL_104,
+        fetch_page: Optional[Callable[[int], Dict[str, Any]]] = None,
+    ) -> Tuple[Callable[[int], Dict[str, Any]], Callable[[Dict[str, Any]], List[JobRow]]]:
+        """
+        回傳 (fetch, parse)，直接餵給 fetch_pages / iter_pages
+        重試用完仍失敗 -> 這一頁改走 Playwright；連瀏覽器也失敗才真的丟例外
+        """
+        if fetch_page is None:
+            def fetch_page(page: int) -> Dict[str, Any]:
+                return job_seeker.fetch_104_jobs_json(
+                    session, keyword=keyword, area_codes_csv=area_codes_csv, page=page,
+                    base_url=base_url, bootstrap=self.bootstrap,
+                )
+
+        def fetch(page: int) -> Dict[str, Any]:
+            try:
+                return self.call(lambda: fetch_page(page))
+            except Exception as e:
+                if not (self.playwright_fallback and _is_retryable(e)):
+                    raise
+                return self._fallback(keyword, area_codes_csv, page, base_url, e)
+
+        def parse(payload: Dict[str, Any]) -> List[JobRow]:
+            if _ROWS_KEY in payload:
+                return payload[_ROWS_KEY]
+            return job_seeker.normalize_jobs(payload)
+
+        return fetch, parse
+
+    def _fallback(self, keyword: str, area_codes_csv: str, page: int, base_url: str,
+                  cause: BaseException) -> Dict[str, Any]:
+        self._bump("fallbacks")
+        try:
+            rows = job_seeker.fetch_jobs_via_playwright(
+                keyword, area_codes_csv=area_codes_csv, pages=[page], base_url=base_url, tabs=1,
+            )
+        except Exception as e:
+            self._bump("fallback_failed")
+            raise RuntimeError(f"第 {page} 頁 JSON 與瀏覽器補抓都失敗：{cause}；{e}") from e
+        if not rows:
+            # 瀏覽器也拿不到：當成失敗（不要誤判成「最後一頁」而停止）
+            self._bump("fallback_failed")
+            raise RuntimeError(f"第 {page} 頁 JSON 失敗且瀏覽器補抓沒有資料：{cause}")
+        return {_ROWS_KEY: rows}
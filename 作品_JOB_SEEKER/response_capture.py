@@ -0,0 +1,86 @@
+# 張詠鈞的python工作區
+# File: response_capture
+# Created: 2026/2/15 上午 11:05
+
+# response_capture.py
+# 事件驅動的 joblist JSON 擷取：
+# - 在分頁上掛 response 監聽，符合條件的 response 一到就 resolve（asyncio.Future）
+# - 先用便宜的同步條件過濾（資源類型 / content-type / 網址），再 await json 做結構判斷
+# - 取代原本每 200ms wait_for_timeout 輪詢 last_job_json 的寫法
+#
+# 用法（在 browser_pool 的 loop 裡）：
+#     async with JobListCapture(page, is_joblist) as cap:
+#         cap.arm()
+#         await page.goto(url)
+#         payload = await cap.wait(timeout_ms)
+
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from playwright.async_api import Page, Response
+
+JsonPredicate = Callable[[Any], bool]
+ResponseFilter = Callable[[Response], bool]
+
+
+def default_response_filter(resp: Response) -> bool:
+    """只看 XHR/fetch 且 content-type 是 JSON 的 response"""
+    try:
+        if resp.request.resource_type not in ("xhr", "fetch"):
+            return False
+    except Exception:
+        pass
+    ct = (resp.headers.get("content-type") or "").lower()
+    return "application/json" in ct
+
+
+class JobListCapture:
+    def __init__(
+        self,
+        page: Page,
+        is_match: JsonPredicate,
+        response_filter: ResponseFilter = default_response_filter,
+    ):
+        self.page = page
+        self.is_match = is_match
+        self.response_filter = response_filter
+        self._fut: Optional["asyncio.Future[Dict[str, Any]]"] = None
+
+    async def __aenter__(self) -> "JobListCapture":
+        self.page.on("response", self._on_response)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        # 分頁會還回池子，監聽器不能留著
+        self.page.remove_listener("response", self._on_response)
+        if self._fut is not None and not self._fut.done():
+            self._fut.cancel()
+        self._fut = None
+
+    def arm(self) -> None:
+        """每次導覽前呼叫：準備接下一個符合的 response（上一頁的結果作廢）"""
+        if self._fut is not None and not self._fut.done():
+            self._fut.cancel()
+        self._fut = asyncio.get_running_loop().create_future()
+
+    async def _on_response(self, resp: Response) -> None:
+        fut = self._fut
+        if fut is None or fut.done():
+            return
+        if not self.response_filter(resp):
+            return
+        try:
+            j = await resp.json()
+        except Exception:
+            return
+        if self.is_match(j) and not fut.done():
+            fut.set_result(j)
+
+    async def wait(self, timeout_ms: int) -> Optional[Dict[str, Any]]:
+        """等到符合的 response（回 payload）或逾時（回 None）"""
+        if self._fut is None:
+            raise RuntimeError("JobListCapture.wait() 前要先 arm()")
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._fut), timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            return None
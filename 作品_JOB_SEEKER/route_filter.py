@@ -0,0 +1,138 @@
+# 張詠鈞的python工作區
+# File: route_filter
+# Created: 2026/2/16 上午 10:40
+
+# route_filter.py
+# Playwright 請求攔截：搜尋頁只需要 HTML + JS + joblist XHR，其餘一律擋掉
+# - 擋資源類型：圖片 / 字型 / CSS / 影音
+# - 擋第三方網域：廣告、追蹤、分析（只放行 104 自己與 allowlist）
+# - allowlist：joblist 需要的網址一定放行（不管類型 / 網域）
+# - 每次執行的計數：擋了幾個請求、估計省下多少 bytes
+#
+# 用法：BrowserPool(route_filter=RouteFilter())
+
+import fnmatch
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+from playwright.async_api import BrowserContext, Route
+
+# 不需要的資源類型（Playwright request.resource_type）
+BLOCK_RESOURCE_TYPES: Tuple[str, ...] = ("image", "font", "stylesheet", "media", "manifest", "texttrack")
+
+# 第一方網域（子網域也算）
+FIRST_PARTY_HOSTS: Tuple[str, ...] = ("104.com.tw", "localhost", "127.0.0.1")
+
+# 第三方但頁面要能跑起來必須放行的（目前沒有；有需要再加）
+ALLOW_THIRD_PARTY_HOSTS: Tuple[str, ...] = ()
+
+# 一定放行的網址（joblist JSON 與其前置）
+ALLOW_URL_PATTERNS: Tuple[str, ...] = (
+    "*/jobs/search/api/*",
+    "*/jobs/search/list*",
+)
+
+# 各類型被擋掉時估計省下的大小（bytes；實際大小擋掉就量不到，只能估）
+EST_BYTES_BY_TYPE: Dict[str, int] = {
+    "image": 25_000,
+    "font": 60_000,
+    "stylesheet": 40_000,
+    "media": 200_000,
+    "script": 80_000,
+    "xhr": 3_000,
+    "fetch": 3_000,
+    "other": 5_000,
+}
+
+
+def _host_matches(host: str, suffixes: Iterable[str]) -> bool:
+    host = (host or "").lower()
+    return any(host == s or host.endswith("." + s) for s in suffixes)
+
+
+@dataclass
+class RouteStats:
+    allowed: int = 0
+    blocked: int = 0
+    est_bytes_saved: int = 0
+    blocked_by_reason: Dict[str, int] = field(default_factory=dict)
+
+    def copy(self) -> "RouteStats":
+        return RouteStats(self.allowed, self.blocked, self.est_bytes_saved, dict(self.blocked_by_reason))
+
+    def since(self, before: "RouteStats") -> "RouteStats":
+        """這次執行的增量（before 是執行前的 copy()）"""
+        reasons = {
+            k: v - before.blocked_by_reason.get(k, 0)
+            for k, v in self.blocked_by_reason.items()
+            if v - before.blocked_by_reason.get(k, 0)
+        }
+        return RouteStats(
+            self.allowed - before.allowed,
+            self.blocked - before.blocked,
+            self.est_bytes_saved - before.est_bytes_saved,
+            reasons,
+        )
+
+    def summary(self) -> str:
+        total = self.allowed + self.blocked
+        return (
+            f"擋下 {self.blocked}/{total} 個請求，"
+            f"估計省下 {self.est_bytes_saved / 1024:.0f} KB"
+        )
+
+
+class RouteFilter:
+    def __init__(
+        self,
+        block_types: Iterable[str] = BLOCK_RESOURCE_TYPES,
+        first_party_hosts: Iterable[str] = FIRST_PARTY_HOSTS,
+        allow_third_party_hosts: Iterable[str] = ALLOW_THIRD_PARTY_HOSTS,
+        allow_url_patterns: Iterable[str] = ALLOW_URL_PATTERNS,
+        block_third_party: bool = True,
+    ):
+        self.block_types = frozenset(block_types)
+        self.first_party_hosts = tuple(first_party_hosts)
+        self.allow_third_party_hosts = tuple(allow_third_party_hosts)
+        self.allow_url_patterns = tuple(allow_url_patterns)
+        self.block_third_party = block_third_party
+        self.stats = RouteStats()
+        self._lock = threading.Lock()
+
+    def decide(self, url: str, resource_type: str) -> Optional[str]:
+        """回 None = 放行；回字串 = 擋下的原因"""
+        if any(fnmatch.fnmatchcase(url, p) for p in self.allow_url_patterns):
+            return None
+
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if self.block_third_party and not (
+            _host_matches(host, self.first_party_hosts) or _host_matches(host, self.allow_third_party_hosts)
+        ):
+            return "third_party"
+
+        if resource_type in self.block_types:
+            return resource_type
+        return None
+
+    def _record(self, resource_type: str, reason: Optional[str]) -> None:
+        with self._lock:
+            if reason is None:
+                self.stats.allowed += 1
+                return
+            self.stats.blocked += 1
+            self.stats.est_bytes_saved += EST_BYTES_BY_TYPE.get(resource_type, EST_BYTES_BY_TYPE["other"])
+            self.stats.blocked_by_reason[reason] = self.stats.blocked_by_reason.get(reason, 0) + 1
+
+    async def handle(self, route: Route) -> None:
+        req = route.request
+        reason = self.decide(req.url, req.resource_type)
+        self._record(req.resource_type, reason)
+        if reason is None:
+            await route.continue_()
+        else:
+            await route.abort("blockedbyclient")
+
+    async def install(self, context: BrowserContext) -> None:
+        await context.route("**/*", self.handle)
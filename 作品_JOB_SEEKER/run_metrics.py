@@ -0,0 +1,208 @@
+# 張詠鈞的python工作區
+# File: run_metrics
+# Created: 2026/3/7 下午 03:40
+
+# run_metrics.py
+# 每次執行的分段計時 + 計數器：慢的時候看得出是 104 抓取、Playwright 啟動、CSV、MSSQL MERGE 還是 diff
+# - span("fetch")：with 區塊計時；同名 span 會累加（串流 pipeline 每頁都會進出一次）
+# - add("rows", n) / set("inserted", n)：計數器
+# - finish()：整次執行寫一行 JSON 到 logs/run_log.jsonl（append），回傳同一份 dict
+# - summary()：結束時印的一行摘要；status_line()：UI 狀態列用的短版
+# thread-safe：批次搜尋的 worker、串流抓取的背景 thread 都可以直接呼叫
+#
+# 看 log：python run_metrics.py [--last 20]
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_RUN_LOG = os.path.join(os.path.dirname(__file__), "logs", "run_log.jsonl")
+
+# 摘要裡計數器的顯示順序（其他的照加入順序排在後面）
+_COUNTER_ORDER = ("pages", "rows", "bytes", "retries", "inserted", "skipped")
+
+
+@dataclass
+class StageStat:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    first_start: float = 0.0     # 第一次進入的時間（相對整次執行開始，秒）
+    errors: int = 0
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+class RunMetrics:
+    def __init__(self, kind: str, log_path: Optional[str] = DEFAULT_RUN_LOG, **meta: Any):
+        """kind：main / batch / ui …；meta：keyword、areas 等會一起寫進 log；log_path=None 不寫檔"""
+        self.kind = kind
+        self.log_path = log_path
+        self.meta: Dict[str, Any] = dict(meta)
+        self.started_at = datetime.datetime.now()
+        self.stages: Dict[str, StageStat] = {}
+        self.counters: Dict[str, float] = {}
+        self._t0 = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._record: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record_span(name, time.perf_counter() - t0, start=t0 - self._t0, ok=ok)
+
+    def record_span(self, name: str, elapsed: float, start: Optional[float] = None, ok: bool = True) -> None:
+        """已經量好的時間直接記（例如別的模組自己有計時）"""
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = StageStat(
+                    first_start=start if start is not None else time.perf_counter() - self._t0 - elapsed)
+            st.count += 1
+            st.total += elapsed
+            st.max = max(st.max, elapsed)
+            if not ok:
+                st.errors += 1
+
+    def add(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] = value
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed if self._elapsed is not None else time.perf_counter() - self._t0
+
+    def to_dict(self, status: str = "running", error: str = "") -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {"count": st.count, "total": round(st.total, 4), "max": round(st.max, 4),
+                       "start": round(st.first_start, 4), "errors": st.errors}
+                for name, st in sorted(self.stages.items(), key=lambda kv: kv[1].first_start)
+            }
+            counters = dict(self.counters)
+        return {
+            "kind": self.kind,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed": round(self.elapsed, 4),
+            "status": status,
+            "error": error,
+            "meta": self.meta,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def finish(self, status: str = "ok", error: str = "") -> Dict[str, Any]:
+        """結束計時並寫一行 log；重複呼叫只會寫第一次"""
+        if self._record is not None:
+            return self._record
+        self._elapsed = time.perf_counter() - self._t0
+        self._record = self.to_dict(status=status, error=error)
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self._record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                # 寫 log 失敗不能讓整次執行失敗
+                print(f"[WARN] run log 寫入失敗：{e}")
+        return self._record
+
+    def _ordered_counters(self) -> List[str]:
+        with self._lock:
+            names = list(self.counters)
+        return [k for k in _COUNTER_ORDER if k in names] + [k for k in names if k not in _COUNTER_ORDER]
+
+    def _counter_text(self, name: str) -> str:
+        v = self.counters[name]
+        if name.startswith("bytes"):
+            return f"{name} {_fmt_bytes(v)}"
+        return f"{name} {v:g}"
+
+    def summary(self) -> str:
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda kv: kv[1].first_start)
+        parts = [f"{name} {st.total:.2f}s" + (f"×{st.count}" if st.count > 1 else "") for name, st in stages]
+        counters = [self._counter_text(k) for k in self._ordered_counters()]
+        text = f"總計 {self.elapsed:.2f}s"
+        if parts:
+            text += "｜" + "、".join(parts)
+        if counters:
+            text += "｜" + "、".join(counters)
+        return text
+
+    def status_line(self, top: int = 3) -> str:
+        """UI 狀態列：總時間 + 最慢的幾段"""
+        with self._lock:
+            slowest = sorted(self.stages.items(), key=lambda kv: kv[1].total, reverse=True)[:top]
+        parts = [f"{name} {st.total:.1f}s" for name, st in slowest]
+        return f"{self.elapsed:.1f}s（" + "、".join(parts) + "）" if parts else f"{self.elapsed:.1f}s"
+
+
+# -------------------------
+# 讀 log
+# -------------------------
+def read_run_log(path: str = DEFAULT_RUN_LOG, last: Optional[int] = None) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+    return out[-last:] if last else out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="列出最近幾次執行的分段耗時")
+    ap.add_argument("--log", default=DEFAULT_RUN_LOG)
+    ap.add_argument("--last", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    runs = read_run_log(args.log, args.last)
+    if not runs:
+        print(f"[INFO] 沒有紀錄：{args.log}")
+        return 0
+    for r in runs:
+        meta = " ".join(f"{k}={v}" for k, v in r.get("meta", {}).items())
+        stages = "、".join(f"{k} {v['total']:.2f}s" for k, v in r.get("stages", {}).items())
+        counters = "、".join(f"{k} {v:g}" for k, v in r.get("counters", {}).items())
+        print(f"{r['started_at']} [{r['kind']}/{r['status']}] {r['elapsed']:.2f}s {meta}")
+        if stages:
+            print(f"    {stages}")
+        if counters:
+            print(f"    {counters}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
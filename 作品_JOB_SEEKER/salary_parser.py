@@ -0,0 +1,146 @@
+# 張詠鈞的python工作區
+# File: salary_parser
+# Created: 2026/3/7 上午 10:10
+
+# salary_parser.py
+# 104 薪資文字 -> 結構化數字（給 DB 數字欄位 / 網頁與桌面版的薪資篩選、排序用）
+#   "月薪40,000~60,000元"   -> month, 40000, 60000
+#   "月薪40,000元以上"      -> month, 40000, None
+#   "年薪600,000~1,500,000元" -> year, 600000, 1500000
+#   "時薪196元"             -> hour, 196, 196
+#   "待遇面議"              -> month, 40000, None, negotiable（104：面議 = 經常性薪資 4 萬以上）
+#   "論件計酬" / 空字串      -> 沒有數字
+#
+# 批次用：一份快照裡薪資文字重複率很高（幾百筆通常只有十幾種寫法），
+# parse_salaries() 先去重再解析，同一個字串只解析一次。
+# 不同計薪週期換算成月薪（month_min / month_max）才能放在同一個欄位比較與排序。
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+PERIOD_MONTH = "month"
+PERIOD_YEAR = "year"
+PERIOD_PIECE = "piece"
+
+# 換算成月薪的倍數（時薪以每月 176 小時、日薪以 22 天計；年薪以 12 個月計）
+_TO_MONTH = {
+    PERIOD_HOUR: 176.0,
+    PERIOD_DAY: 22.0,
+    PERIOD_MONTH: 1.0,
+    PERIOD_YEAR: 1 / 12,
+}
+
+# 104 規定「待遇面議」代表經常性薪資達 4 萬元以上
+NEGOTIABLE_MONTHLY_FLOOR = 40000
+
+_PERIOD_WORDS = (
+    ("時薪", PERIOD_HOUR),
+    ("日薪", PERIOD_DAY),
+    ("月薪", PERIOD_MONTH),
+    ("年薪", PERIOD_YEAR),
+    ("論件", PERIOD_PIECE),
+)
+_NUM = r"(\d[\d,]*(?:\.\d+)?)\s*(萬)?"
+_RANGE_RE = re.compile(_NUM + r"\s*(?:~|～|-|－|至|到)\s*" + _NUM)
+_SINGLE_RE = re.compile(_NUM)
+
+
+@dataclass(frozen=True)
+class SalaryInfo:
+    period: str = ""              # hour / day / month / year / piece；空字串 = 看不出來
+    min: Optional[int] = None     # 原始週期的金額
+    max: Optional[int] = None     # None = 沒有上限（「以上」/ 面議）
+    negotiable: bool = False
+
+    @property
+    def month_min(self) -> Optional[int]:
+        return _to_month(self.min, self.period)
+
+    @property
+    def month_max(self) -> Optional[int]:
+        return _to_month(self.max, self.period)
+
+    def columns(self) -> Tuple[str, Optional[int], Optional[int], bool, Optional[int], Optional[int]]:
+        """DB 欄位順序：salary_period, salary_min, salary_max, salary_negotiable, salary_month_min, salary_month_max"""
+        return (self.period, self.min, self.max, self.negotiable, self.month_min, self.month_max)
+
+
+EMPTY = SalaryInfo()
+SALARY_COLUMNS = (
+    "salary_period", "salary_min", "salary_max", "salary_negotiable", "salary_month_min", "salary_month_max",
+)
+
+
+def _to_month(v: Optional[int], period: str) -> Optional[int]:
+    factor = _TO_MONTH.get(period)
+    if v is None or factor is None:
+        return None
+    return int(round(v * factor))
+
+
+def _amount(num: str, wan: Optional[str]) -> int:
+    v = float(num.replace(",", ""))
+    return int(round(v * 10000 if wan else v))
+
+
+@lru_cache(maxsize=4096)
+def parse_salary(text: str) -> SalaryInfo:
+    s = (text or "").strip()
+    if not s:
+        return EMPTY
+    if "面議" in s:
+        return SalaryInfo(PERIOD_MONTH, NEGOTIABLE_MONTHLY_FLOOR, None, True)
+
+    period = next((p for word, p in _PERIOD_WORDS if word in s), "")
+    if period == PERIOD_PIECE:
+        return SalaryInfo(PERIOD_PIECE)
+
+    m = _RANGE_RE.search(s)
+    if m:
+        lo, hi = _amount(m.group(1), m.group(2)), _amount(m.group(3), m.group(4))
+        if lo > hi:
+            lo, hi = hi, lo
+        return SalaryInfo(period or PERIOD_MONTH, lo, hi)
+
+    m = _SINGLE_RE.search(s)
+    if not m:
+        return SalaryInfo(period)
+    v = _amount(m.group(1), m.group(2))
+    if "以上" in s or "起" in s:
+        return SalaryInfo(period or PERIOD_MONTH, v, None)
+    return SalaryInfo(period or PERIOD_MONTH, v, v)
+
+
+def parse_salaries(texts: Iterable[str]) -> List[SalaryInfo]:
+    """整份快照一次解析：先去重，同一個字串只解析一次"""
+    texts = list(texts)
+    memo: Dict[str, SalaryInfo] = {t: parse_salary(t) for t in set(texts)}
+    return [memo[t] for t in texts]
+
+
+def in_range(info: SalaryInfo, lo: Optional[int] = None, hi: Optional[int] = None) -> bool:
+    """
+    月薪區間 [lo, hi] 跟職缺薪資有沒有交集（lo / hi 給 None = 不限）
+    沒有數字的（空白 / 論件）只在完全不限時才算符合；跟 flask_demo 的 SQL 條件一致
+    """
+    if lo is None and hi is None:
+        return True
+    mmin, mmax = info.month_min, info.month_max
+    if mmin is None:
+        return False
+    if lo is not None and mmax is not None and mmax < lo:
+        return False
+    if hi is not None and mmin > hi:
+        return False
+    return True
+
+
+def sort_key(info: SalaryInfo) -> Tuple[int, int, int]:
+    """數字排序用：沒有數字的永遠排在最後（遞增時）；同下限再比上限（沒上限當最大）"""
+    if info.month_min is None:
+        return (1, 0, 0)
+    return (0, info.month_min, info.month_max if info.month_max is not None else 1 << 30)
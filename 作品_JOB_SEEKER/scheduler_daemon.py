@@ -0,0 +1,338 @@
+# 張詠鈞的python工作區
+# File: scheduler_daemon
+# Created: 2026/3/6 上午 09:00
+
+# scheduler_daemon.py
+# 常駐排程：依已存搜尋（saved_searches.json）裡的 cron 排程自動抓快照，
+# 「今天 vs 昨天」差異就不必靠人記得手動跑。
+# - 排程：標準 cron 5 欄位（分 時 日 月 週），支援 * / , - 與 */n
+# - worker pool 同時跑多個搜尋；同一個搜尋絕不重疊執行
+# - 狀態檔（scheduler_state.json）記每個搜尋的上次執行 / 上次成功 / 錯誤，重開 daemon 也接得上
+# - 今天已經成功抓過的搜尋直接略過（一天一份快照就夠，diff_today_yesterday 也是以天為單位）
+#
+# 用法：
+#   python scheduler_daemon.py saved_searches.json            常駐
+#   python scheduler_daemon.py saved_searches.json --once     只跑「現在到期」的搜尋一次就結束（給系統排程器叫）
+
+import argparse
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import batch_search
+from batch_search import SearchSpec
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(__file__), "scheduler_state.json")
+DEFAULT_SCHEDULE = "0 9 * * *"   # 每天早上 9 點
+TICK_SECONDS = 30
+
+
+# -------------------------
+# cron
+# -------------------------
+_FIELD_RANGES = (
+    (0, 59),   # 分
+    (0, 23),   # 時
+    (1, 31),   # 日
+    (1, 12),   # 月
+    (0, 6),    # 週（0 = 週日；7 也當週日）
+)
+
+
+def _parse_field(text: str, lo: int, hi: int) -> Set[int]:
+    out: Set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_s = part.split("/", 1)
+            step = int(step_s)
+            if step <= 0:
+                raise ValueError(f"cron 間隔必須 > 0：{text}")
+        if part in ("*", ""):
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(part)
+            end = hi if "/" in text and step > 1 else start
+        top = 7 if hi == 6 else hi   # 週可以寫 7（= 週日）
+        if start < lo or end > top or start > end:
+            raise ValueError(f"cron 欄位超出範圍 {lo}-{hi}：{text}")
+        out.update(v % 7 if hi == 6 else v for v in range(start, end + 1, step))
+    return out
+
+
+class CronSchedule:
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 要 5 個欄位（分 時 日 月 週）：{expr!r}")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(p, lo, hi) for p, (lo, hi) in zip(parts, _FIELD_RANGES)
+        )
+        # cron 慣例：日、週都有限定時，符合其一即可
+        self._dom_any = parts[2] == "*"
+        self._dow_any = parts[4] == "*"
+
+    def _day_ok(self, d: datetime.date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = (d.isoweekday() % 7) in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def matches(self, dt: datetime.datetime) -> bool:
+        return self._day_ok(dt.date()) and dt.hour in self.hours and dt.minute in self.minutes
+
+    def next_after(self, dt: datetime.datetime) -> datetime.datetime:
+        """dt 之後（不含 dt 那一分鐘）下一個符合的時間；一年內找不到就丟 ValueError"""
+        t = dt.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = t + datetime.timedelta(days=366)
+        while t < limit:
+            if not self._day_ok(t.date()):
+                t = datetime.datetime.combine(t.date() + datetime.timedelta(days=1), datetime.time())
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            if t.minute in self.minutes:
+                return t
+            t += datetime.timedelta(minutes=1)
+        raise ValueError(f"cron 一年內沒有符合的時間：{self.expr}")
+
+
+# -------------------------
+# 狀態檔
+# -------------------------
+@dataclass
+class SearchState:
+    last_run: str = ""        # ISO 時間
+    last_success: str = ""
+    last_error: str = ""
+    last_rows: int = 0
+    runs: int = 0
+    failures: int = 0
+
+
+class StateStore:
+    """json 狀態檔；每次更新都整份原子寫入（tmp + os.replace）"""
+
+    def __init__(self, path: str = DEFAULT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states: Dict[str, SearchState] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            for key, v in (obj.get("searches") or {}).items():
+                self._states[key] = SearchState(**{k: v[k] for k in SearchState.__dataclass_fields__ if k in v})
+        except Exception as e:
+            print(f"[WARN] 狀態檔讀取失敗，從頭開始：{e}")
+
+    def _save_locked(self) -> None:
+        obj = {
+            "_saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "searches": {k: vars(v) for k, v in self._states.items()},
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> SearchState:
+        with self._lock:
+            return self._states.setdefault(key, SearchState())
+
+    def update(self, key: str, **changes) -> None:
+        with self._lock:
+            st = self._states.setdefault(key, SearchState())
+            for k, v in changes.items():
+                setattr(st, k, v)
+            self._save_locked()
+
+
+def spec_key(spec: SearchSpec) -> str:
+    return f"{spec.keyword}@{spec.areas_text}"
+
+
+def captured_today(st: SearchState, today: datetime.date) -> bool:
+    return bool(st.last_success) and st.last_success[:10] == today.isoformat()
+
+
+# -------------------------
+# daemon
+# -------------------------
+@dataclass
+class _Job:
+    spec: SearchSpec
+    schedule: CronSchedule
+    next_run: datetime.datetime
+    future: Optional[Future] = None
+
+
+@dataclass
+class TickReport:
+    started: List[str] = field(default_factory=list)
+    skipped_today: List[str] = field(default_factory=list)
+    still_running: List[str] = field(default_factory=list)
+
+
+class SchedulerDaemon:
+    def __init__(
+        self,
+        specs: List[SearchSpec],
+        state: Optional[StateStore] = None,
+        workers: int = 2,
+        default_schedule: str = DEFAULT_SCHEDULE,
+        conn_str: Optional[str] = None,
+        rps: float = 2.0,
+    ):
+        self.state = state or StateStore()
+        self.workers = max(1, workers)
+        self.conn_str = conn_str
+        self.rps = rps
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sched")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+
+        now = datetime.datetime.now()
+        self.jobs: Dict[str, _Job] = {}
+        for spec in specs:
+            sched = CronSchedule(spec.schedule or default_schedule)
+            key = spec_key(spec)
+            st = self.state.get(key)
+            # 上次執行之後錯過的排程（daemon 停機期間）補跑一次；沒跑過就從現在起算
+            since = _parse_iso(st.last_run) or now
+            self.jobs[key] = _Job(spec=spec, schedule=sched, next_run=sched.next_after(since))
+
+    def _run_one(self, key: str, spec: SearchSpec) -> None:
+        started = datetime.datetime.now().isoformat(timespec="seconds")
+        st = self.state.get(key)
+        self.state.update(key, last_run=started, runs=st.runs + 1)
+        try:
+            report = batch_search.run_batch([spec], conn_str=self.conn_str, workers=1, rps=self.rps)
+            res = report.results[0]
+            if not res.ok:
+                raise RuntimeError(res.error)
+            self.state.update(key, last_success=datetime.datetime.now().isoformat(timespec="seconds"),
+                              last_error="", last_rows=len(res.rows))
+            print(f"[OK] {key}：{len(res.rows)} 筆，新增 {len(res.new_ids)} / 消失 {len(res.removed_ids)}")
+        except Exception as e:
+            self.state.update(key, last_error=str(e), failures=st.failures + 1)
+            print(f"[ERR] {key}：{e}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+    def tick(self, now: Optional[datetime.datetime] = None, force_due: bool = False) -> TickReport:
+        """檢查一次到期的搜尋並送進 worker pool；force_due=True 不看排程（--once 用）"""
+        now = now or datetime.datetime.now()
+        rep = TickReport()
+        for key, job in self.jobs.items():
+            if not force_due and job.next_run > now:
+                continue
+            job.next_run = job.schedule.next_after(now)
+
+            if captured_today(self.state.get(key), now.date()):
+                rep.skipped_today.append(key)
+                continue
+            with self._lock:
+                if key in self._running:
+                    # 上一輪還沒跑完：不重疊，這次直接跳過
+                    rep.still_running.append(key)
+                    continue
+                self._running.add(key)
+            job.future = self._pool.submit(self._run_one, key, job.spec)
+            rep.started.append(key)
+        return rep
+
+    def run_forever(self, tick_seconds: float = TICK_SECONDS) -> None:
+        print(f"[INFO] 排程啟動：{len(self.jobs)} 個搜尋，{self.workers} 個 worker")
+        for key, job in self.jobs.items():
+            print(f"  - {key}：{job.schedule.expr}（下次 {job.next_run:%Y-%m-%d %H:%M}）")
+        while not self._stop.is_set():
+            rep = self.tick()
+            for key in rep.skipped_today:
+                print(f"[SKIP] {key}：今天已抓過")
+            for key in rep.still_running:
+                print(f"[SKIP] {key}：上一輪還在跑")
+            self._stop.wait(tick_seconds)
+        self.shutdown()
+
+    def wait_idle(self) -> None:
+        for job in self.jobs.values():
+            if job.future is not None:
+                job.future.result()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def shutdown(self) -> None:
+        print("[INFO] 排程停止，等待執行中的搜尋結束…")
+        self._pool.shutdown(wait=True)
+
+
+def _parse_iso(s: str) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.fromisoformat(s) if s else None
+    except ValueError:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="104 已存搜尋排程 daemon")
+    ap.add_argument("saved_searches")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--state", default=DEFAULT_STATE_FILE)
+    ap.add_argument("--schedule", default=DEFAULT_SCHEDULE, help="搜尋沒寫 schedule 時用的預設 cron")
+    ap.add_argument("--rps", type=float, default=2.0)
+    ap.add_argument("--once", action="store_true", help="不看排程，把今天還沒抓的搜尋跑一次就結束")
+    args = ap.parse_args(argv)
+
+    specs = batch_search.load_saved_searches(args.saved_searches)
+    if not specs:
+        print("[ERR] 檔案裡沒有可執行的搜尋")
+        return 2
+
+    try:
+        daemon = SchedulerDaemon(specs, StateStore(args.state), workers=args.workers,
+                                 default_schedule=args.schedule, rps=args.rps)
+    except ValueError as e:
+        print(f"[ERR] 排程設定錯誤：{e}")
+        return 2
+
+    if args.once:
+        rep = daemon.tick(force_due=True)
+        daemon.wait_idle()
+        daemon.shutdown()
+        failed = [k for k in rep.started if daemon.state.get(k).last_error]
+        return 1 if failed else 0
+
+    def _on_signal(_signum, _frame) -> None:
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, _on_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _on_signal)
+    daemon.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
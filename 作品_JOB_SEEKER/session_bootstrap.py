@@ -0,0 +1,167 @@
+# 張詠鈞的python工作區
+# File: session_bootstrap
+# Created: 2026/2/8 上午 09:35
+
+# session_bootstrap.py
+# 104 搜尋頁 cookie 的「種一次、重複用」快取：
+# - 第一次需要時才 GET 搜尋頁種 cookie，之後同一個 session 直接打 list
+# - cookie 存到本機 json（帶時間戳，TTL 過期才重種），下次執行可以直接沿用
+# - list 被降級回 HTML 時，由呼叫端 invalidate() 後重新種
+#   多個 worker 同時被降級只會重種一次：ensure() 回傳 cookie 世代，invalidate() 帶著它，
+#   世代已經變了（別的 thread 先重種過）就不再清
+# - 統計：實際種了幾次、省下幾次
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+
+COOKIE_CACHE_FILE = os.path.join(os.path.dirname(__file__), "cookie_cache_104.json")
+COOKIE_TTL_SECONDS = 30 * 60  # 104 的搜尋 cookie 大約半小時內都還能用
+
+
+@dataclass
+class BootstrapStats:
+    seeds: int = 0          # 實際 GET 搜尋頁的次數
+    seeds_avoided: int = 0  # 本來要種、但因為 cookie 還有效而省掉的次數
+    reseeds: int = 0        # 因為被降級回 HTML 而重種的次數
+    loaded_from_disk: bool = False
+
+    def summary(self) -> str:
+        s = f"種 cookie {self.seeds} 次，省下 {self.seeds_avoided} 次往返"
+        if self.reseeds:
+            s += f"，降級重種 {self.reseeds} 次"
+        if self.loaded_from_disk:
+            s += "（沿用上次存檔的 cookie）"
+        return s
+
+
+class SessionBootstrap:
+    def __init__(
+        self,
+        base_url: str = "https://www.104.com.tw",
+        user_agent: str = "Mozilla/5.0",
+        ttl_seconds: int = COOKIE_TTL_SECONDS,
+        cookie_file: Optional[str] = COOKIE_CACHE_FILE,
+        timeout: int = 20,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.user_agent = user_agent
+        self.ttl_seconds = ttl_seconds
+        self.cookie_file = cookie_file
+        self.timeout = timeout
+        self.stats = BootstrapStats()
+
+        self._lock = threading.Lock()
+        self._seeded_at: float = 0.0
+        self._seeded_sessions: "set[int]" = set()
+        self._generation = 0    # cookie 每換一次（種 / 讀檔 / 作廢）+1
+
+    # -------------------------
+    # 磁碟存取
+    # -------------------------
+    def _load_cookies(self, session: requests.Session) -> bool:
+        if not self.cookie_file or not os.path.exists(self.cookie_file):
+            return False
+        try:
+            with open(self.cookie_file, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            ts = obj.get("_seeded_at", 0)
+            if obj.get("base_url") != self.base_url or not isinstance(ts, (int, float)):
+                return False
+            if time.time() - ts > self.ttl_seconds:
+                return False
+            cookies = obj.get("cookies") or []
+            if not isinstance(cookies, list) or not cookies:
+                return False
+            for c in cookies:
+                session.cookies.set(
+                    c["name"], c["value"],
+                    domain=c.get("domain") or "",
+                    path=c.get("path") or "/",
+                )
+            self._seeded_at = float(ts)
+            return True
+        except Exception:
+            return False
+
+    def _save_cookies(self, session: requests.Session) -> None:
+        if not self.cookie_file:
+            return
+        cookies: List[Dict[str, Any]] = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in session.cookies
+        ]
+        obj = {
+            "_seeded_at": int(self._seeded_at),
+            "base_url": self.base_url,
+            "cookies": cookies,
+        }
+        try:
+            tmp = self.cookie_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(obj, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.cookie_file)
+        except OSError:
+            # 存不了就算了，只是下次要重種
+            pass
+
+    # -------------------------
+    # 種 cookie
+    # -------------------------
+    def _fresh(self) -> bool:
+        return self._seeded_at > 0 and (time.time() - self._seeded_at) <= self.ttl_seconds
+
+    def _seed(self, session: requests.Session) -> None:
+        session.get(
+            f"{self.base_url}/jobs/search/",
+            headers={"User-Agent": self.user_agent, "Referer": f"{self.base_url}/"},
+            timeout=self.timeout,
+        )
+        self._seeded_at = time.time()
+        self._seeded_sessions.add(id(session))
+        self._generation += 1
+        self.stats.seeds += 1
+        self._save_cookies(session)
+
+    def ensure(self, session: requests.Session) -> int:
+        """每次打 list 前呼叫：cookie 還有效就直接略過，不然才種；回傳目前的 cookie 世代"""
+        with self._lock:
+            if id(session) in self._seeded_sessions and self._fresh():
+                self.stats.seeds_avoided += 1
+                return self._generation
+
+            if id(session) not in self._seeded_sessions and self._load_cookies(session):
+                self._seeded_sessions.add(id(session))
+                self._generation += 1
+                self.stats.loaded_from_disk = True
+                self.stats.seeds_avoided += 1
+                return self._generation
+
+            self._seed(session)
+            return self._generation
+
+    def invalidate(self, session: requests.Session, generation: Optional[int] = None) -> bool:
+        """
+        list 回 HTML 時呼叫：丟掉舊 cookie，下次 ensure() 會重種
+        generation：送出請求時 ensure() 回傳的世代；已經不是目前世代代表別的 thread 作廢 / 重種過，
+        這次就不清（不然正在飛的請求會被清掉 cookie、每個 worker 各重種一次）。回傳有沒有真的作廢
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            session.cookies.clear()
+            self._generation += 1
+            self._seeded_sessions.discard(id(session))
+            self._seeded_at = 0.0
+            self.stats.reseeds += 1
+            if self.cookie_file and os.path.exists(self.cookie_file):
+                try:
+                    os.remove(self.cookie_file)
+                except OSError:
+                    pass
+            return True
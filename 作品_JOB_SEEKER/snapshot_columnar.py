@@ -0,0 +1,295 @@
+# 張詠鈞的python工作區
+# File: snapshot_columnar
+# Created: 2026/3/6 下午 02:30
+
+# snapshot_columnar.py
+# 欄式快照輸出（Parquet，選用 pyarrow）：跟 CSV 快照並存，給之後做分析用
+# - 依「快照日期 / 關鍵字」分區（hive 目錄格式）：
+#     <root>/snapshot_date=2026-01-31/keyword=Python%E5%B7%A5%E7%A8%8B%E5%B8%AB/1049_<areas雜湊>.parquet
+#   keyword / snapshot_date 只存在目錄名，不會每一列重複一次
+# - 重複很多的字串欄（公司、地點、薪資、地區…）用 dictionary 編碼
+# - 讀取端先看目錄名決定要開哪些檔（日期範圍 / 關鍵字），不相干的分區完全不碰；欄位也只讀需要的
+#
+# 沒裝 pyarrow 時 import 本模組不會失敗，真的要讀寫才丟 RuntimeError（pip install pyarrow）
+#
+# 用法：
+#   python snapshot_columnar.py import csv_file/             既有 CSV 快照轉進欄式目錄
+#   python snapshot_columnar.py query --keyword Python工程師 --since 2026-01-24
+
+import argparse
+import csv
+import datetime
+import glob
+import hashlib
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote, unquote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # 選用套件
+    pa = None
+    pq = None
+
+from job_row import JOB_FIELDS, JobRow
+
+DEFAULT_COLUMNAR_DIR = os.path.join(os.path.dirname(__file__), "parquet_snapshots")
+
+DATE_KEY = "snapshot_date"
+KEYWORD_KEY = "keyword"
+
+# 檔案裡實際存的欄位（keyword / snapshot_date 在目錄名）
+FILE_COLUMNS = ("areas",) + JOB_FIELDS + ("snapshot_time",)
+# job_id / url 幾乎每筆都不同，dictionary 編碼反而浪費；其他欄位重複率都很高
+DICT_COLUMNS = ("areas", "title", "company", "location", "salary_text", "post_date", "snapshot_time")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("欄式快照需要 pyarrow：pip install pyarrow")
+
+
+def _schema():
+    return pa.schema([
+        (name, pa.dictionary(pa.int32(), pa.string()) if name in DICT_COLUMNS else pa.string())
+        for name in FILE_COLUMNS
+    ])
+
+
+def partition_dir(root: str, snapshot_date: str, keyword: str) -> str:
+    # 關鍵字可能有 / # 空白 等字元，照 hive 慣例做 URL 編碼
+    return os.path.join(root, f"{DATE_KEY}={snapshot_date}", f"{KEYWORD_KEY}={quote(keyword, safe='')}")
+
+
+def _parse_partition(name: str, key: str) -> Optional[str]:
+    prefix = key + "="
+    return unquote(name[len(prefix):]) if name.startswith(prefix) else None
+
+
+class ColumnarSnapshotWriter:
+    """
+    介面跟 job_seeker.CsvSnapshotWriter 一樣（write_rows / commit / abort / with）
+    一份快照頂多幾千筆，先以欄為單位收在記憶體，commit() 時一次寫成一個 Parquet 檔
+    （先寫 .part 再改名，中途失敗不會留下半個檔）
+    """
+
+    def __init__(self, root: str, keyword: str, areas_text: str, snapshot_time: Optional[str] = None):
+        _require_pyarrow()
+        self.root = root
+        self.keyword = keyword
+        self.areas_text = areas_text
+        self.snapshot_time = snapshot_time or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.rows_written = 0
+        self.filepath = self._target_path()
+        self._cols: Dict[str, List[str]] = {name: [] for name in JOB_FIELDS}
+        self._done = False
+
+    def _target_path(self) -> str:
+        date = self.snapshot_time[:10]
+        hhmm = self.snapshot_time[11:16].replace(":", "")
+        # 同一天同關鍵字可能有好幾組地區：檔名帶地區雜湊區分
+        tag = hashlib.sha1(self.areas_text.encode("utf-8")).hexdigest()[:8]
+        base = os.path.join(partition_dir(self.root, date, self.keyword), f"{hhmm}_{tag}")
+        path, k = f"{base}.parquet", 2
+        while os.path.exists(path):
+            path = f"{base}_{k:02d}.parquet"
+            k += 1
+        return path
+
+    def write_rows(self, rows: List[JobRow]) -> None:
+        for r in rows:
+            r = JobRow.coerce(r)
+            for name in JOB_FIELDS:
+                self._cols[name].append(getattr(r, name))
+        self.rows_written += len(rows)
+
+    def to_table(self):
+        n = self.rows_written
+        arrays = {name: pa.array(values, type=pa.string()) for name, values in self._cols.items()}
+        arrays["areas"] = pa.array([self.areas_text] * n, type=pa.string())
+        arrays["snapshot_time"] = pa.array([self.snapshot_time] * n, type=pa.string())
+        for name in DICT_COLUMNS:
+            arrays[name] = arrays[name].dictionary_encode()
+        return pa.Table.from_arrays([arrays[name] for name in FILE_COLUMNS], schema=_schema())
+
+    def commit(self) -> None:
+        if self._done:
+            return
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        tmp = self.filepath + ".part"
+        try:
+            pq.write_table(self.to_table(), tmp, use_dictionary=list(DICT_COLUMNS), compression="zstd")
+            os.replace(tmp, self.filepath)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._done = True
+
+    def abort(self) -> None:
+        self._done = True
+        self._cols = {name: [] for name in JOB_FIELDS}
+
+    def __enter__(self) -> "ColumnarSnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def write_columnar(rows: List[JobRow], root: str, keyword: str, areas_text: str,
+                   snapshot_time: Optional[str] = None) -> str:
+    with ColumnarSnapshotWriter(root, keyword=keyword, areas_text=areas_text, snapshot_time=snapshot_time) as w:
+        w.write_rows(rows)
+    return w.filepath
+
+
+# -------------------------
+# 讀取（分區剪枝）
+# -------------------------
+def _as_date(d) -> Optional[str]:
+    if d is None:
+        return None
+    return d.isoformat() if isinstance(d, datetime.date) else str(d)
+
+
+def list_partitions(
+    root: str = DEFAULT_COLUMNAR_DIR,
+    date_from=None,
+    date_to=None,
+    keywords: Optional[Sequence[str]] = None,
+) -> List[Tuple[str, str, List[str]]]:
+    """
+    只看目錄名挑出符合的分區：[(snapshot_date, keyword, [parquet 檔...])]
+    date_from / date_to 含頭含尾（date 或 'YYYY-MM-DD'）；keywords=None 表示全部
+    """
+    lo, hi = _as_date(date_from), _as_date(date_to)
+    wanted = set(keywords) if keywords is not None else None
+    out = []
+    if not os.path.isdir(root):
+        return out
+    for date_name in sorted(os.listdir(root)):
+        date = _parse_partition(date_name, DATE_KEY)
+        if date is None or (lo and date < lo) or (hi and date > hi):
+            continue
+        date_dir = os.path.join(root, date_name)
+        for kw_name in sorted(os.listdir(date_dir)):
+            kw = _parse_partition(kw_name, KEYWORD_KEY)
+            if kw is None or (wanted is not None and kw not in wanted):
+                continue
+            files = sorted(glob.glob(os.path.join(date_dir, kw_name, "*.parquet")))
+            if files:
+                out.append((date, kw, files))
+    return out
+
+
+def _const_dict_column(value: str, n: int):
+    return pa.DictionaryArray.from_arrays(pa.array([0] * n, type=pa.int32()), pa.array([value], type=pa.string()))
+
+
+def read_snapshots(
+    root: str = DEFAULT_COLUMNAR_DIR,
+    date_from=None,
+    date_to=None,
+    keywords: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+):
+    """
+    回傳 pyarrow.Table（含分區欄 snapshot_date / keyword，dictionary 編碼）
+    columns：只讀這些檔案內欄位（None = 全部）；分區欄一律附上
+    """
+    _require_pyarrow()
+    file_cols = [c for c in columns if c in FILE_COLUMNS] if columns is not None else list(FILE_COLUMNS)
+    tables = []
+    for date, kw, files in list_partitions(root, date_from, date_to, keywords):
+        for path in files:
+            t = pq.read_table(path, columns=file_cols)
+            t = t.append_column(DATE_KEY, _const_dict_column(date, t.num_rows))
+            t = t.append_column(KEYWORD_KEY, _const_dict_column(kw, t.num_rows))
+            tables.append(t)
+    if not tables:
+        empty = _schema()
+        fields = [empty.field(c) for c in file_cols]
+        fields += [pa.field(DATE_KEY, pa.dictionary(pa.int32(), pa.string())),
+                   pa.field(KEYWORD_KEY, pa.dictionary(pa.int32(), pa.string()))]
+        return pa.schema(fields).empty_table()
+    return pa.concat_tables(tables)
+
+
+def iter_snapshot_rows(
+    root: str = DEFAULT_COLUMNAR_DIR,
+    date_from=None,
+    date_to=None,
+    keywords: Optional[Sequence[str]] = None,
+) -> Iterator[JobRow]:
+    """一個分區一個分區讀，轉回 JobRow（給既有以 JobRow 為主的程式用）"""
+    _require_pyarrow()
+    for _date, _kw, files in list_partitions(root, date_from, date_to, keywords):
+        for path in files:
+            t = pq.read_table(path, columns=list(JOB_FIELDS))
+            cols = [t.column(name).to_pylist() for name in JOB_FIELDS]
+            for values in zip(*cols):
+                yield JobRow(*values)
+
+
+# -------------------------
+# 既有 CSV 快照匯入
+# -------------------------
+def import_csv(path: str, root: str = DEFAULT_COLUMNAR_DIR) -> Optional[str]:
+    """job_seeker.write_csv 產生的 CSV -> Parquet；keyword / areas / snapshot_time 從第一列取"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        records = list(csv.DictReader(f))
+    if not records:
+        return None
+    first = records[0]
+    rows = [JobRow.from_mapping(r) for r in records]
+    return write_columnar(rows, root, keyword=first.get("keyword") or "", areas_text=first.get("areas") or "",
+                          snapshot_time=first.get("snapshot_time") or None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="104 快照欄式（Parquet）輸出 / 查詢")
+    ap.add_argument("--root", default=DEFAULT_COLUMNAR_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_imp = sub.add_parser("import", help="把 CSV 快照轉成 Parquet 分區")
+    p_imp.add_argument("paths", nargs="+", help="CSV 檔或資料夾")
+
+    p_q = sub.add_parser("query", help="依日期 / 關鍵字讀出快照")
+    p_q.add_argument("--keyword", action="append", help="可重複指定")
+    p_q.add_argument("--since", help="YYYY-MM-DD（含）")
+    p_q.add_argument("--until", help="YYYY-MM-DD（含）")
+    p_q.add_argument("--head", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    try:
+        _require_pyarrow()
+    except RuntimeError as e:
+        print(f"[ERR] {e}")
+        return 2
+
+    if args.cmd == "import":
+        files = []
+        for p in args.paths:
+            files.extend(sorted(glob.glob(os.path.join(p, "*.csv"))) if os.path.isdir(p) else [p])
+        for f in files:
+            out = import_csv(f, args.root)
+            print(f"[OK] {os.path.basename(f)} -> {out}" if out else f"[SKIP] {f}：沒有資料")
+        return 0
+
+    parts = list_partitions(args.root, args.since, args.until, args.keyword)
+    print(f"[INFO] 符合的分區 {len(parts)} 個、檔案 {sum(len(f) for _d, _k, f in parts)} 個")
+    table = read_snapshots(args.root, args.since, args.until, args.keyword)
+    print(f"[INFO] 共 {table.num_rows} 筆")
+    for r in table.slice(0, args.head).to_pylist():
+        print(f"{r[DATE_KEY]} | {r[KEYWORD_KEY]} | {r['title']} | {r['company']} | {r['salary_text']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
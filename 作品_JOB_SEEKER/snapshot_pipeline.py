@@ -0,0 +1,203 @@
+# 張詠鈞的python工作區
+# File: snapshot_pipeline
+# Created: 2026/3/2 上午 09:40
+
+# snapshot_pipeline.py
+# 串流快照 pipeline：抓取 -> normalize -> CSV -> DB，一頁一頁往下流
+# - 抓到一頁就寫進 CSV（.part 暫存檔）、丟進 DB 的 #job_stage（分批 executemany）
+# - 下游寫太慢時抓取端會等（async_fetcher.iter_pages 的 backpressure），記憶體只留幾頁
+# - 全部抓完才 commit：CSV 改名成正式檔、DB MERGE + commit；中途出錯兩邊都不留半份快照
+# - 同一個快照內重複的 job_id 只寫第一筆
+# - 選用的欄式輸出（snapshot_columnar，Parquet）：跟 CSV 同一份資料，最後一起 commit
+# - 選用的明細補充（job_enrich.DetailEnricher）：每頁 normalize 完就抓該頁職缺明細，跟快照同一個交易寫進 DB
+# - 傳 metrics（run_metrics.RunMetrics）就記各段耗時：fetch（等下一頁）、csv、db_stage、enrich、db_merge…
+
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+import job_MSSQL_db as job_db
+import job_seeker
+from async_fetcher import PageResult, iter_pages
+from job_enrich import DetailEnricher
+from job_row import JobRow
+from resilience import Resilience
+from run_metrics import RunMetrics
+from session_bootstrap import SessionBootstrap
+from snapshot_columnar import ColumnarSnapshotWriter
+
+
+@dataclass
+class PipelineResult:
+    pages: int = 0
+    rows: int = 0
+    duplicates: int = 0
+    inserted: int = 0
+    csv_path: str = ""
+    columnar_path: str = ""
+    details: int = 0
+    errors: List[PageResult] = field(default_factory=list)
+    preview: List[JobRow] = field(default_factory=list)   # 前幾筆（給 main 印出確認）
+    elapsed: float = 0.0
+
+
+def stream_search_pages(
+    session: requests.Session,
+    keyword: str,
+    area_codes_csv: str,
+    bootstrap: Optional[SessionBootstrap] = None,
+    max_pages: int = 3,
+    concurrency: int = 3,
+    rps: float = 2.0,
+    max_buffered: int = 2,
+    base_url: str = job_seeker.BASE_URL_104,
+    resilience: Optional[Resilience] = None,
+) -> Iterable[PageResult]:
+    """104 JSON 清單 API 的分頁串流（依頁碼順序）；有 resilience 就帶重試 / 斷路器 / 瀏覽器補抓"""
+    if resilience is not None:
+        fetch, parse = resilience.page_fetcher(session, keyword, area_codes_csv, base_url=base_url)
+    else:
+        def fetch(page: int) -> Dict[str, Any]:
+            return job_seeker.fetch_104_jobs_json(
+                session, keyword=keyword, area_codes_csv=area_codes_csv, page=page,
+                base_url=base_url, bootstrap=bootstrap,
+            )
+        parse = job_seeker.normalize_jobs
+
+    return iter_pages(
+        fetch,
+        parse,
+        max_pages=max_pages,
+        concurrency=concurrency,
+        rps=rps,
+        max_buffered=max_buffered,
+    )
+
+
+def run_snapshot_pipeline(
+    pages: Iterable[PageResult],
+    keyword: str,
+    area_names: str,
+    csv_path: Optional[str],
+    conn_str: Optional[str] = None,
+    batch_size: int = 500,
+    preview: int = 10,
+    enricher: Optional[DetailEnricher] = None,
+    columnar_root: Optional[str] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> PipelineResult:
+    """
+    pages：iter_pages / stream_search_pages 的輸出
+    csv_path=None 不寫 CSV；conn_str=None 不寫 DB；columnar_root=None 不寫 Parquet
+    一筆職缺都沒有時兩邊都不落地（跟原本「沒抓到就不輸出」一致）
+    """
+    t0 = time.perf_counter()
+    res = PipelineResult()
+    seen: "set[str]" = set()
+
+    def span(name: str):
+        return metrics.span(name) if metrics is not None else nullcontext()
+
+    csv_w = job_seeker.CsvSnapshotWriter(csv_path, keyword=keyword, areas_text=area_names) if csv_path else None
+    db_w = (job_db.SnapshotWriter(keyword, area_names, conn_str, snapshot_time=csv_w.snapshot_time if csv_w else None,
+                                  batch_size=batch_size)
+            if conn_str else None)
+    col_w = (ColumnarSnapshotWriter(columnar_root, keyword=keyword, areas_text=area_names,
+                                    snapshot_time=csv_w.snapshot_time if csv_w else None)
+             if columnar_root else None)
+    try:
+        it = iter(pages)
+        while True:
+            # 等下一頁的時間 = 抓取（含 bootstrap / 重試）比下游慢多少
+            with span("fetch"):
+                page = next(it, None)
+            if page is None:
+                break
+            if page.error is not None:
+                res.errors.append(page)
+            if not page.rows:
+                continue
+            res.pages += 1
+
+            rows = []
+            for r in page.rows:
+                jid = r.job_id
+                if jid in seen:
+                    res.duplicates += 1
+                    continue
+                seen.add(jid)
+                rows.append(r)
+
+            if csv_w is not None:
+                with span("csv_write"):
+                    csv_w.write_rows(rows)
+            if col_w is not None:
+                with span("columnar_write"):
+                    col_w.write_rows(rows)
+            if db_w is not None:
+                with span("db_stage"):
+                    db_w.add(rows)
+            if enricher is not None and rows:
+                with span("enrich"):
+                    details = enricher.enrich(rows)
+                res.details += len(details)
+                if db_w is not None:
+                    db_w.add_details(details.values())
+            if len(res.preview) < preview:
+                res.preview.extend(rows[:preview - len(res.preview)])
+            res.rows += len(rows)
+
+        if res.rows == 0:
+            _abort(csv_w, db_w, col_w)
+        else:
+            # 全部抓完才落地：DB 先（比較可能失敗），成功後 CSV 再改名
+            if db_w is not None:
+                with span("db_merge"):
+                    res.inserted = db_w.commit()
+            if csv_w is not None:
+                with span("csv_commit"):
+                    csv_w.commit()
+                res.csv_path = csv_path or ""
+            if col_w is not None:
+                with span("columnar_commit"):
+                    col_w.commit()
+                res.columnar_path = col_w.filepath
+    except BaseException:
+        _abort(csv_w, db_w, col_w)
+        # 串流還沒跑完就出錯：通知背景抓取收掉
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
+        raise
+
+    res.elapsed = time.perf_counter() - t0
+    if metrics is not None:
+        metrics.add("pages", res.pages)
+        metrics.add("rows", res.rows)
+        metrics.add("inserted", res.inserted)
+        if conn_str:
+            # 跟 UI / batch 一樣：送進 DB 但被忽略（同日已存在）的筆數
+            metrics.add("skipped", res.rows - res.inserted)
+        if res.duplicates:
+            metrics.add("dup_in_snapshot", res.duplicates)
+        if res.errors:
+            metrics.add("page_errors", len(res.errors))
+        if enricher is not None:
+            metrics.add("details", res.details)
+    return res
+
+
+def _abort(
+    csv_w: Optional[job_seeker.CsvSnapshotWriter],
+    db_w: Optional[job_db.SnapshotWriter],
+    col_w: Optional[ColumnarSnapshotWriter] = None,
+) -> None:
+    if db_w is not None:
+        db_w.rollback()
+    if csv_w is not None:
+        csv_w.abort()
+    if col_w is not None:
+        col_w.abort()
@@ -0,0 +1,337 @@
+# 張詠鈞的python工作區
+# File: stand_in_server
+# Created: 2026/3/1 下午 02:20
+
+# stand_in_server.py
+# 本機 104 替身伺服器（離線測試 / 壓測用，只用標準庫）
+# - /jobs/search/               搜尋頁（種 cookie；頁面 JS 會去打 api/jobs，給 Playwright 路徑用）
+# - /jobs/search/list           JSON 清單 API（fetch_104_jobs_json 用，data.list 格式）
+# - /jobs/search/api/jobs       JSON 清單 API（Playwright 頁面 XHR 用，data[] 格式）
+# - /category-tool/json/Area.json  地區樹（area_mapper.fetch_area_mapping 用）
+# - /job/ajax/content/<code>    職缺明細 JSON（job_enrich.py 用，內容是假的）
+# 可設定延遲、錯誤率（HTTP 500）、降級率（回 HTML，模擬 104 擋人）
+#
+# 職缺資料來源：fixtures 目錄裡錄好的 joblist_page{N}.json；
+# 沒有的話就用 csv_file/ 裡的歷史快照組出假的 104 item。
+#
+# 用法：python stand_in_server.py --port 8104 --latency-ms 150 --downgrade-rate 0.05
+
+import argparse
+import csv
+import glob
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(BASE_DIR, "fixtures")
+DEFAULT_CSV_DIR = os.path.join(BASE_DIR, "csv_file")
+DEFAULT_AREA_CACHE = os.path.join(BASE_DIR, "area_cache_104.json")
+
+SEARCH_PAGE_HTML = """<!DOCTYPE html>
+<html lang="zh-TW"><head><meta charset="utf-8"><title>104 stand-in</title>
+<link rel="stylesheet" href="/static/site.css"></head>
+<body><div id="app">loading…</div><img src="/static/banner.png">
+<script>
+fetch("/jobs/search/api/jobs" + location.search, {headers: {"Accept": "application/json"}})
+  .then(r => r.json())
+  .then(j => { document.getElementById("app").textContent = (j.data || []).length + " jobs"; });
+</script></body></html>
+"""
+
+DOWNGRADE_HTML = "<!DOCTYPE html><html><head><title>104</title></head><body>請稍後再試</body></html>"
+
+
+@dataclass
+class StandInConfig:
+    latency_ms: float = 50.0      # 每個請求固定延遲
+    jitter_ms: float = 0.0        # 額外隨機延遲（0 ~ jitter_ms）
+    error_rate: float = 0.0       # 回 HTTP 500 的機率
+    downgrade_rate: float = 0.0   # list API 回 HTML 的機率
+    page_size: int = 20
+    max_pages: Optional[int] = None   # 限制總頁數（None = 依資料量）
+    seed: Optional[int] = None
+
+
+@dataclass
+class StandInStats:
+    requests: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    downgrades: int = 0
+    bytes_sent: int = 0
+
+
+# -------------------------
+# 資料
+# -------------------------
+def _items_from_csv(csv_dir: str) -> List[Dict[str, Any]]:
+    """用歷史 CSV 快照組出 104 joblist item（同 job_id 只留一筆）"""
+    items: List[Dict[str, Any]] = []
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(csv_dir, "*.csv"))):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                jid = (r.get("job_id") or "").strip()
+                if not jid or jid in seen:
+                    continue
+                seen.add(jid)
+                url = (r.get("url") or "").strip()
+                items.append({
+                    "jobNo": jid,
+                    "jobName": r.get("title") or "",
+                    "custName": r.get("company") or "",
+                    "custNo": "",
+                    "jobAddrNoDesc": r.get("location") or "",
+                    "salaryDesc": r.get("salary_text") or "",
+                    "appearDate": r.get("post_date") or "",
+                    "link": {"job": url.replace("https:", "") if url else f"//www.104.com.tw/job/{jid}"},
+                })
+    return items
+
+
+def _load_fixture_pages(fixtures_dir: str) -> Optional[List[List[Dict[str, Any]]]]:
+    """fixtures/joblist_page1.json, joblist_page2.json ...（錄下來的真實回應，data.list 或 data[] 都吃）"""
+    pages = []
+    n = 1
+    while True:
+        path = os.path.join(fixtures_dir, f"joblist_page{n}.json")
+        if not os.path.exists(path):
+            break
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        data = obj.get("data")
+        if isinstance(data, dict):
+            data = data.get("list") or []
+        pages.append(list(data or []))
+        n += 1
+    return pages or None
+
+
+def _area_tree_from_cache(area_cache: str) -> List[Dict[str, Any]]:
+    """把 area_cache_104.json 的扁平 mapping 還原成 Area.json 的樹狀格式"""
+    with open(area_cache, "r", encoding="utf-8") as f:
+        mapping: Dict[str, str] = json.load(f).get("mapping") or {}
+
+    cities: Dict[str, Dict[str, Any]] = {}
+    for name, code in mapping.items():
+        if code.endswith("000"):
+            cities[code] = {"no": code, "des": name, "n": []}
+    for name, code in mapping.items():
+        if code.endswith("000"):
+            continue
+        city = cities.get(code[:7] + "000")
+        if city is None:
+            continue
+        city["n"].append({"no": code, "des": name[len(city["des"]):]})
+    return [{"no": "6001000000", "des": "台灣地區", "n": list(cities.values())}]
+
+
+def _repeat_pages(pages: List[List[Dict[str, Any]]], max_pages: int) -> List[List[Dict[str, Any]]]:
+    """頁數剛好切到 max_pages；資料不夠就循環複製（jobNo 加上輪次後綴，避免被當成重複）"""
+    if not pages or len(pages) >= max_pages:
+        return pages[:max_pages]
+    out = list(pages)
+    rnd = 1
+    while len(out) < max_pages:
+        for page in pages:
+            if len(out) >= max_pages:
+                break
+            out.append([dict(it, jobNo=f"{it.get('jobNo')}r{rnd}") for it in page])
+        rnd += 1
+    return out
+
+
+def _fake_detail(code: str) -> Dict[str, Any]:
+    """依代碼固定產生的明細（同一個代碼每次內容都一樣）"""
+    h = sum(ord(c) for c in code)
+    skills = ["Python", "SQL", "Git", "Docker", "Linux", "C#"]
+    return {"data": {
+        "header": {"jobName": f"stand-in {code}"},
+        "condition": {
+            "workExp": ["不拘", "1年以上", "3年以上"][h % 3],
+            "edu": "大學以上",
+            "specialty": [{"code": str(i), "description": skills[(h + i) % len(skills)]} for i in range(3)],
+            "skill": [],
+            "other": "熟悉 Python 開發",
+        },
+        "jobDetail": {
+            "needEmp": f"{h % 3 + 1}人",
+            "remoteWork": {"type": 1, "description": "部分遠端"} if h % 2 else None,
+        },
+    }}
+
+
+class JobData:
+    def __init__(self, fixtures_dir: str = DEFAULT_FIXTURES_DIR, csv_dir: str = DEFAULT_CSV_DIR,
+                 area_cache: str = DEFAULT_AREA_CACHE, page_size: int = 20, max_pages: Optional[int] = None):
+        pages = _load_fixture_pages(fixtures_dir)
+        if pages is None:
+            items = _items_from_csv(csv_dir)
+            pages = [items[i:i + page_size] for i in range(0, len(items), page_size)]
+        if max_pages is not None:
+            pages = _repeat_pages(pages, max_pages)
+        self.pages = pages
+        self.area_tree = _area_tree_from_cache(area_cache) if os.path.exists(area_cache) else []
+
+    def page(self, n: int) -> List[Dict[str, Any]]:
+        if 1 <= n <= len(self.pages):
+            return self.pages[n - 1]
+        return []
+
+    @property
+    def total_rows(self) -> int:
+        return sum(len(p) for p in self.pages)
+
+
+# -------------------------
+# HTTP
+# -------------------------
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: Tuple[str, int], config: StandInConfig, data: JobData):
+        super().__init__(addr, _Handler)
+        self.config = config
+        self.data = data
+        self.stats = StandInStats()
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        # 壓測時不要洗版
+        return
+
+    def _send(self, status: int, body: bytes, ctype: str, extra: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.stats.bytes_sent += len(body)
+
+    def _json(self, obj: Any) -> None:
+        self._send(200, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def do_GET(self) -> None:
+        cfg = self.server.config
+        parts = urllib.parse.urlsplit(self.path)
+        qs = dict(urllib.parse.parse_qsl(parts.query))
+        path = parts.path
+
+        with self.server.lock:
+            self.server.stats.requests[path] = self.server.stats.requests.get(path, 0) + 1
+
+        delay = cfg.latency_ms + (self.server.rng.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self.server.roll(cfg.error_rate):
+            with self.server.lock:
+                self.server.stats.errors += 1
+            self._send(500, b"stand-in error", "text/plain; charset=utf-8")
+            return
+
+        try:
+            page_no = int(qs.get("page", "1"))
+        except ValueError:
+            page_no = 1
+
+        if path in ("/jobs/search/", "/jobs/search"):
+            self._send(200, SEARCH_PAGE_HTML.encode("utf-8"), "text/html; charset=utf-8",
+                       {"Set-Cookie": "stand_in_session=1; Path=/"})
+        elif path == "/jobs/search/list":
+            if self.server.roll(cfg.downgrade_rate):
+                with self.server.lock:
+                    self.server.stats.downgrades += 1
+                self._send(200, DOWNGRADE_HTML.encode("utf-8"), "text/html; charset=utf-8")
+                return
+            self._json({"data": {"list": self.server.data.page(page_no),
+                                 "totalPage": len(self.server.data.pages)}})
+        elif path == "/jobs/search/api/jobs":
+            self._json({"data": self.server.data.page(page_no),
+                        "metadata": {"pagination": {"lastPage": len(self.server.data.pages)}}})
+        elif path == "/category-tool/json/Area.json":
+            self._json(self.server.data.area_tree)
+        elif path.startswith("/job/ajax/content/"):
+            self._json(_fake_detail(path.rsplit("/", 1)[-1]))
+        elif path.startswith("/static/"):
+            # 給 route_filter 擋的假資源
+            self._send(200, b"\0" * 2048, "application/octet-stream")
+        else:
+            self._send(404, b"not found", "text/plain; charset=utf-8")
+
+
+def start_stand_in(
+    config: Optional[StandInConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    data: Optional[JobData] = None,
+) -> StandInServer:
+    """背景啟動（port=0 自動挑空的 port）；用完呼叫 server.shutdown()"""
+    config = config or StandInConfig()
+    data = data or JobData(page_size=config.page_size, max_pages=config.max_pages)
+    server = StandInServer((host, port), config, data)
+    threading.Thread(target=server.serve_forever, name="stand-in-104", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="本機 104 替身伺服器")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8104)
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--downgrade-rate", type=float, default=0.0)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--max-pages", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    cfg = StandInConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        downgrade_rate=args.downgrade_rate,
+        page_size=args.page_size,
+        max_pages=args.max_pages,
+        seed=args.seed,
+    )
+    data = JobData(page_size=cfg.page_size, max_pages=cfg.max_pages)
+    server = StandInServer((args.host, args.port), cfg, data)
+    print(f"[INFO] 104 替身伺服器：{server.base_url}（{len(data.pages)} 頁 / {data.total_rows} 筆）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()